@@ -0,0 +1,75 @@
+"""
+Compares memory use of the slotted Step/Group/Plugin model with the previous __dict__ classes.
+
+Run from the project root:
+    python -m benchmarks.bench_fomod_nodes [plugins]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+from parsers.fomod_parser import Step, Group, Plugin, clean_name
+
+
+class LegacyEntry:
+    def __init__(self, name):
+        self.name = clean_name(name)
+
+class LegacyStep(LegacyEntry):
+    def __init__(self, name):
+        super().__init__(name)
+        self.groups = []
+
+class LegacyGroup(LegacyEntry):
+    def __init__(self, name, source_dir=None):
+        super().__init__(name)
+        self.source_dir = source_dir
+        self.plugins = []
+
+class LegacyPlugin(LegacyEntry):
+    def __init__(self, name, absolute_path, base_path, image_path=None, description=None, type_descriptor=None):
+        super().__init__(name)
+        self.absolute_path = absolute_path
+        self.relative_path = os.path.relpath(absolute_path, base_path).replace("/", "\\")
+        self.image_path = image_path
+        self.description = description
+        self.type_descriptor = type_descriptor
+
+
+def build_tree(step_class, group_class, plugin_class, plugins: int):
+    """ Builds one step of `plugins` single-plugin groups, the shape FomodParser produces. """
+    root = "/home/modder/Games/prefixes/morrowind/pfx/drive_c/users/steamuser/My Documents/Synthetic Mod"
+    step = step_class("Synthetic Mod")
+    for i in range(plugins):
+        folder = f"{i % 1000:03d} Option {i % 50}"
+        group_dir = os.path.join(root, f"Category {i // 1000}", folder)
+        group = group_class(folder, group_dir)
+        group.plugins.append(plugin_class(folder, os.path.join(group_dir, "Data Files"), root))
+        step.groups.append(group)
+    return step
+
+
+def measure(label, classes, plugins):
+    start = time.perf_counter()
+    build_tree(*classes, plugins)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    tree = build_tree(*classes, plugins)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<8} {current / 1024 / 1024:8.1f} MiB | {current / plugins:6.0f} B/plugin | "
+          f"build {elapsed * 1000:7.1f} ms")
+    return tree
+
+
+def main():
+    plugins = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"🧮 {plugins} plugins")
+    measure("legacy", (LegacyStep, LegacyGroup, LegacyPlugin), plugins)
+    measure("slotted", (Step, Group, Plugin), plugins)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares the scandir-based FomodParser scan with the previous listdir/isdir scan.
+
+Run from the project root:
+    python -m benchmarks.bench_fomod_scan [groups] [plugins_per_group]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from parsers.fomod_parser import FomodParser, Step, Group, Plugin, clean_name, MORROWIND_DATA_FOLDERS
+from parsers.scan_cache import ScanCache
+from benchmarks.synthetic_mod import build_synthetic_mod, backdate_dirs
+
+
+class LegacyFomodParser(FomodParser):
+    """ The previous scan: listdir per folder, a second listdir for groups and isdir on every entry. """
+
+    def parse(self):
+        root_step = Step(clean_name(os.path.basename(self.root_dir)))
+        for item in sorted(os.listdir(self.root_dir)):
+            full_path = os.path.join(self.root_dir, item)
+            if item.lower() == "fomod":
+                continue
+            if os.path.isdir(full_path):
+                self.parse_group_or_plugin(root_step, full_path)
+        self.steps.append(root_step)
+
+    def parse_group_or_plugin(self, step, path):
+        folder_name = clean_name(os.path.basename(path))
+        contents = {name.lower() for name in os.listdir(path)}
+        group = Group(folder_name)
+        if "data files" in contents:
+            group.add_plugin(Plugin(folder_name, os.path.join(path, "Data Files"), self.root_dir))
+        elif contents & MORROWIND_DATA_FOLDERS:
+            group.add_plugin(Plugin(folder_name, path, self.root_dir))
+        else:
+            for sub_item in sorted(os.listdir(path)):
+                full_sub_path = os.path.join(path, sub_item)
+                if os.path.isdir(full_sub_path):
+                    self.parse_group_or_plugin(group, full_sub_path)
+        if isinstance(step, Step):
+            step.add_group(group)
+
+
+@contextmanager
+def count_calls(counts: dict):
+    """ Counts the directory listing and stat calls made through the `os` module. """
+    originals = {"listdir": os.listdir, "scandir": os.scandir, "stat": os.stat}
+
+    def counted(name):
+        def wrapper(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return originals[name](*args, **kwargs)
+        return wrapper
+
+    for name in originals:
+        setattr(os, name, counted(name))
+    try:
+        yield counts
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+
+def measure(parser_class, mod_dir, workers=1, scan_cache=None):
+    counts = {}
+    parser = parser_class(mod_dir, workers=workers, scan_cache=scan_cache)
+    start = time.perf_counter()
+    with count_calls(counts):
+        parser.parse()
+    return time.perf_counter() - start, counts, parser.steps
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    plugins_per_group = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    tmp = tempfile.mkdtemp()
+    try:
+        mod_dir = build_synthetic_mod(tmp, groups, plugins_per_group, files_per_plugin=1)
+        print(f"📂 Synthetic mod: {groups} groups x {plugins_per_group} plugins")
+        runs = (
+            ("listdir + isdir", LegacyFomodParser, 1),
+            ("scandir", FomodParser, 1),
+            ("scandir x8", FomodParser, 8),
+        )
+        for label, parser_class, workers in runs:
+            elapsed, counts, _ = measure(parser_class, mod_dir, workers)
+            listings = counts.get("listdir", 0) + counts.get("scandir", 0)
+            print(f"  {label:<16} {elapsed * 1000:8.1f} ms | "
+                  f"directory listings: {listings:6d} | stat calls: {counts.get('stat', 0):6d}")
+
+        backdate_dirs(mod_dir)
+        cache_dir = os.path.join(tmp, "scan_cache")
+        measure(FomodParser, mod_dir, scan_cache=ScanCache.for_project(mod_dir, cache_dir))
+        elapsed, counts, _ = measure(FomodParser, mod_dir, scan_cache=ScanCache.for_project(mod_dir, cache_dir))
+        listings = counts.get("listdir", 0) + counts.get("scandir", 0)
+        print(f"  {'cached reopen':<16} {elapsed * 1000:8.1f} ms | "
+              f"directory listings: {listings:6d} | stat calls: {counts.get('stat', 0):6d}")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
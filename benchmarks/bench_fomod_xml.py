@@ -0,0 +1,107 @@
+"""
+Compares the streaming FomodXMLWriter with the previous ElementTree + minidom serialisation,
+and the iterparse FomodXMLReader with loading the whole document via ElementTree.parse.
+Also times schema validation of the written file, next to an expat pass with no-op handlers,
+the floor for any validator that checks each element in Python.
+
+Run from the project root:
+    python -m benchmarks.bench_fomod_xml [plugins]
+"""
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom.minidom import parseString
+from xml.parsers import expat
+
+from parsers.fomod_parser import FomodXMLWriter, FomodXMLReader, Step, Group, Plugin
+from parsers.fomod_schema import get_validator
+
+
+def legacy_generate_xml(steps) -> str:
+    root = ET.Element("config", {
+        "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+        "xsi:noNamespaceSchemaLocation": "http://qconsulting.ca/fo3/ModConfig5.0.xsd"
+    })
+    ET.SubElement(root, "moduleName").text = steps[0].name
+    install_steps = ET.SubElement(root, "installSteps", order="Explicit")
+    for step in steps:
+        file_groups = ET.SubElement(ET.SubElement(install_steps, "installStep", name=step.name),
+                                    "optionalFileGroups", order="Explicit")
+        for group in step.groups:
+            plugins = ET.SubElement(ET.SubElement(file_groups, "group", name=group.name, type="SelectAny"),
+                                    "plugins", order="Explicit")
+            for plugin in group.plugins:
+                plugin_element = ET.SubElement(plugins, "plugin", name=plugin.name)
+                ET.SubElement(plugin_element, "description").text = plugin.description or "Auto-generated description."
+                files = ET.SubElement(plugin_element, "files")
+                ET.SubElement(files, "folder", source=plugin.relative_path, destination="\\", priority="0")
+                ET.SubElement(ET.SubElement(plugin_element, "typeDescriptor"), "type",
+                              name=plugin.type_descriptor or "Optional")
+    return parseString(ET.tostring(root, encoding="utf-8")).toprettyxml(indent="  ")
+
+
+def build_steps(plugins: int):
+    root = "/mods/Synthetic Mod"
+    step = Step("Synthetic Mod")
+    for i in range(plugins):
+        group = Group(f"{i:06d} Option {i}")
+        group.add_plugin(Plugin(group.name, f"{root}/{i:06d} Option {i}/Data Files", root))
+        step.add_group(group)
+    return [step]
+
+
+def expat_noop(path: str):
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = lambda name, attributes: None
+    parser.EndElementHandler = lambda name: None
+    parser.CharacterDataHandler = lambda data: None
+    with open(path, "rb") as f:
+        parser.ParseFile(f)
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<10} {elapsed * 1000:9.1f} ms | peak {peak / 1024 / 1024:8.1f} MiB")
+
+
+def main():
+    plugins = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    steps = build_steps(plugins)
+    print(f"📜 {plugins} plugins")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ModuleConfig.xml")
+
+        def write_legacy():
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(legacy_generate_xml(steps))
+
+        def write_streaming():
+            with open(path, "w", encoding="utf-8") as f:
+                FomodXMLWriter(steps).write_xml(f)
+
+        measure("minidom", write_legacy)
+        measure("streaming", write_streaming)
+
+        print("📥 Import")
+        measure("ET.parse", lambda: ET.parse(path))
+        measure("iterparse", lambda: FomodXMLReader(path).read())
+
+        print("🧩 Validate")
+        measure("compile", get_validator)
+        measure("expat", lambda: expat_noop(path))
+        measure("validate", lambda: get_validator().validate_file(path))
+
+
+if __name__ == "__main__":
+    main()
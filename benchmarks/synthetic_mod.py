@@ -0,0 +1,38 @@
+import os
+
+
+def build_synthetic_mod(root: str, groups: int = 50, plugins_per_group: int = 20, files_per_plugin: int = 2) -> str:
+    """
+    Builds a synthetic mod tree under `root` and returns the mod directory.
+
+    Half of the top-level folders are plugins with a "Data Files" folder, the other half
+    are groups of loose plugins (Morrowind data folders without "Data Files").
+    """
+    mod_dir = os.path.join(root, "Synthetic Mod")
+    for g in range(groups):
+        group_dir = os.path.join(mod_dir, f"{g:03d} Group {g}")
+        if g % 2 == 0:
+            data_dir = os.path.join(group_dir, "Data Files", "textures")
+            os.makedirs(data_dir, exist_ok=True)
+            _write_files(data_dir, files_per_plugin)
+            continue
+        for p in range(plugins_per_group):
+            plugin_dir = os.path.join(group_dir, f"{p:03d} Option {p}", "meshes")
+            os.makedirs(plugin_dir, exist_ok=True)
+            _write_files(plugin_dir, files_per_plugin)
+    os.makedirs(os.path.join(mod_dir, "fomod"), exist_ok=True)
+    return mod_dir
+
+
+def backdate_dirs(root: str, seconds: int = 60):
+    """ Moves every folder mtime into the past, as if the mod had been sitting on disk for a while. """
+    past = os.stat(root).st_mtime - seconds
+    for path, dirs, _ in os.walk(root):
+        for d in [path] + [os.path.join(path, d) for d in dirs]:
+            os.utime(d, (past, past))
+
+
+def _write_files(path: str, count: int):
+    for i in range(count):
+        with open(os.path.join(path, f"file_{i}.dds"), "wb") as f:
+            f.write(b"DDS " + bytes(range(256)) * 4)
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+from typing import Iterable, Tuple
+
+from parsers.scan_cache import RACY_WINDOW_NS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+app_logger = logging.getLogger("PHOMODLogger")
+
+FICLONE = 0x40049409  # Copy-on-write clone ioctl(2), as used for the structure
+
+
+def _clone_file(src: str, dst: str):
+    """
+    Reflinks `src` to `dst` where the filesystem can, else copies it.
+
+    Never a hardlink: the archive handed out and the cache entry must stay independent,
+    or editing the archive in place (e.g. `zip -d`) would corrupt the cache.
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+class BuildCache:
+    """
+    Content-addressed cache of reproducible archives.
+
+    An archive is stored under the SHA-256 of its input manifest: every member's archive
+    path and content digest, plus everything else that decides the archive's bytes (see
+    `ArchiveOptions.cache_token()`). Identical inputs therefore map to the same key, and a
+    rebuild of an unchanged mod returns the stored archive without packing anything.
+
+    File digests are remembered by (size, mtime_ns), so an unchanged tree is keyed without
+    being read again. Only the `max_entries` most recently used archives are kept.
+    """
+    VERSION = 1
+
+    def __init__(self, cache_dir: str, max_entries: int = 16):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.digests_file = os.path.join(cache_dir, "digests.json")
+        self.digests = self._load_digests()
+        self.dirty = False
+
+    @classmethod
+    def default(cls) -> "BuildCache":
+        """ The cache stored under the user config dir. """
+        from config.phomod_config import CONFIG_DIR
+        return cls(os.path.join(str(CONFIG_DIR), "build_cache"))
+
+    def _load_digests(self) -> dict:
+        try:
+            with open(self.digests_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            app_logger.warning(f"⚠️ Ignoring unreadable build cache digests {self.digests_file}: {e}")
+            return {}
+        if data.get("version") != self.VERSION:
+            return {}
+        return data.get("files", {})
+
+    def file_digest(self, path: str) -> str:
+        """ SHA-256 of a file, reused while its size and mtime are unchanged. """
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        cached = self.digests.get(path)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        if time.time_ns() - st.st_mtime_ns >= RACY_WINDOW_NS:  # A change in the same tick would go unnoticed
+            self.digests[path] = [st.st_size, st.st_mtime_ns, digest.hexdigest()]
+            self.dirty = True
+        return digest.hexdigest()
+
+    def key(self, layout: Iterable[Tuple[str, str]], token: str) -> str:
+        """ Hash of the input manifest: sorted (archive path, content digest) pairs plus `token`. """
+        manifest = hashlib.sha256(f"phomod-build-cache {self.VERSION}\n{token}\n".encode("utf-8"))
+        for source, arcname in sorted(layout, key=lambda pair: pair[1]):
+            manifest.update(f"{arcname}\0{self.file_digest(source)}\n".encode("utf-8"))
+        return manifest.hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.archive")
+
+    def fetch(self, key: str, target: str) -> bool:
+        """ Places the cached archive for `key` at `target`; False if there is none. """
+        entry = self._entry(key)
+        if not os.path.exists(entry):
+            return False
+        os.utime(entry)  # Most recently used
+        tmp_path = f"{target}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        _clone_file(entry, tmp_path)
+        os.replace(tmp_path, target)
+        return True
+
+    def store(self, key: str, archive_path: str):
+        """ Adds a freshly built archive and drops the least recently used ones past `max_entries`. """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._entry(key)}.{os.getpid()}.tmp"  # Batch builds share the cache
+            _clone_file(archive_path, tmp_path)
+            os.replace(tmp_path, self._entry(key))
+            self._prune()
+        except OSError as e:
+            app_logger.warning(f"⚠️ Failed to store {archive_path} in the build cache: {e}")
+
+    def _prune(self):
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".archive")]
+        entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in entries[self.max_entries:]:
+            os.remove(entry.path)
+
+    def save(self):
+        """ Drops digests of deleted files and writes the digests atomically. """
+        stale = [path for path in self.digests if not os.path.exists(path)]
+        for path in stale:
+            del self.digests[path]
+        if not (self.dirty or stale):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self.digests_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "files": self.digests}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.digests_file)
+            self.dirty = False
+        except OSError as e:
+            app_logger.warning(f"⚠️ Failed to save build cache digests {self.digests_file}: {e}")
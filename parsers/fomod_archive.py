@@ -0,0 +1,620 @@
+"""
+Archive packers: a parallel zip packer and solid tar archives (tar.xz, and tar.zst where
+the interpreter has `compression.zstd`).
+
+Members are compressed in a thread pool (zlib, bz2, lzma and crc32 release the GIL) and
+written to the archive in layout order, so the archive does not depend on which thread
+finishes first. Compressed members are spooled to temporary files past `SPOOL_SIZE` and
+only a bounded window of them is in flight, which bounds memory however large the mod is.
+
+How each member is compressed comes from a per-extension policy (`ArchiveOptions.compression`):
+already-compressed media is stored as is, and "auto" stores a file when deflating its
+first `SAMPLE_SIZE` bytes saves less than `min_gain`.
+
+With a previous archive (`ArchiveOptions.incremental`), members whose source is unchanged
+are copied from it without being recompressed. In reproducible mode, members are sorted
+and get fixed timestamps and permissions, so identical inputs give identical bytes.
+
+Solid formats compress the whole tar stream, so similar files shrink together. tar.xz
+splits the stream into blocks compressed as independent xz streams in a thread pool
+(like `xz -T`); tar.zst uses the codec's own worker threads. Both stream with bounded memory.
+"""
+import io
+import os
+import abc
+import bz2
+import sys
+import json
+import lzma
+import time
+import zlib
+import struct
+import logging
+import tarfile
+import calendar
+import zipfile
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+CHUNK_SIZE = 1 << 20  # Bytes read from a source file at a time
+SPOOL_SIZE = 8 << 20  # Compressed bytes kept in memory per member before spilling to disk
+SAMPLE_SIZE = 64 << 10  # Bytes trial-compressed by the "auto" rule
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_BZIP2 = 12
+ZIP_LZMA = 14
+# Compression rule name -> (zip method, version needed to extract)
+METHODS = {"store": (ZIP_STORED, 20), "deflate": (ZIP_DEFLATED, 20), "bzip2": (ZIP_BZIP2, 46),
+           "lzma": (ZIP_LZMA, 63)}
+COMPRESSION_RULES = tuple(METHODS) + ("auto",)
+
+# Rules for common mod files; "auto" applies to everything else
+DEFAULT_COMPRESSION = {
+    **dict.fromkeys((".ogg", ".mp3", ".opus", ".flac", ".jpg", ".jpeg", ".png", ".webp", ".bik",
+                     ".zip", ".7z", ".rar", ".gz", ".xz", ".bz2"), "store"),
+    **dict.fromkeys((".dds", ".tga", ".bmp", ".nif", ".kf", ".wav"), "deflate"),
+    **dict.fromkeys((".esp", ".esm", ".omwaddon", ".omwgame", ".txt", ".xml", ".lua", ".json", ".ini"), "deflate:9"),
+}
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+DEFAULT_VERSION = 20
+ZIP64_VERSION = 45
+UTF8_FLAG = 0x800
+LZMA_EOS_FLAG = 0x2  # The LZMA stream ends with an end-of-stream marker
+LZMA_DICT_SIZES = (1 << 18, 1 << 20, 1 << 21, 1 << 22, 1 << 22, 1 << 23, 1 << 23, 1 << 24, 1 << 25, 1 << 26)
+CREATE_SYSTEM = 0 if sys.platform == "win32" else 3  # MS-DOS / Unix, as zipfile writes it
+REPRODUCIBLE_MODE = 0o100644  # Regular file, rw-r--r--
+
+app_logger = logging.getLogger("PHOMODLogger")
+
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+END_RECORD = struct.Struct("<IHHHHIIH")
+ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+ZIP64_END_LOCATOR = struct.Struct("<IIQI")
+
+
+@dataclass
+class ArchiveOptions:
+    """
+    How `generate_archive` packs a mod. `workers=None` uses one compression thread per CPU.
+
+    `compression` maps lowercased extensions to a rule: "store", "deflate", "bzip2", "lzma"
+    or "auto", optionally with a level ("deflate:9"). Other files use `default_compression`.
+    "auto" deflates at `level` unless the sample saves less than `min_gain` (a fraction).
+    """
+    workers: Optional[int] = None
+    level: int = 6
+    compression: Dict[str, str] = field(default_factory=lambda: dict(DEFAULT_COMPRESSION))
+    default_compression: str = "auto"
+    min_gain: float = 0.05
+    incremental: bool = False  # Copy unchanged members from the previous archive of the mod (not if reproducible)
+    reproducible: bool = False  # Sorted members, fixed timestamps and permissions
+    build_cache: bool = True  # In reproducible mode, reuse the archive built from identical inputs
+    format: str = "zip"  # One of `archive_formats()`; the tar formats ignore the compression table
+
+    def __post_init__(self):
+        for rule in list(self.compression.values()) + [self.default_compression]:
+            self.parse_rule(rule)
+        if self.format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format: {self.format} "
+                             f"(available: {', '.join(archive_formats())})")
+
+    def thread_count(self) -> int:
+        return max(1, self.workers or os.cpu_count() or 1)
+
+    @staticmethod
+    def fixed_date_time() -> Tuple[int, int, int, int, int, int]:
+        """ The timestamp of reproducible members: `SOURCE_DATE_EPOCH` (UTC) if set, else 1980-01-01. """
+        epoch = os.environ.get("SOURCE_DATE_EPOCH")
+        if epoch and epoch.isdigit():
+            return _date_time(int(epoch), time.gmtime)
+        return 1980, 1, 1, 0, 0, 0
+
+    def cache_token(self) -> str:
+        """ Everything besides the input files that decides a reproducible archive's bytes. """
+        return json.dumps({
+            "compression": sorted(self.compression.items()), "default": self.default_compression,
+            "level": self.level, "min_gain": self.min_gain, "date_time": self.fixed_date_time(),
+            "zlib": zlib.ZLIB_RUNTIME_VERSION, "format": self.format,
+        }, sort_keys=True)
+
+    def rule_for(self, arcname: str) -> Tuple[str, int]:
+        """ The (rule, level) for an archive member, from its extension. """
+        extension = os.path.splitext(arcname)[1].lower()
+        return self.parse_rule(self.compression.get(extension, self.default_compression), self.level)
+
+    @staticmethod
+    def parse_rule(rule: str, default_level: int = 6) -> Tuple[str, int]:
+        """ Splits "deflate:9" into ("deflate", 9); raises ValueError for unknown rules. """
+        name, _, level = rule.strip().lower().partition(":")
+        if name not in COMPRESSION_RULES:
+            raise ValueError(f"Unknown compression rule: {rule} (expected one of {', '.join(COMPRESSION_RULES)})")
+        try:
+            level = int(level) if level else default_level
+        except ValueError:
+            raise ValueError(f"Invalid compression level in rule: {rule}") from None
+        if name == "bzip2":
+            level = max(1, level)  # bz2 has no level 0
+        return name, level
+
+
+@dataclass
+class CompressedMember:
+    """ A member ready to be written: its metadata and its compressed bytes (positioned at the start). """
+    arcname: str
+    method: str  # "store", "deflate", "bzip2" or "lzma"
+    crc: int
+    size: int
+    compressed_size: int
+    date_time: Tuple[int, int, int, int, int, int]
+    mode: int
+    data: BinaryIO
+    reused: bool = False  # Copied from a previous archive
+
+
+@dataclass
+class ArchiveStats:
+    """ Totals of a packed archive; `methods` counts the members per compression rule. """
+    members: int = 0
+    size: int = 0
+    compressed_size: int = 0
+    methods: Dict[str, int] = field(default_factory=dict)
+    reused: int = 0
+
+
+def _dos_date_time(date_time) -> Tuple[int, int]:
+    year, month, day, hour, minute, second = date_time
+    return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+
+class _LZMACompressor:
+    """ LZMA in the layout zip uses: a small header with the filter properties, then a raw LZMA1 stream. """
+
+    def __init__(self, level: int):
+        dict_size = LZMA_DICT_SIZES[min(max(level, 0), 9)]
+        self._header = struct.pack("<BBH", 9, 4, 5) + bytes([(2 * 5 + 0) * 9 + 3]) + struct.pack("<I", dict_size)
+        self._compressor = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[
+            {"id": lzma.FILTER_LZMA1, "preset": level, "dict_size": dict_size, "lc": 3, "lp": 0, "pb": 2}])
+
+    def compress(self, data: bytes) -> bytes:
+        header, self._header = self._header, b""
+        return header + self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        header, self._header = self._header, b""
+        return header + self._compressor.flush()
+
+
+def _compressor(rule: str, level: int):
+    if rule == "deflate":
+        return zlib.compressobj(level, zlib.DEFLATED, -15)
+    if rule == "bzip2":
+        return bz2.BZ2Compressor(level)
+    return _LZMACompressor(level)
+
+
+def _gains_enough(sample: bytes, level: int, min_gain: float) -> bool:
+    """ Whether deflating `sample` saves at least `min_gain` of its size. """
+    if not sample:
+        return False
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = len(compressor.compress(sample)) + len(compressor.flush())
+    return compressed <= len(sample) * (1 - min_gain)
+
+
+def _date_time(mtime: float, convert=time.localtime) -> Tuple[int, int, int, int, int, int]:
+    date_time = convert(mtime)[:6]
+    if date_time[0] < 1980:  # The earliest date a zip can hold
+        return 1980, 1, 1, 0, 0, 0
+    return date_time
+
+
+def compress_file(source: str, arcname: str, options: ArchiveOptions = None) -> CompressedMember:
+    """
+    Compresses one file as its rule says, computing its CRC on the way.
+
+    Compressed data goes to a spooled temporary file. Stored files are not copied: their
+    CRC is computed here and the member's data is the source file itself.
+    """
+    options = options or ArchiveOptions()
+    st = os.stat(source)
+    rule, level = options.rule_for(arcname)
+
+    with open(source, "rb") as f:
+        first = f.read(CHUNK_SIZE)
+        if rule == "auto":
+            rule = "deflate" if _gains_enough(first[:SAMPLE_SIZE], level, options.min_gain) else "store"
+        crc, size = zlib.crc32(first), len(first)
+
+        if rule == "store":
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+            data, compressed_size = open(source, "rb"), size
+        else:
+            data = tempfile.SpooledTemporaryFile(SPOOL_SIZE)
+            try:
+                compressor = _compressor(rule, level)
+                data.write(compressor.compress(first))
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    crc = zlib.crc32(chunk, crc)
+                    size += len(chunk)
+                    data.write(compressor.compress(chunk))
+                data.write(compressor.flush())
+                compressed_size = data.tell()
+                data.seek(0)
+            except BaseException:
+                data.close()
+                raise
+    return CompressedMember(arcname, rule, crc, size, compressed_size, _date_time(st.st_mtime), st.st_mode, data)
+
+
+class PreviousArchive:
+    """
+    An earlier zip of the same mod whose compressed members can be copied into a new one.
+
+    A member is reused when its source has the same size and either the same modification
+    time or, failing that, the same CRC-32 (the file is read but not compressed), and its
+    compression method is what the policy asks for. Zip times only have a 2-second
+    resolution, so a matching time is only trusted for files last modified well before the
+    previous archive was written; newer files are compared by CRC.
+    """
+    METHOD_NAMES = {method: name for name, (method, _) in METHODS.items()}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.written = os.stat(path).st_mtime
+        with zipfile.ZipFile(path) as archive:
+            self.members = {info.filename: info for info in archive.infolist()}
+
+    def reuse(self, source: str, arcname: str, st: os.stat_result, rule: str) -> Optional[CompressedMember]:
+        """ The previous member for `arcname` if the source is unchanged, with its data positioned; else None. """
+        info = self.members.get(arcname)
+        if info is None or info.file_size != st.st_size or info.flag_bits & 0x1:  # Missing, resized or encrypted
+            return None
+        method = self.METHOD_NAMES.get(info.compress_type)
+        if method is None or (method != rule and not (rule == "auto" and method in ("store", "deflate"))):
+            return None
+        date_time = _date_time(st.st_mtime)
+        same_time = _dos_date_time(info.date_time) == _dos_date_time(date_time) and st.st_mtime < self.written - 2
+        if not same_time and info.CRC != self._crc(source):
+            return None
+
+        data = open(self.path, "rb")
+        try:
+            data.seek(info.header_offset)
+            header = data.read(LOCAL_HEADER.size)
+            fields = LOCAL_HEADER.unpack(header) if len(header) == LOCAL_HEADER.size else None
+            if fields is None or fields[0] != 0x04034B50:
+                data.close()
+                return None
+            data.seek(fields[-2] + fields[-1], os.SEEK_CUR)  # Skip the name and extra field
+        except BaseException:
+            data.close()
+            raise
+        return CompressedMember(arcname, method, info.CRC, info.file_size, info.compress_size, date_time,
+                                st.st_mode, data, reused=True)
+
+    @staticmethod
+    def _crc(source: str) -> int:
+        crc = 0
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+
+class ZipArchiveWriter:
+    """ Writes already-compressed members to a zip file, switching to ZIP64 records where needed. """
+
+    def __init__(self, fh: BinaryIO, create_system: int = CREATE_SYSTEM):
+        self.fh = fh
+        self.create_system = create_system
+        self.offset = 0
+        self.central_directory = []
+
+    def add(self, member: CompressedMember):
+        """ Writes a member's local header and data; `member.data` is closed afterwards. """
+        name, flags = self._encode_name(member.arcname)
+        method, version = METHODS[member.method]
+        if member.method == "lzma":
+            flags |= LZMA_EOS_FLAG
+        dos_date, dos_time = _dos_date_time(member.date_time)
+        zip64 = member.size >= ZIP64_LIMIT or member.compressed_size >= ZIP64_LIMIT
+        extra = struct.pack("<HHQQ", 1, 16, member.size, member.compressed_size) if zip64 else b""
+        if zip64:
+            version = max(version, ZIP64_VERSION)
+
+        header = LOCAL_HEADER.pack(0x04034B50, version, flags, method, dos_time, dos_date, member.crc,
+                                   ZIP64_LIMIT if zip64 else member.compressed_size,
+                                   ZIP64_LIMIT if zip64 else member.size, len(name), len(extra))
+        offset = self.offset
+        self._write(header + name + extra)
+        try:
+            remaining = member.compressed_size
+            while remaining:
+                chunk = member.data.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError(f"{member.arcname} changed while it was being packed")
+                self._write(chunk)
+                remaining -= len(chunk)
+        finally:
+            member.data.close()
+        self.central_directory.append((member, name, flags, dos_date, dos_time, offset))
+
+    def close(self):
+        """ Writes the central directory and the end records. """
+        start = self.offset
+        for member, name, flags, dos_date, dos_time, offset in self.central_directory:
+            zip64_fields = [value for value in (member.size, member.compressed_size, offset) if value >= ZIP64_LIMIT]
+            extra = struct.pack(f"<HH{len(zip64_fields)}Q", 1, 8 * len(zip64_fields), *zip64_fields) \
+                if zip64_fields else b""
+            method, version = METHODS[member.method]
+            if zip64_fields:
+                version = max(version, ZIP64_VERSION)
+            self._write(CENTRAL_HEADER.pack(
+                0x02014B50, self.create_system << 8 | version, version, flags, method, dos_time, dos_date,
+                member.crc, min(member.compressed_size, ZIP64_LIMIT), min(member.size, ZIP64_LIMIT),
+                len(name), len(extra), 0, 0, 0, (member.mode & 0xFFFF) << 16, min(offset, ZIP64_LIMIT)) + name + extra)
+
+        count, size = len(self.central_directory), self.offset - start
+        if count >= ZIP_FILECOUNT_LIMIT or size >= ZIP64_LIMIT or start >= ZIP64_LIMIT:
+            end64 = self.offset
+            self._write(ZIP64_END_RECORD.pack(0x06064B50, ZIP64_END_RECORD.size - 12, ZIP64_VERSION, ZIP64_VERSION,
+                                              0, 0, count, count, size, start))
+            self._write(ZIP64_END_LOCATOR.pack(0x07064B50, 0, end64, 1))
+        self._write(END_RECORD.pack(0x06054B50, 0, 0, min(count, ZIP_FILECOUNT_LIMIT), min(count, ZIP_FILECOUNT_LIMIT),
+                                    min(size, ZIP64_LIMIT), min(start, ZIP64_LIMIT), 0))
+
+    def _write(self, data: bytes):
+        self.fh.write(data)
+        self.offset += len(data)
+
+    @staticmethod
+    def _encode_name(arcname: str) -> Tuple[bytes, int]:
+        try:
+            return arcname.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return arcname.encode("utf-8"), UTF8_FLAG
+
+
+class ParallelZipPacker:
+    """
+    Packs `(source path, archive path)` pairs into a zip using a thread pool.
+
+    The archive is written to a temporary file next to `zip_path` and moved into place
+    when complete, so a failed run never leaves a truncated zip behind.
+    """
+
+    extension = ".zip"
+
+    def __init__(self, options: ArchiveOptions = None):
+        self.options = options or ArchiveOptions()
+
+    def pack(self, layout: Iterable[Tuple[str, str]], zip_path: str, previous: str = None) -> ArchiveStats:
+        """
+        Packs the layout into `zip_path`, copying unchanged members from the `previous` zip if given.
+        Reproducible packs never reuse members: their bytes would depend on the previous zip.
+        """
+        previous_archive = self._open_previous(previous) if previous and not self.options.reproducible else None
+        if self.options.reproducible:
+            layout = sorted(layout, key=lambda pair: pair[1])
+        workers = self.options.thread_count()
+        window = workers * 2  # Members compressed ahead of the writer
+        stats = ArchiveStats()
+        tmp_path = f"{zip_path}.tmp"
+        pending = deque()
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="PHOMODZip") as pool, \
+                    open(tmp_path, "wb") as fh:
+                writer = ZipArchiveWriter(fh, 3 if self.options.reproducible else CREATE_SYSTEM)
+                for source, arcname in layout:
+                    pending.append(pool.submit(self._member, source, arcname, previous_archive))
+                    if len(pending) >= window:
+                        self._write(writer, pending.popleft().result(), stats)
+                while pending:
+                    self._write(writer, pending.popleft().result(), stats)
+                writer.close()
+            os.replace(tmp_path, zip_path)
+        except BaseException:
+            self._discard(pending)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return stats
+
+    def _member(self, source: str, arcname: str, previous: Optional[PreviousArchive]) -> CompressedMember:
+        member = None
+        if previous is not None:
+            member = previous.reuse(source, arcname, os.stat(source), self.options.rule_for(arcname)[0])
+        if member is None:
+            member = compress_file(source, arcname, self.options)
+        if self.options.reproducible:
+            member.date_time = self.options.fixed_date_time()
+            member.mode = REPRODUCIBLE_MODE
+        return member
+
+    @staticmethod
+    def _open_previous(path: str) -> Optional[PreviousArchive]:
+        try:
+            return PreviousArchive(path)
+        except (OSError, zipfile.BadZipFile) as e:
+            app_logger.warning(f"⚠️ Cannot reuse {path}, packing every file: {e}")
+            return None
+
+    @staticmethod
+    def _write(writer: ZipArchiveWriter, member: CompressedMember, stats: ArchiveStats):
+        writer.add(member)
+        stats.reused += member.reused
+        stats.members += 1
+        stats.size += member.size
+        stats.compressed_size += member.compressed_size
+        stats.methods[member.method] = stats.methods.get(member.method, 0) + 1
+
+    @staticmethod
+    def _discard(pending: deque):
+        """ Cancels queued members and closes the data of those already compressed. """
+        for future in pending:
+            if not future.cancel() and future.exception() is None:
+                future.result().data.close()
+        pending.clear()
+
+
+class _ParallelXzWriter(io.RawIOBase):
+    """
+    Binary sink that cuts everything written into blocks and compresses each one as an
+    independent xz stream in a thread pool. Concatenated xz streams are a valid .xz file.
+    At most `workers + 1` blocks are held at once.
+    """
+
+    def __init__(self, raw: BinaryIO, preset: int, workers: int, block_size: int = None):
+        self.raw = raw
+        self.preset = preset
+        self.block_size = block_size or 3 * LZMA_DICT_SIZES[preset]  # The block size `xz -T` uses
+        self.buffer = bytearray()
+        self.window = workers + 1
+        self.pending = deque()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="PHOMODXz")
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self.pending.append(self.pool.submit(lzma.compress, block, format=lzma.FORMAT_XZ, preset=self.preset))
+        while len(self.pending) >= self.window:
+            self.raw.write(self.pending.popleft().result())
+
+    def finish(self):
+        """ Compresses the last partial block and writes every block still in flight. """
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer.clear()
+        while self.pending:
+            self.raw.write(self.pending.popleft().result())
+
+    def close(self):
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.pool.shutdown(wait=True)
+        super().close()
+
+
+class TarPacker(abc.ABC):
+    """
+    Base of the solid formats: streams the layout into a tar written through `_open_stream()`.
+
+    Members are read in `CHUNK_SIZE` pieces and never held whole in memory. The archive is
+    written to a temporary file and moved into place when complete. `previous` archives are
+    not reused: members of a solid archive cannot be copied out of it.
+    """
+    extension = ".tar"
+    method = "tar"
+
+    def __init__(self, options: ArchiveOptions = None):
+        self.options = options or ArchiveOptions()
+
+    def pack(self, layout: Iterable[Tuple[str, str]], archive_path: str, previous: str = None) -> ArchiveStats:
+        if self.options.reproducible:
+            layout = sorted(layout, key=lambda pair: pair[1])
+        stats = ArchiveStats()
+        tmp_path = f"{archive_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as raw:
+                stream = self._open_stream(raw)
+                try:
+                    with tarfile.open(fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT) as tar:
+                        for source, arcname in layout:
+                            self._add(tar, source, arcname, stats)
+                    self._finish_stream(stream)
+                finally:
+                    stream.close()
+            stats.compressed_size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, archive_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return stats
+
+    def _add(self, tar: tarfile.TarFile, source: str, arcname: str, stats: ArchiveStats):
+        with open(source, "rb") as f:
+            st = os.fstat(f.fileno())
+            info = tarfile.TarInfo(arcname)
+            info.size = st.st_size
+            if self.options.reproducible:
+                info.mtime = calendar.timegm(self.options.fixed_date_time() + (0, 0, 0))
+                info.mode = REPRODUCIBLE_MODE & 0o7777
+            else:
+                info.mtime = int(st.st_mtime)
+                info.mode = st.st_mode & 0o7777
+            tar.addfile(info, f)
+        stats.members += 1
+        stats.size += st.st_size
+        stats.methods[self.method] = stats.methods.get(self.method, 0) + 1
+
+    @abc.abstractmethod
+    def _open_stream(self, raw: BinaryIO) -> BinaryIO:
+        """ Wraps the archive file in the compressor the tar is written through. """
+
+    def _finish_stream(self, stream: BinaryIO):
+        """ Flushes the compressor once the tar is complete. """
+
+
+class TarXzPacker(TarPacker):
+    """ Solid tar.xz, compressed block-parallel (see `_ParallelXzWriter`) at preset `options.level`. """
+    extension = ".tar.xz"
+    method = "xz"
+
+    def _open_stream(self, raw: BinaryIO) -> BinaryIO:
+        return _ParallelXzWriter(raw, min(max(self.options.level, 0), 9), self.options.thread_count())
+
+    def _finish_stream(self, stream: BinaryIO):
+        stream.finish()
+
+
+class TarZstdPacker(TarPacker):
+    """ Solid tar.zst using zstd's own worker threads at level `options.level`. """
+    extension = ".tar.zst"
+    method = "zstd"
+
+    def _open_stream(self, raw: BinaryIO) -> BinaryIO:
+        # `level` and `options` are mutually exclusive, so the level goes into the options too
+        options = {zstd.CompressionParameter.compression_level: self.options.level}
+        if self.options.thread_count() > 1:
+            options[zstd.CompressionParameter.nb_workers] = self.options.thread_count()
+        return zstd.ZstdFile(raw, "w", options=options)
+
+
+# Format name -> packer; tar.zst only when the interpreter has `compression.zstd`
+ARCHIVE_FORMATS = {"zip": ParallelZipPacker, "tar.xz": TarXzPacker}
+if zstd is not None:
+    ARCHIVE_FORMATS["tar.zst"] = TarZstdPacker
+
+
+def archive_formats() -> Tuple[str, ...]:
+    return tuple(ARCHIVE_FORMATS)
+
+
+def archive_packer(options: ArchiveOptions = None):
+    """ The packer for `options.format`. """
+    options = options or ArchiveOptions()
+    return ARCHIVE_FORMATS[options.format](options)
@@ -0,0 +1,149 @@
+import io
+import os
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional
+
+from parsers.fomod_parser import ArchiveIndex, FomodManager
+from parsers.fomod_archive import ArchiveOptions
+
+DEFAULT_OUTPUT_NAME = "fomod_output"
+
+
+@dataclass
+class BuildOptions:
+    """ What to build for every mod of a batch. """
+    output_dir: Optional[str] = None
+    generate_structure: bool = False
+    generate_archive: bool = False
+    user_version: Optional[str] = None
+    keep_existing_output: bool = True
+    validate: bool = True
+    use_scan_cache: bool = False
+    link_mode: str = "auto"
+    archive_options: ArchiveOptions = field(default_factory=ArchiveOptions)
+
+
+@dataclass
+class ModBuildResult:
+    """ Outcome of one mod: step timings in seconds, the error if it failed, and its captured output. """
+    mod_dir: str
+    elapsed: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+    validation_errors: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    output: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def find_mod_roots(folder: str, output_dir: str = None) -> List[str]:
+    """ Lists the mods in a folder: every sub-folder and zip/tar archive, except output folders. """
+    skip = {os.path.abspath(output_dir)} if output_dir else set()
+    roots = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name == DEFAULT_OUTPUT_NAME or os.path.abspath(entry.path) in skip:
+                continue
+            if entry.is_dir() or ArchiveIndex.is_archive(entry.path):
+                roots.append(entry.path)
+    return sorted(roots, key=lambda path: os.path.basename(path).lower())
+
+
+def build_mod(mod_dir: str, options: BuildOptions) -> ModBuildResult:
+    """ Runs the full pipeline for one mod. Runs in a worker process, so it never raises. """
+    result = ModBuildResult(mod_dir)
+    captured = io.StringIO()
+    start = time.perf_counter()
+    manager = None
+    try:
+        with redirect_stdout(captured):
+            manager = FomodManager(mod_dir, options.output_dir, options.keep_existing_output,
+                                   use_scan_cache=options.use_scan_cache, link_mode=options.link_mode,
+                                   archive_options=options.archive_options)
+            manager.run(generate_structure=options.generate_structure, generate_archive=options.generate_archive,
+                        user_version=options.user_version, validate=options.validate)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.elapsed = time.perf_counter() - start
+    if manager is not None:
+        result.timings = dict(manager.timings)
+        result.validation_errors = [str(error) for error in manager.validation_errors]
+    result.output = captured.getvalue()
+    return result
+
+
+class FomodBatchBuilder:
+    """
+    Builds many mods at once, one `FomodManager` per mod in a process pool.
+
+    Each mod runs in its own process, so parsing, XML generation, copying and zipping of
+    different mods use all cores. Results arrive as each mod finishes and are collected
+    into a single report.
+    """
+
+    def __init__(self, mod_dirs: List[str], options: BuildOptions = None, jobs: int = None):
+        self.mod_dirs = list(mod_dirs)
+        self.options = options or BuildOptions()
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+
+    def run(self, on_result: Callable[[ModBuildResult], None] = None) -> List[ModBuildResult]:
+        """ Builds every mod; returns the results in mod order. `on_result` sees each one as it finishes. """
+        results = {}
+        options = self._mod_options()
+        if self.jobs == 1 or len(self.mod_dirs) < 2:
+            for mod_dir in self.mod_dirs:
+                results[mod_dir] = build_mod(mod_dir, options)
+                if on_result:
+                    on_result(results[mod_dir])
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(self.mod_dirs))) as executor:
+                futures = {executor.submit(build_mod, mod_dir, options): mod_dir for mod_dir in self.mod_dirs}
+                for future in as_completed(futures):
+                    mod_dir = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:  # The worker process itself died
+                        result = ModBuildResult(mod_dir, error=f"{type(e).__name__}: {e}")
+                    results[mod_dir] = result
+                    if on_result:
+                        on_result(result)
+        return [results[mod_dir] for mod_dir in self.mod_dirs]
+
+    def _mod_options(self) -> BuildOptions:
+        """ Splits the CPUs between the mods built at once, unless archive threads were set explicitly. """
+        if self.options.archive_options.workers:
+            return self.options
+        parallel = min(self.jobs, max(1, len(self.mod_dirs)))
+        workers = max(1, (os.cpu_count() or 1) // parallel)
+        return replace(self.options, archive_options=replace(self.options.archive_options, workers=workers))
+
+    @staticmethod
+    def report(results: List[ModBuildResult]) -> str:
+        """ A per-mod timing table followed by the errors of the mods that failed. """
+        steps = []
+        for result in results:
+            steps.extend(step for step in result.timings if step not in steps)
+        name_width = max([len("Mod")] + [len(os.path.basename(r.mod_dir)) for r in results])
+        header = f"{'Mod':<{name_width}} | status | " + " | ".join(f"{step:>9}" for step in steps + ["total"])
+        lines = [header, "-" * len(header)]
+        for result in results:
+            status = "failed" if not result.ok else ("schema" if result.validation_errors else "ok")
+            cells = [f"{result.timings[step] * 1000:7.1f}ms" if step in result.timings else f"{'-':>9}" for step in steps]
+            cells.append(f"{result.elapsed * 1000:7.1f}ms")
+            lines.append(f"{os.path.basename(result.mod_dir):<{name_width}} | {status:<6} | " + " | ".join(cells))
+
+        failed = [result for result in results if not result.ok]
+        invalid = [result for result in results if result.ok and result.validation_errors]
+        lines.append(f"{len(results) - len(failed)} of {len(results)} mod(s) built, "
+                     f"{sum(r.elapsed for r in results):.2f} s of work")
+        for result in failed:
+            lines.append(f"❌ {result.mod_dir}: {result.error}")
+        for result in invalid:
+            lines.append(f"⚠️ {result.mod_dir}: {len(result.validation_errors)} schema problem(s), "
+                         f"first: {result.validation_errors[0]}")
+        return "\n".join(lines)
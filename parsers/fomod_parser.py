@@ -1,86 +1,385 @@
 
+import io
 import os
 import re
+import sys
+import copy
+import time
+import errno
 import shutil
+import json
+import hashlib
+import tarfile
 import zipfile
 import datetime
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import NamedTuple, Callable, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
 
-import xml.etree.ElementTree as ET
-from xml.dom.minidom import parseString
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from xml.dom import minidom
+from xml.etree import ElementTree as ET
 
 from appdata import phomod_map
+from parsers.scan_cache import ScanCache
+from parsers.fomod_archive import ArchiveOptions, archive_packer
+from parsers.build_cache import BuildCache
+from parsers.fomod_schema import SchemaError, get_validator
+from parsers.fs_watcher import DirectoryWatcher, ChangeSet
 
 
 # Common folders inside "Data Files" in Morrowind
 MORROWIND_DATA_FOLDERS = {"meshes", "icons", "textures", "music", "sound", "splash", "bookart", "fonts", "scripts", "mwse"}
 
+# Lowercased names that decide whether a folder is a Plugin or a Group
+CLASSIFYING_NAMES = MORROWIND_DATA_FOLDERS | {"data files"}
+
+# How generate_new_structure places files: "auto" tries a reflink, then a hardlink, then a copy
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+FICLONE = 0x40049409  # ioctl(2) asking the filesystem (Btrfs, XFS, ...) for a copy-on-write clone
+
+# Where the generated config lives in the output, relative to the output folder
+_GENERATED_CONFIG = os.path.join("fomod", "ModuleConfig.xml")
+
+_LEADING_NUMBER = re.compile(r"^\d+\s*")
+_PATH_SEPARATORS = re.compile("[" + re.escape(os.sep + (os.altsep or "")) + "]")
+
 def clean_name(name: str) -> str:
     """ Removes leading numbers and trims spaces from folder names. """
-    return re.sub(r"^\d+\s*", "", name).strip()
+    return _LEADING_NUMBER.sub("", name).strip()
+
+def intern_path(path: str) -> tuple:
+    """ Splits a relative path into interned components, shared by every node that uses them. """
+    return tuple(sys.intern(part) for part in _PATH_SEPARATORS.split(path) if part and part != ".")
+
+class _Tracked:
+    """ A slot-backed node attribute that drops cached XML whenever it is assigned. """
+
+    def __set_name__(self, owner, name):
+        self.slot = f"_{name}"
+
+    def __get__(self, node, owner=None):
+        return self if node is None else getattr(node, self.slot)
+
+    def __set__(self, node, value):
+        setattr(node, self.slot, value)
+        node.mark_dirty()
 
 class FomodEntry:
-    """ Base class representing an entry in the FOMOD structure. """
+    """
+    Base class representing an entry in the FOMOD structure.
+
+    Each node may hold its serialized XML fragment (`FomodXMLWriter(cache_fragments=True)`).
+    Assigning an attribute that shows up in the XML drops the node's fragment and its
+    ancestors' fragments. After editing `groups` / `plugins` lists directly, call
+    `mark_dirty()` on the owner.
+    """
+    __slots__ = ("_name", "parent", "_xml")
+
+    name = _Tracked()
+
     def __init__(self, name: str):
-        self.name = clean_name(name)
+        self.parent = None
+        self._xml = None
+        self.name = sys.intern(clean_name(name))
+
+    def mark_dirty(self):
+        """ Drops the cached XML of this node and every ancestor. """
+        # A cached node always has cached descendants, so the first uncached node ends the walk
+        node = self
+        while node is not None and node._xml is not None:
+            node._xml = None
+            node = node.parent
 
 class Step(FomodEntry):
     """ Represents a FOMOD installation step. """
-    def __init__(self, name: str):
+    __slots__ = ("groups", "_order")
+
+    order = _Tracked()  # Order of the groups in the installer: Explicit, Ascending or Descending
+
+    def __init__(self, name: str, order: str = "Explicit"):
         super().__init__(name)
         self.groups = []
+        self.order = order
 
     def add_group(self, group):
+        group.parent = self
         self.groups.append(group)
+        self.mark_dirty()
 
 class Group(FomodEntry):
     """ Represents a FOMOD group, which holds plugins. """
-    def __init__(self, name: str):
+    __slots__ = ("source_dir", "plugins", "_group_type", "_order")
+
+    group_type = _Tracked()
+    order = _Tracked()  # Order of the plugins in the installer: Explicit, Ascending or Descending
+
+    def __init__(self, name: str, source_dir: str = None, group_type: str = "SelectAny", order: str = "Explicit"):
         super().__init__(name)
+        self.source_dir = source_dir  # Folder the group was parsed from
         self.plugins = []
+        self.group_type = group_type
+        self.order = order
 
     def add_plugin(self, plugin):
+        plugin.parent = self
         self.plugins.append(plugin)
+        self.mark_dirty()
 
 class Plugin(FomodEntry):
-    """ Represents a FOMOD plugin, which contains files. """
+    """
+    Represents a FOMOD plugin, which contains files.
+
+    The path is stored once, as the shared base path plus interned components, and both
+    `absolute_path` and `relative_path` are built from it on access.
+    """
+    __slots__ = ("_base_path", "_parts", "_image_path", "_description", "_type_descriptor")
+
+    image_path = _Tracked()
+    description = _Tracked()
+    type_descriptor = _Tracked()
+
     def __init__(self, name: str, absolute_path: str, base_path: str,
                  image_path: str = None, description: str = None, type_descriptor: str = None):
         super().__init__(name)
+        self._base_path = sys.intern(base_path)
         self.absolute_path = absolute_path  # Full system path
-        self.relative_path = os.path.relpath(absolute_path, base_path).replace("/", "\\")  # Relative path for XML
         self.image_path = image_path  # Optional image path
         self.description = description
         self.type_descriptor = type_descriptor
 
+    @property
+    def absolute_path(self) -> str:
+        """ Full system path. """
+        if not self._parts:
+            return self._base_path
+        path = os.path.join(self._base_path, *self._parts)
+        return os.path.normpath(path) if ".." in self._parts else path
+
+    @absolute_path.setter
+    def absolute_path(self, absolute_path: str):
+        prefix = self._base_path.rstrip(os.sep) + os.sep
+        if absolute_path.startswith(prefix):
+            self._parts = intern_path(absolute_path[len(prefix):])
+        else:
+            self._parts = intern_path(os.path.relpath(absolute_path, self._base_path))
+        self.mark_dirty()
+
+    @property
+    def relative_path(self) -> str:
+        """ Path relative to the mod root, with backslashes, as used in the XML. """
+        return "\\".join(self._parts) or "."
+
+    @relative_path.setter
+    def relative_path(self, relative_path: str):
+        self._parts = intern_path(relative_path.replace("\\", os.sep))
+        self.mark_dirty()
+
+@dataclass
+class ScanDiff:
+    """ Structural changes found by `FomodParser.rescan()`. """
+    added: List[FomodEntry] = field(default_factory=list)
+    removed: List[FomodEntry] = field(default_factory=list)
+    reclassified: List[FomodEntry] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.reclassified)
+
+class ParseEvent(NamedTuple):
+    """ A node found by `FomodParser.iter_parse()`; `kind` is "step", "group" or "plugin". """
+    kind: str
+    node: FomodEntry
+    parent: Optional[FomodEntry]
+
+class LayoutEntry(NamedTuple):
+    """ One folder or file of a FOMOD-ready structure; `source` is None for folders that only exist in the layout. """
+    source: Optional[str]
+    target: str  # Path relative to the output folder
+    is_dir: bool
+
+class SubDir(NamedTuple):
+    """ A sub-directory found while scanning. """
+    name: str
+    path: str
+
+class DirListing(NamedTuple):
+    """ A single directory listing: lowercased entry names and sorted sub-directories. """
+    names: Set[str]
+    subdirs: List[SubDir]
+
+
 class FomodParser:
-    """ Handles directory parsing and structuring for FOMOD. """
-    def __init__(self, root_dir: str):
+    """
+    Handles directory parsing and structuring for FOMOD.
+
+    With `workers` > 1 the top-level folders are scanned concurrently in a thread pool.
+    Results are merged back in sorted order, so the tree is identical to a serial parse.
+    With a `scan_cache`, folders whose mtime is unchanged since the last parse are not listed again.
+    """
+    def __init__(self, root_dir: str, workers: int = 1, scan_cache: ScanCache = None):
         self.root_dir = root_dir
+        self.workers = max(1, workers or 1)
+        self.scan_cache = scan_cache
         self.steps = []
 
     def parse(self):
         """ Parses the given directory into steps, groups, and plugins. """
-        root_name = clean_name(os.path.basename(self.root_dir))
-        root_step = Step(root_name)
+        for _ in self.iter_parse():
+            pass
+
+    def iter_parse(self) -> Iterator[ParseEvent]:
+        """
+        Parses the directory lazily, yielding a `ParseEvent` for every Step, Group and Plugin.
+
+        Events arrive in sorted folder order as soon as each top-level folder is scanned:
+        a step first, then each group followed by its plugins. The parsed tree is also
+        built on `self.steps`, exactly as `parse()` would.
+        """
+        root_step = Step(self._root_name())
+        self.steps.append(root_step)
+        yield ParseEvent("step", root_step, None)
+
+        top_level = [entry.path for entry in self._scan_dir(self.root_dir).subdirs if entry.name.lower() != "fomod"]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if self.workers > 1 and len(top_level) > 1:
+                # map() yields in submission order, which keeps the merge sorted
+                subtrees = executor.map(self._parse_subtree, top_level)
+            else:
+                subtrees = map(self._parse_subtree, top_level)
+
+            for groups in subtrees:
+                for group in groups:
+                    root_step.add_group(group)
+                    yield ParseEvent("group", group, root_step)
+                    for plugin in group.plugins:
+                        yield ParseEvent("plugin", plugin, group)
+
+        if self.scan_cache is not None:
+            self.scan_cache.save()
+
+    def rescan(self) -> ScanDiff:
+        """
+        Re-scans the filesystem and updates the parsed tree in place.
+
+        Groups are matched to their folders, so existing Group and Plugin objects (and the
+        descriptions, images and type descriptors entered on them) are kept. Returns the
+        added, removed and reclassified groups.
+        """
+        return self.apply_scan(self.scan())
+
+    def scan(self) -> List[Step]:
+        """ Parses the filesystem again without touching `self.steps`. """
+        fresh = copy.copy(self)
+        fresh.steps = []
+        fresh.parse()
+        return fresh.steps
+
+    def apply_scan(self, fresh_steps: List[Step]) -> ScanDiff:
+        """ Merges steps returned by `scan()` into `self.steps` and returns what changed. """
+        if not self.steps:
+            self.steps = fresh_steps
+            return ScanDiff(added=[group for step in fresh_steps for group in step.groups])
+
+        diff = ScanDiff()
+        for step, fresh_step in zip(self.steps, fresh_steps):
+            self._merge_groups(step, fresh_step, diff)
+        return diff
+
+    def watch(self, on_diff: Callable[[ScanDiff, ChangeSet], None], debounce: float = 0.5,
+              dispatch: Callable[[Callable], None] = None, use_inotify: bool = True) -> DirectoryWatcher:
+        """
+        Keeps the parsed tree in sync with the mod folder until the returned watcher is stopped.
+
+        After each debounced batch of folder changes the filesystem is re-scanned on the
+        watcher thread. Merging into `self.steps` and calling `on_diff(diff, changes)` go
+        through `dispatch`, so Tk callers can pass `lambda fn: widget.after(0, fn)` to keep
+        both on the main loop. Without `dispatch` they run on the watcher thread.
+        """
+        dispatch = dispatch or (lambda fn: fn())
+
+        def handle_changes(changes: ChangeSet):
+            if not changes.folders_changed:
+                return
+            fresh_steps = self.scan()
+
+            def apply():
+                diff = self.apply_scan(fresh_steps)
+                if diff:
+                    on_diff(diff, changes)
+
+            dispatch(apply)
+
+        watcher = DirectoryWatcher(self.root_dir, handle_changes, debounce=debounce, use_inotify=use_inotify)
+        return watcher.start()
 
-        for item in sorted(os.listdir(self.root_dir)):
-            full_path = os.path.join(self.root_dir, item)
-            if item.lower() == "fomod":
+    @staticmethod
+    def _merge_groups(step: Step, fresh_step: Step, diff: ScanDiff):
+        """ Reconciles a step's groups with a freshly parsed copy of the same step. """
+        existing = {group.source_dir: group for group in step.groups}
+        merged = []
+
+        for fresh_group in fresh_step.groups:
+            group = existing.pop(fresh_group.source_dir, None)
+            if group is None:
+                diff.added.append(fresh_group)
+                merged.append(fresh_group)
                 continue
-            if os.path.isdir(full_path):
-                self.parse_group_or_plugin(root_step, full_path)
 
-        self.steps.append(root_step)
+            old_paths = [plugin.absolute_path for plugin in group.plugins]
+            if old_paths != [plugin.absolute_path for plugin in fresh_group.plugins]:
+                FomodParser._adopt_plugins(group, fresh_group)
+                diff.reclassified.append(group)
+            merged.append(group)
+
+        diff.removed.extend(existing.values())
+        if diff:
+            for group in merged:
+                group.parent = step
+            step.groups[:] = merged
+            step.mark_dirty()
+
+    @staticmethod
+    def _adopt_plugins(group: Group, fresh_group: Group):
+        """ Takes the fresh group's plugins, keeping the existing Plugin objects where names match. """
+        kept = {plugin.name: plugin for plugin in group.plugins}
+        plugins = []
+        for fresh_plugin in fresh_group.plugins:
+            plugin = kept.get(fresh_plugin.name)
+            if plugin is None:
+                plugin = fresh_plugin
+            else:
+                plugin.absolute_path = fresh_plugin.absolute_path
+            plugin.parent = group
+            plugins.append(plugin)
+        group.plugins = plugins
+        group.mark_dirty()
+
+    def _root_name(self) -> str:
+        """ Name of the step created for the mod root. """
+        return clean_name(os.path.basename(self.root_dir))
+
+    def _parse_subtree(self, path: str) -> list:
+        """ Parses one top-level folder into a scratch step and returns its groups. """
+        scratch = Step("")
+        self.parse_group_or_plugin(scratch, path)
+        return scratch.groups
 
     def parse_group_or_plugin(self, step: Step, path: str):
         """ Determines if a directory is a Group or Plugin. """
         folder_name = clean_name(os.path.basename(path))
-        contents = {name.lower() for name in os.listdir(path)}
+        listing = self._scan_dir(path)
+        contents = listing.names
 
         if "data files" in contents:
             # If the folder contains a "Data Files" directory, it's a Plugin
             plugin = Plugin(folder_name, os.path.join(path, "Data Files"), self.root_dir)
-            group = Group(folder_name)  # A plugin must belong to a group
+            group = Group(folder_name, path)  # A plugin must belong to a group
             group.add_plugin(plugin)
 
             if isinstance(step, Step):  # Ensure only Steps can contain groups
@@ -89,7 +388,7 @@ class FomodParser:
         elif contents & MORROWIND_DATA_FOLDERS:
             # If the folder contains Morrowind files but no "Data Files", treat it as a Plugin
             plugin = Plugin(folder_name, path, self.root_dir)
-            group = Group(folder_name)
+            group = Group(folder_name, path)
             group.add_plugin(plugin)
 
             if isinstance(step, Step):  # Only Steps can contain groups
@@ -97,96 +396,562 @@ class FomodParser:
 
         else:
             # Otherwise, it's a Group
-            group = Group(folder_name)
-            for sub_item in sorted(os.listdir(path)):
-                full_sub_path = os.path.join(path, sub_item)
-                if os.path.isdir(full_sub_path):
-                    self.parse_group_or_plugin(group, full_sub_path)  # Ensure we are only adding plugins
+            group = Group(folder_name, path)
+            for entry in listing.subdirs:
+                self.parse_group_or_plugin(group, entry.path)  # Ensure we are only adding plugins
 
             if isinstance(step, Step):  # Only Steps can contain groups
                 step.add_group(group)
 
+    def _scan_dir(self, path: str) -> DirListing:
+        """ Lists a directory, reusing the scan cache when the folder's mtime is unchanged. """
+        if self.scan_cache is None:
+            return self._list_dir(path)
 
+        mtime_ns = os.stat(path).st_mtime_ns
+        cached = self.scan_cache.get(path, mtime_ns)
+        if cached is not None:
+            markers, subdirs = cached
+            return DirListing(set(markers), [SubDir(name, os.path.join(path, name)) for name in subdirs])
 
-class FomodXMLWriter:
-    """ Generates FOMOD XML from parsed structure. """
+        listing = self._list_dir(path)
+        self.scan_cache.put(path, mtime_ns, listing.names & CLASSIFYING_NAMES, [d.name for d in listing.subdirs])
+        return listing
 
-    def __init__(self, steps):
-        self.steps = steps
+    @staticmethod
+    def _list_dir(path: str) -> DirListing:
+        """
+        Lists a directory exactly once with `os.scandir`.
+
+        The lowercased names of every entry are kept for classification, and the
+        sub-directories are kept (sorted by name) for recursion. `DirEntry.is_dir()`
+        answers from the type reported by the directory listing itself, so no
+        per-entry `stat` is needed on filesystems that report it.
+        """
+        names = set()
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                names.add(entry.name.lower())
+                if entry.is_dir():
+                    subdirs.append(SubDir(entry.name, entry.path))
+        subdirs.sort()
+        return DirListing(names, subdirs)
+
+
+class ArchiveIndex:
+    """
+    Folder listing of a .zip or .tar archive, built without extracting anything.
+
+    Zip archives are indexed from the central directory alone. Plain tar archives only
+    need their member headers; compressed tars (.tar.gz, .tar.xz, ...) have to be
+    decompressed once to reach the headers, but no member data is kept.
+    """
+    ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        self.children = {(): {}}  # folder parts -> {entry name: is_dir}
+        for name, is_dir in self._members():
+            self._add(name, is_dir)
+
+    @classmethod
+    def is_archive(cls, path: str) -> bool:
+        return os.path.isfile(path) and path.lower().endswith(cls.ARCHIVE_SUFFIXES)
+
+    @classmethod
+    def strip_suffix(cls, name: str) -> str:
+        """ Removes a known archive suffix from a file name. """
+        for suffix in sorted(cls.ARCHIVE_SUFFIXES, key=len, reverse=True):
+            if name.lower().endswith(suffix):
+                return name[:-len(suffix)]
+        return name
+
+    def _members(self):
+        if zipfile.is_zipfile(self.archive_path):
+            with zipfile.ZipFile(self.archive_path) as zf:
+                for info in zf.infolist():
+                    yield info.filename, info.is_dir()
+        elif tarfile.is_tarfile(self.archive_path):
+            with tarfile.open(self.archive_path, "r:*") as tf:
+                for member in tf:
+                    yield member.name, member.isdir()
+        else:
+            raise ValueError(f"Not a zip or tar archive: {self.archive_path}")
+
+    def _add(self, name: str, is_dir: bool):
+        parts = tuple(part for part in name.replace("\\", "/").split("/") if part and part != ".")
+        if not parts or ".." in parts:
+            return
+        # Zips often omit folder entries, so every parent is registered as a folder
+        for depth in range(len(parts)):
+            folder, entry = parts[:depth], parts[depth]
+            entry_is_dir = is_dir or depth < len(parts) - 1
+            siblings = self.children.setdefault(folder, {})
+            siblings[entry] = siblings.get(entry, False) or entry_is_dir
+            if entry_is_dir:
+                self.children.setdefault(parts[:depth + 1], {})
+
+    def mod_root(self) -> tuple:
+        """
+        The folder holding the mod: a lone top-level folder is treated as a wrapper, unless it
+        is part of the mod itself (fomod, Data Files or a Morrowind data folder).
+        """
+        top = self.children[()]
+        if len(top) == 1:
+            (name, is_dir), = top.items()
+            if is_dir and name.lower() not in CLASSIFYING_NAMES | {"fomod"}:
+                return (name,)
+        return ()
+
+    def listing(self, folder: tuple) -> DirListing:
+        """ Lists an archive folder the same way `FomodParser._list_dir` lists a real one. """
+        entries = self.children.get(folder, {})
+        base = os.path.join(self.archive_path, *folder)
+        subdirs = sorted(SubDir(name, os.path.join(base, name)) for name, is_dir in entries.items() if is_dir)
+        return DirListing({name.lower() for name in entries}, subdirs)
+
+
+class ArchiveFomodParser(FomodParser):
+    """
+    Parses a mod straight from a .zip or .tar archive.
+
+    Nodes get virtual paths below the archive path (`mod.zip/Group/Data Files`), so
+    relative paths in the XML are the same as for the extracted mod. The same
+    "Data Files" and `MORROWIND_DATA_FOLDERS` rules apply; member data is never read.
+    """
+    def __init__(self, archive_path: str):
+        self.index = ArchiveIndex(archive_path)
+        super().__init__(os.path.join(archive_path, *self.index.mod_root()))
+
+    def _root_name(self) -> str:
+        if self.index.mod_root():
+            return super()._root_name()
+        return clean_name(ArchiveIndex.strip_suffix(os.path.basename(self.index.archive_path)))
+
+    def _scan_dir(self, path: str) -> DirListing:
+        relative = path[len(self.index.archive_path):]
+        return self.index.listing(tuple(part for part in _PATH_SEPARATORS.split(relative) if part))
+
+
+def _minidom_escapes():
+    """
+    Probes how `xml.dom.minidom` escapes text and attribute values on this interpreter.
+
+    The streaming writer reproduces minidom's pretty-printed output byte for byte, and
+    minidom's escaping rules changed between Python versions.
+    """
+    document = minidom.Document()
+    text_table, attr_table = {}, {}
+    for char in "&<>\"\n\r\t":
+        element = document.createElement("e")
+        element.setAttribute("a", char)
+        element.appendChild(document.createTextNode(char))
+        attr, text = re.fullmatch(r'<e a="(.*)">(.*)</e>', element.toxml(), re.DOTALL).groups()
+        attr_table[char] = attr
+        text_table[char] = text
+    return str.maketrans(text_table), str.maketrans(attr_table)
+
+_TEXT_ESCAPES, _ATTR_ESCAPES = _minidom_escapes()
+
+
+class _XMLStream:
+    """
+    Writes indented XML element by element, in the layout of `minidom.toprettyxml(indent="  ")`.
+
+    An element's start tag is only finished when its first child arrives, so childless
+    elements collapse to `<tag/>` without buffering anything.
+    """
+    INDENT = "  "
+
+    def __init__(self, fh: TextIO, base_depth: int = 0):
+        self.fh = fh
+        self.base_depth = base_depth  # Indentation of a fragment spliced into an open parent
+        self.stack = []  # [tag, has_children] for every open element
+
+    @property
+    def depth(self) -> int:
+        return len(self.stack)
+
+    def declaration(self):
+        self.fh.write('<?xml version="1.0" ?>\n')
+
+    def open(self, tag: str, **attrs):
+        self._child()
+        self.fh.write(f"{self._indent()}<{tag}{self._attrs(attrs)}")
+        self.stack.append([tag, False])
+
+    def leaf(self, tag: str, **attrs):
+        self._child()
+        self.fh.write(f"{self._indent()}<{tag}{self._attrs(attrs)}/>\n")
+
+    def text(self, tag: str, text: str, **attrs):
+        if not text:
+            self.leaf(tag, **attrs)
+            return
+        self._child()
+        # An XML parser turns CR and CRLF in text into LF, and minidom writes what it parsed
+        text = text.replace("\r\n", "\n").replace("\r", "\n").translate(_TEXT_ESCAPES)
+        self.fh.write(f"{self._indent()}<{tag}{self._attrs(attrs)}>{text}</{tag}>\n")
+
+    def close(self):
+        tag, has_children = self.stack.pop()
+        if has_children:
+            self.fh.write(f"{self._indent()}</{tag}>\n")
+        else:
+            self.fh.write("/>\n")
 
-    def generate_xml(self) -> str:
-        """ Generates and returns the XML content as a formatted string. """
-        fomod_root = self._create_root_element()
-        install_steps = self._create_install_steps(fomod_root, self.steps)
+    def close_to(self, depth: int):
+        while self.depth > depth:
+            self.close()
 
-        for step in self.steps:
-            self._add_step(install_steps, step)
+    def fragment(self, xml: str):
+        """ Splices an already serialized child element into the open element. """
+        self._child()
+        self.fh.write(xml)
 
-        return self._format_xml(fomod_root)
+    def _indent(self) -> str:
+        return self.INDENT * (self.base_depth + self.depth)
 
-    @staticmethod
-    def _create_root_element() -> ET.Element:
-        """ Creates the root config element with XML schema. """
-        return ET.Element("config", {
-            "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
-            "xsi:noNamespaceSchemaLocation": "http://qconsulting.ca/fo3/ModConfig5.0.xsd"
-        })
+    def _child(self):
+        if self.stack and not self.stack[-1][1]:
+            self.fh.write(">\n")
+            self.stack[-1][1] = True
 
     @staticmethod
-    def _create_install_steps(root: ET.Element, steps) -> ET.Element:
-        """ Adds the <installSteps> element to the root config. """
-        module_name = ET.SubElement(root, "moduleName")
-        module_name.text = steps[0].name if steps else "Unnamed Mod"
-        return ET.SubElement(root, "installSteps", order="Explicit")
+    def _attrs(attrs: dict) -> str:
+        return "".join(f' {name.replace("__", ":")}="{value.translate(_ATTR_ESCAPES)}"' for name, value in attrs.items())
 
-    @staticmethod
-    def _add_step(parent: ET.Element, step) -> None:
-        """ Adds an install step element to the parent. """
-        step_element = ET.SubElement(parent, "installStep", name=step.name)
-        file_groups = ET.SubElement(step_element, "optionalFileGroups", order="Explicit")
 
-        for group in step.groups:
-            FomodXMLWriter._add_group(file_groups, group)
+class FomodXMLWriter:
+    """
+    Generates FOMOD XML from parsed structure.
 
-    @staticmethod
-    def _add_group(parent: ET.Element, group) -> None:
-        """ Adds a group element to the parent. """
-        group_element = ET.SubElement(parent, "group", name=group.name, type="SelectAny")
-        plugins = ET.SubElement(group_element, "plugins", order="Explicit")
+    The XML is streamed element by element, so writing to a file keeps memory flat no
+    matter how many plugins there are. With `cache_fragments`, every Step, Group and Plugin
+    keeps its serialized fragment instead; after an edit only the dirty nodes are
+    serialized again and the cached fragments are spliced back together.
+    """
 
-        for plugin in group.plugins:
-            FomodXMLWriter._add_plugin(plugins, plugin)
+    SCHEMA_LOCATION = "http://qconsulting.ca/fo3/ModConfig5.0.xsd"
 
-    @staticmethod
-    def _add_plugin(parent: ET.Element, plugin) -> None:
-        """ Adds a plugin element to the parent. """
-        plugin_element = ET.SubElement(parent, "plugin", name=plugin.name)
+    # Indentation depth of each node's element inside <config><installSteps>...
+    STEP_DEPTH, GROUP_DEPTH, PLUGIN_DEPTH = 2, 4, 6
 
-        if plugin.image_path:
-            ET.SubElement(plugin_element, "image", path=plugin.image_path.replace("/", "\\"))
+    def __init__(self, steps, cache_fragments: bool = False, module_name: str = None,
+                 module_name_attrs: dict = None, install_order: str = "Explicit"):
+        self.steps = steps
+        self.cache_fragments = cache_fragments
+        self.module_name = module_name  # Defaults to the first step's name
+        self.module_name_attrs = module_name_attrs or {}  # e.g. position / colour of an imported config
+        self.install_order = install_order  # Order of the steps
 
-        description = ET.SubElement(plugin_element, "description")
-        description.text = plugin.description or "Auto-generated description."
+    def generate_xml(self) -> str:
+        """ Generates and returns the XML content as a formatted string. """
+        buffer = io.StringIO()
+        self.write_xml(buffer)
+        return buffer.getvalue()
+
+    def write_xml(self, fh: TextIO) -> None:
+        """ Streams the XML for `self.steps` to a text file handle. """
+        if not self.cache_fragments:
+            self.write_events(fh, self._events(self.steps), self.module_name, config=self)
+            return
+
+        stream = _XMLStream(fh)
+        self._open_config(stream, self.module_name or (self.steps[0].name if self.steps else "Unnamed Mod"),
+                          self.module_name_attrs, self.install_order)
+        for step in self.steps:
+            stream.fragment(self._step_fragment(step))
+        stream.close_to(0)
+
+    @classmethod
+    def _step_fragment(cls, step) -> str:
+        if step._xml is None:
+            stream = _XMLStream(io.StringIO(), cls.STEP_DEPTH)
+            stream.open("installStep", name=step.name)
+            stream.open("optionalFileGroups", order=step.order)
+            for group in step.groups:
+                stream.fragment(cls._group_fragment(group))
+            stream.close_to(0)
+            step._xml = stream.fh.getvalue()
+        return step._xml
+
+    @classmethod
+    def _group_fragment(cls, group) -> str:
+        if group._xml is None:
+            stream = _XMLStream(io.StringIO(), cls.GROUP_DEPTH)
+            stream.open("group", name=group.name, type=group.group_type)
+            stream.open("plugins", order=group.order)
+            for plugin in group.plugins:
+                stream.fragment(cls._plugin_fragment(plugin))
+            stream.close_to(0)
+            group._xml = stream.fh.getvalue()
+        return group._xml
+
+    @classmethod
+    def _plugin_fragment(cls, plugin) -> str:
+        if plugin._xml is None:
+            stream = _XMLStream(io.StringIO(), cls.PLUGIN_DEPTH)
+            cls._write_plugin(stream, plugin)
+            plugin._xml = stream.fh.getvalue()
+        return plugin._xml
+
+    @classmethod
+    def write_events(cls, fh: TextIO, events: Iterable[ParseEvent], module_name: str = None, config=None) -> None:
+        """
+        Streams the XML for a sequence of parse events, e.g. straight from `FomodParser.iter_parse()`.
+
+        Each plugin is written as soon as its event arrives. `config` may supply the
+        config-level `module_name_attrs` and `install_order`; they are read when the first
+        event arrives, so the `FomodXMLReader` producing the events can be passed.
+        """
+        stream = _XMLStream(fh)
+
+        def open_config(name):
+            name = module_name or getattr(config, "module_name", None) or name
+            cls._open_config(stream, name, getattr(config, "module_name_attrs", None),
+                             getattr(config, "install_order", "Explicit"))
+
+        for event in events:
+            if not stream.depth:
+                open_config(event.node.name)
+            if event.kind == "step":
+                stream.close_to(2)
+                stream.open("installStep", name=event.node.name)
+                stream.open("optionalFileGroups", order=event.node.order)
+            elif event.kind == "group":
+                stream.close_to(4)
+                stream.open("group", name=event.node.name, type=event.node.group_type)
+                stream.open("plugins", order=event.node.order)
+            elif event.kind == "plugin":
+                stream.close_to(6)
+                cls._write_plugin(stream, event.node)
+
+        if not stream.depth:
+            open_config("Unnamed Mod")
+        stream.close_to(0)
 
-        files = ET.SubElement(plugin_element, "files")
-        ET.SubElement(files, "folder", source=plugin.relative_path, destination="\\", priority="0")
+    @staticmethod
+    def _events(steps) -> Iterator[ParseEvent]:
+        """ Walks parsed steps in the same order `FomodParser.iter_parse()` yields them. """
+        for step in steps:
+            yield ParseEvent("step", step, None)
+            for group in step.groups:
+                yield ParseEvent("group", group, step)
+                for plugin in group.plugins:
+                    yield ParseEvent("plugin", plugin, group)
+
+    @classmethod
+    def _open_config(cls, stream: _XMLStream, module_name: str, module_name_attrs: dict = None,
+                     install_order: str = "Explicit") -> None:
+        """ Writes the declaration, the root config element and <moduleName>, and opens <installSteps>. """
+        stream.declaration()
+        stream.open("config", **{
+            "xmlns__xsi": "http://www.w3.org/2001/XMLSchema-instance",
+            "xsi__noNamespaceSchemaLocation": cls.SCHEMA_LOCATION,
+        })
+        stream.text("moduleName", module_name, **(module_name_attrs or {}))
+        stream.open("installSteps", order=install_order)
 
-        type_descriptor = ET.SubElement(plugin_element, "typeDescriptor")
-        ET.SubElement(type_descriptor, "type", name=plugin.type_descriptor or "Optional")
+    @staticmethod
+    def _write_plugin(stream: _XMLStream, plugin) -> None:
+        """ Writes a complete plugin element. """
+        stream.open("plugin", name=plugin.name)
+        stream.text("description", plugin.description or "Auto-generated description.")
+
+        if plugin.image_path:  # The schema puts <image> after <description>
+            stream.leaf("image", path=plugin.image_path.replace("/", "\\"))
+
+        stream.open("files")
+        stream.leaf("folder", source=plugin.relative_path, destination="\\", priority="0")
+        stream.close()
+
+        stream.open("typeDescriptor")
+        stream.leaf("type", name=plugin.type_descriptor or "Optional")
+        stream.close()
+
+        stream.close()
+
+
+class FomodXMLReader:
+    """
+    Imports an existing ModuleConfig.xml into Steps, Groups and Plugins.
+
+    The file is read with `ElementTree.iterparse`. Each plugin is converted when its end tag
+    arrives and then dropped from the element tree, so memory stays flat on large configs.
+    Plugin paths are resolved against `base_path`, the mod folder holding `fomod/`.
+    Names are kept as written; they are not cleaned like folder names.
+
+    Only what the node model holds is imported: the `order` of steps, groups and plugins
+    (the schema default "Ascending" where it is missing), the <moduleName> attributes, and
+    each plugin's first source folder, description, image and type. Everything else (conditions, extra files, destinations,
+    required files, ...) is listed in `dropped`, so callers can warn or refuse.
+    """
+    NODE_TAGS = {"installStep", "group", "plugin"}
+    DEFAULT_ORDER = "Ascending"  # The schema's default for a missing order attribute
+    # Children of <config> the model has no place for
+    UNSUPPORTED_CONFIG_TAGS = {"moduleImage", "moduleDependencies", "requiredInstallFiles", "conditionalFileInstalls"}
+
+    def __init__(self, source, base_path: str = None):
+        self.source = source  # File path or binary file object
+        if base_path is None:
+            base_path = os.path.dirname(os.path.dirname(os.path.abspath(source))) if isinstance(source, str) else os.getcwd()
+        self.base_path = base_path
+        self.module_name = None
+        self.module_name_attrs = {}  # position / colour of <moduleName>
+        self.install_order = "Explicit"
+        self.steps = []
+        self.dropped = []  # Descriptions of the content that was not imported
+
+    def read(self) -> List[Step]:
+        """ Reads the whole file and returns its steps. """
+        for _ in self.iter_read():
+            pass
+        return self.steps
+
+    def iter_read(self) -> Iterator[ParseEvent]:
+        """
+        Yields a ParseEvent for each step, group and plugin, in document order.
+
+        The events have the same shape as `FomodParser.iter_parse()`, so they can be passed
+        straight to `FomodXMLWriter.write_events()` (with `config=reader`). A step or group
+        event arrives once its order is known, at its <optionalFileGroups> / <plugins>.
+        """
+        self.steps = []
+        self.dropped = []
+        step = group = None
+        pending = None  # Step or group whose event waits for its order
+        elements = []  # Open elements, root first
+        for event, elem in ET.iterparse(self.source, events=("start", "end")):
+            parent = elements[-1].tag if elements else None
+            if event == "start":
+                elements.append(elem)
+                if elem.tag == "installSteps" and parent == "config":
+                    self.install_order = elem.get("order", self.DEFAULT_ORDER)
+                elif elem.tag == "installStep":
+                    step = self._named(Step("", order=self.DEFAULT_ORDER), elem)
+                    group = None
+                    self.steps.append(step)
+                    pending = ParseEvent("step", step, None)
+                elif elem.tag == "optionalFileGroups" and parent == "installStep" and step is not None:
+                    step.order = elem.get("order", self.DEFAULT_ORDER)
+                elif elem.tag == "group" and step is not None:
+                    group = self._named(Group("", group_type=elem.get("type", "SelectAny"), order=self.DEFAULT_ORDER),
+                                        elem)
+                    step.add_group(group)
+                    pending = ParseEvent("group", group, step)
+                elif elem.tag == "plugins" and parent == "group" and group is not None:
+                    group.order = elem.get("order", self.DEFAULT_ORDER)
+                if pending is not None and elem.tag in ("optionalFileGroups", "plugins"):
+                    yield pending
+                    pending = None
+                continue
+
+            if pending is not None and elem.tag in ("installStep", "group"):
+                yield pending  # Had no <optionalFileGroups> / <plugins>
+                pending = None
+            elements.pop()
+            if len(elements) == 1 and elem.tag in self.UNSUPPORTED_CONFIG_TAGS:
+                self.dropped.append(f"<{elem.tag}>")
+                elements[-1].remove(elem)
+            elif elem.tag == "moduleName" and len(elements) == 1:
+                self.module_name = (elem.text or "").strip()
+                self.module_name_attrs = dict(elem.attrib)
+            elif elem.tag == "visible" and elements and elements[-1].tag == "installStep":
+                self.dropped.append(f"visibility conditions of step '{step.name}'")
+            elif elem.tag == "plugin" and group is not None:
+                plugin = self._plugin(elem)
+                group.add_plugin(plugin)
+                yield ParseEvent("plugin", plugin, group)
+            if elem.tag in self.NODE_TAGS and elements:
+                elements[-1].remove(elem)  # Done with it; keep the tree from growing
 
     @staticmethod
-    def _format_xml(root: ET.Element) -> str:
-        """ Converts an XML tree to a pretty-formatted string. """
-        return parseString(ET.tostring(root, encoding="utf-8")).toprettyxml(indent="  ")
+    def _named(node, elem):
+        node.name = sys.intern(elem.get("name", ""))
+        return node
+
+    def _plugin(self, elem) -> Plugin:
+        """ Builds a Plugin from a complete <plugin> element, noting in `dropped` what it cannot hold. """
+        name = elem.get("name", "")
+        source = ""
+        files = elem.find("files")
+        entries = list(files) if files is not None else []
+        if entries:
+            entry = entries[0]
+            source = entry.get("source", "")
+            if entry.tag != "folder":
+                self.dropped.append(f"<{entry.tag}> source '{source}' of plugin '{name}' (imported as a folder)")
+            if entry.get("destination", "") not in ("", "\\") or entry.get("priority", "0") != "0":
+                self.dropped.append(f"destination and priority of '{source}' in plugin '{name}'")
+            if len(entries) > 1:
+                self.dropped.append(f"{len(entries) - 1} more file(s) of plugin '{name}'")
+        if elem.find("conditionFlags") is not None:
+            self.dropped.append(f"condition flags of plugin '{name}'")
+        if elem.find("typeDescriptor/dependencyType/patterns/pattern") is not None:
+            self.dropped.append(f"type patterns of plugin '{name}' (its default type is kept)")
+
+        type_elem = elem.find("typeDescriptor/type")
+        if type_elem is None:
+            type_elem = elem.find("typeDescriptor/dependencyType/defaultType")
+        image = elem.find("image")
+
+        plugin = self._named(Plugin("", self.base_path, self.base_path,
+                                    image_path=image.get("path") if image is not None else None,
+                                    description=elem.findtext("description"),
+                                    type_descriptor=type_elem.get("name") if type_elem is not None else None), elem)
+        plugin.relative_path = source
+        return plugin
+
+
+class _HashingWriter(io.RawIOBase):
+    """ Raw binary sink that hashes everything written through it to an open file. """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+
+def _file_digest(path: str, expected_size: int = None) -> Optional[bytes]:
+    """ SHA-256 of a file, or None if it is missing or (when given) not `expected_size` bytes long. """
+    try:
+        if expected_size is not None and os.path.getsize(path) != expected_size:
+            return None
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.digest()
+    except FileNotFoundError:
+        return None
 
 
 class FomodFileManager:
     """ Handles file operations related to FOMOD, ensuring non-destructive modifications. """
 
-    def __init__(self, root_dir: str, output_dir: str = None, keep_existing_output: bool = True):
+    def __init__(self, root_dir: str, output_dir: str = None, keep_existing_output: bool = True,
+                 link_mode: str = "auto", archive_options: ArchiveOptions = None):
+        if link_mode not in LINK_MODES:
+            raise ValueError(f"Unknown link mode: {link_mode} (expected one of {', '.join(LINK_MODES)})")
         self.root_dir = root_dir
-        self.mod_name = os.path.basename(os.path.normpath(root_dir))
+        self.mod_name = ArchiveIndex.strip_suffix(os.path.basename(os.path.normpath(root_dir)))
         self.keep_existing_output = keep_existing_output
+        self.link_mode = link_mode
+        self.archive_options = archive_options or ArchiveOptions()
+        self.build_cache = None  # BuildCache for reproducible archives; the one under CONFIG_DIR if None
+        self.archive_record = None  # JSON file naming the last incremental zip; one under CONFIG_DIR if None
+        self.placed = {}  # "reflinked" / "hardlinked" / "copied" -> files placed that way by the last structure run
+        self._try_reflink = self._try_hardlink = False
 
         # Define output location, with versioning if needed
         base_output_dir = output_dir or os.path.join(os.path.dirname(root_dir), "fomod_output")
@@ -194,6 +959,7 @@ class FomodFileManager:
 
         self.fomod_dir = os.path.join(self.output_dir, "fomod")
         self.fomod_config_path = os.path.join(self.fomod_dir, "ModuleConfig.xml")
+        self.skipped_writes = 0  # Writes that found identical content already on disk
 
         os.makedirs(self.fomod_dir, exist_ok=True)
 
@@ -206,95 +972,472 @@ class FomodFileManager:
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M__%S")
         return os.path.join(base_output_dir, f"{self.mod_name}_{timestamp}")
 
-    def write_fomod_config(self, xml_content: str):
-        """ Writes the generated XML content to the FOMOD configuration file. """
-        with open(self.fomod_config_path, "w", encoding="utf-8") as f:
-            f.write(xml_content)
+    def write_fomod_config(self, xml_content: str) -> bool:
+        """ Writes the generated XML content to the FOMOD configuration file. Returns False if it was unchanged. """
+        return self.stream_fomod_config(lambda f: f.write(xml_content))
+
+    def stream_fomod_config(self, write: Callable[[TextIO], None]) -> bool:
+        """
+        Lets `write` stream the XML into the FOMOD configuration file.
+
+        The XML goes to a temp file that replaces the config with `os.replace`, so an
+        interrupted write never leaves a truncated file. If the content hash matches the
+        existing file, the file is left alone (keeping its mtime) and False is returned.
+        """
+        tmp_path = f"{self.fomod_config_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as raw:
+                hashing = _HashingWriter(raw)
+                # Reproducible builds use "\n" everywhere, so the config is byte-identical across platforms
+                newline = "\n" if self.archive_options.reproducible else None
+                with io.TextIOWrapper(io.BufferedWriter(hashing), encoding="utf-8", newline=newline) as f:
+                    write(f)
+            if hashing.digest.digest() == _file_digest(self.fomod_config_path, hashing.size):
+                os.remove(tmp_path)
+                self.skipped_writes += 1
+                return False
+            os.replace(tmp_path, self.fomod_config_path)
+            return True
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     def generate_new_structure(self):
-        """ Creates a FOMOD-ready workspace without modifying the original files. """
-        if not self.keep_existing_output and os.path.exists(self.output_dir):
-            shutil.rmtree(self.output_dir)  # Remove old output if overwriting
-        shutil.copytree(self.root_dir, self.output_dir)
-
-        # Ensure 'Data Files' is inside every plugin
-        for root, dirs, files in os.walk(self.output_dir):
-            if any(d.lower() in MORROWIND_DATA_FOLDERS for d in dirs) and "Data Files" not in dirs:
-                data_files_path = os.path.join(root, "Data Files")
-                os.makedirs(data_files_path, exist_ok=True)
-                for d in dirs:
-                    if d.lower() in MORROWIND_DATA_FOLDERS:
-                        shutil.move(os.path.join(root, d), os.path.join(data_files_path, d))
-
-    def generate_archive(self, user_version: str = None):
-        """ Creates a zip archive of the structured mod. """
-        base_zip_name = self.mod_name
+        """
+        Creates a FOMOD-ready workspace without modifying the original files.
+
+        Files are reflinked or hardlinked into the output instead of copied (see `link_mode`),
+        so even large texture packs are placed almost instantly; copies are only made where
+        links are impossible, e.g. across devices. Reflinks are independent copy-on-write
+        files; hardlinks share data with the source, which is safe here because PHOMOD only
+        ever replaces output files, never edits them in place. Each file is placed once, at the
+        path `plan_structure()` gives it. The output folder is cleared first, except for the
+        generated ModuleConfig.xml.
+        """
+        self._clear_output()
+        self.placed = {}
+        same_device = os.stat(self.root_dir).st_dev == os.stat(self.output_dir).st_dev
+        self._try_reflink = same_device and fcntl is not None and self.link_mode in ("auto", "reflink")
+        self._try_hardlink = same_device and self.link_mode in ("auto", "hardlink")
+        for entry in self.plan_structure():
+            target = os.path.join(self.output_dir, entry.target)
+            if entry.is_dir:
+                os.makedirs(target, exist_ok=True)
+            else:
+                self._place_file(entry.source, target)
+
+    def plan_structure(self) -> Iterator[LayoutEntry]:
+        """
+        Yields every folder and file of the FOMOD-ready structure from a single walk of the mod.
+
+        'Data Files' is inserted wherever Morrowind data folders (meshes, textures, ...) sit
+        next to each other without one, so every file is placed straight at its final path.
+        Folders come before their contents. PHOMOD's own outputs inside the mod (see
+        `output_dirs()`) and the mod's own fomod/ModuleConfig.xml (replaced by the generated
+        one) are left out.
+        """
+        yield from self._plan_dir(self.root_dir, "", False, self.output_dirs())
+
+    @property
+    def archive_dir(self) -> str:
+        """ Folder the archives are written to: the parent of the output folder. """
+        return os.path.dirname(self.output_dir)
+
+    def output_dirs(self) -> Set[str]:
+        """
+        Absolute paths of the folders PHOMOD writes into: the output folder, plus the archive
+        folder when it lies inside the mod (e.g. `--output <mod>/dist`), so earlier archives
+        are never packed or placed into the structure.
+        """
+        root = os.path.abspath(self.root_dir)
+        archive_dir = os.path.abspath(self.archive_dir)
+        dirs = {os.path.abspath(self.output_dir)}
+        if archive_dir.startswith(root + os.sep):
+            dirs.add(archive_dir)
+        return dirs
+
+    def _plan_dir(self, source_dir: str, target_dir: str, verbatim: bool, skipped: Set[str]) -> Iterator[LayoutEntry]:
+        """ Plans one source folder; `verbatim` folders (inside a 'Data Files') are mirrored as they are. """
+        with os.scandir(source_dir) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        folders = {entry.name.lower() for entry in entries if entry.is_dir()}
+        insert_data_files = not verbatim and bool(folders & MORROWIND_DATA_FOLDERS) and "data files" not in folders
+        if insert_data_files:
+            yield LayoutEntry(None, os.path.join(target_dir, "Data Files"), True)
+
+        for entry in entries:
+            if entry.is_dir():
+                if os.path.abspath(entry.path) in skipped:
+                    continue
+                lowered = entry.name.lower()
+                if insert_data_files and lowered in MORROWIND_DATA_FOLDERS:
+                    target = os.path.join(target_dir, "Data Files", entry.name)
+                    is_verbatim = True
+                else:
+                    target = os.path.join(target_dir, entry.name)
+                    is_verbatim = verbatim or lowered == "data files"
+                yield LayoutEntry(entry.path, target, True)
+                yield from self._plan_dir(entry.path, target, is_verbatim, skipped)
+            else:
+                target = os.path.join(target_dir, entry.name)
+                if target != _GENERATED_CONFIG:
+                    yield LayoutEntry(entry.path, target, False)
+
+    def _clear_output(self):
+        """ Empties the output folder of a previous structure, keeping the generated ModuleConfig.xml. """
+        if not os.path.isdir(self.output_dir):
+            return
+        for entry in os.scandir(self.output_dir):
+            if entry.name == "fomod" and entry.is_dir(follow_symlinks=False):
+                for fomod_entry in os.scandir(entry.path):
+                    if fomod_entry.path != self.fomod_config_path:
+                        self._remove(fomod_entry)
+            else:
+                self._remove(entry)
+
+    @staticmethod
+    def _remove(entry: os.DirEntry):
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path)
+        else:
+            os.remove(entry.path)
+
+    def _place_file(self, src: str, dst: str) -> str:
+        """ Reflinks, hardlinks or copies `src` to `dst` according to `link_mode`. """
+        if self._try_reflink and self._reflink(src, dst):
+            method = "reflinked"
+        elif self._try_hardlink and self._hardlink(src, dst):
+            method = "hardlinked"
+        else:
+            shutil.copy2(src, dst)
+            method = "copied"
+        self.placed[method] = self.placed.get(method, 0) + 1
+        return dst
+
+    def _reflink(self, src: str, dst: str) -> bool:
+        """ Clones `src` with FICLONE; False (and no `dst`) if the filesystem cannot. """
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError as e:
+            if os.path.exists(dst):
+                os.remove(dst)
+            if e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS):
+                self._try_reflink = False  # Same filesystem for the rest of the tree
+            elif e.errno != errno.EXDEV:
+                raise
+            return False
+        shutil.copystat(src, dst)
+        return True
+
+    def _hardlink(self, src: str, dst: str) -> bool:
+        """ Hardlinks `src` to `dst`; False if they are on different devices or links are not supported. """
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            if e.errno in (errno.EPERM, errno.ENOTSUP):
+                self._try_hardlink = False
+            elif e.errno not in (errno.EXDEV, errno.EMLINK):
+                raise
+            return False
+        return True
+
+    def archive_layout(self, exclude: Iterable[str] = ()) -> List[Tuple[str, str]]:
+        """
+        Maps each file of the FOMOD-ready structure to its archive path, without creating it on disk.
+
+        Uses the same plan as `generate_new_structure()` (including 'Data Files' insertion)
+        and adds the generated fomod/ModuleConfig.xml. Archive paths use "/" separators.
+        Files in `exclude` (e.g. the archive being written) are left out.
+        """
+        excluded = {os.path.abspath(path) for path in exclude}
+        layout = [(entry.source, entry.target.replace(os.sep, "/")) for entry in self.plan_structure()
+                  if not entry.is_dir and os.path.abspath(entry.source) not in excluded]
+        if os.path.exists(self.fomod_config_path):
+            layout.append((self.fomod_config_path, _GENERATED_CONFIG.replace(os.sep, "/")))
+        return layout
+
+    def _archive_record_path(self) -> str:
+        """ Record of the last incremental zip, kept per mod and archive folder under the user config dir. """
+        if self.archive_record:
+            return self.archive_record
+        from config.phomod_config import CONFIG_DIR
+        key = hashlib.sha1(f"{os.path.abspath(self.root_dir)}\0{os.path.abspath(self.archive_dir)}".encode("utf-8"))
+        return os.path.join(str(CONFIG_DIR), "archive_records", f"{key.hexdigest()}.json")
+
+    def previous_archive(self) -> Optional[str]:
+        """ The zip this mod last built incrementally into the archive folder, if it still exists. """
+        record_path = self._archive_record_path()
+        try:
+            with open(record_path, "r", encoding="utf-8") as f:
+                archive_path = json.load(f).get("archive")
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, OSError, AttributeError) as e:
+            print(f"⚠️ Ignoring unreadable archive record {record_path}: {e}")
+            return None
+        if isinstance(archive_path, str) and archive_path.endswith(".zip") and os.path.isfile(archive_path):
+            return archive_path
+        return None
+
+    def _record_archive(self, archive_path: str):
+        """ Remembers `archive_path` as the zip the next incremental build reuses members from. """
+        record_path = self._archive_record_path()
+        try:
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            tmp_path = f"{record_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"archive": os.path.abspath(archive_path)}, f)
+            os.replace(tmp_path, record_path)
+        except OSError as e:
+            print(f"⚠️ Failed to record {archive_path} for incremental builds: {e}")
+
+    def generate_archive(self, user_version: str = None) -> str:
+        """
+        Creates an archive of the structured mod straight from the mod folder and returns its path.
+        The archive is a zip by default, or a solid tar.xz/tar.zst (`archive_options.format`);
+        either way it is compressed in parallel (see `fomod_archive`). In incremental mode,
+        unchanged files are copied from the zip this mod last built incrementally. In reproducible mode, an
+        archive built before from identical inputs is taken from the build cache instead.
+        """
+        base_name = self.mod_name
         if user_version:
-            base_zip_name += f"_{user_version}"
+            base_name += f"_{user_version}"
         elif self.keep_existing_output:
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M")
-            base_zip_name += f"_{timestamp}"
-
-        zip_path = os.path.join(os.path.dirname(self.output_dir), f"{base_zip_name}.zip")
-
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, _, files in os.walk(self.output_dir):
-                for file in files:
-                    abs_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(abs_path, self.output_dir)
-                    zipf.write(abs_path, rel_path)
-        print(f"✅ Archive created: {zip_path}")
+            base_name += f"_{timestamp}"
+
+        packer = archive_packer(self.archive_options)
+        archive_path = os.path.join(self.archive_dir, f"{base_name}{packer.extension}")
+
+        layout = self.archive_layout(exclude=[archive_path])
+        cache = cache_key = None
+        if self.archive_options.reproducible and self.archive_options.build_cache:
+            cache = self.build_cache or BuildCache.default()
+            cache_key = cache.key(layout, self.archive_options.cache_token())
+            cache.save()
+            if cache.fetch(cache_key, archive_path):
+                print(f"✅ Archive unchanged, taken from the build cache: {archive_path}")
+                return archive_path
+
+        options = self.archive_options
+        incremental = options.incremental and options.format == "zip" and not options.reproducible
+        previous = self.previous_archive() if incremental else None
+        stats = packer.pack(layout, archive_path, previous)
+        if cache is not None:
+            cache.store(cache_key, archive_path)
+        if incremental:
+            self._record_archive(archive_path)
+        methods = ", ".join(f"{count} {method}" for method, count in sorted(stats.methods.items()))
+        reused = f"{stats.reused} reused from {os.path.basename(previous)}; " if previous else ""
+        print(f"✅ Archive created: {archive_path} ({stats.members} file(s): {methods or 'none'}; {reused}"
+              f"{stats.size / 1e6:.1f} MB -> {stats.compressed_size / 1e6:.1f} MB, "
+              f"{packer.options.thread_count()} thread(s))")
+        return archive_path
 
 
 class FomodManager:
     """ Orchestrates parsing, XML generation, structure validation, and packaging. """
 
-    def __init__(self, root_dir: str, output_dir: str = None, keep_existing_output: bool = True):
-        self.parser = FomodParser(root_dir)
+    def __init__(self, root_dir: str, output_dir: str = None, keep_existing_output: bool = True,
+                 scan_workers: int = 1, use_scan_cache: bool = False, link_mode: str = "auto",
+                 archive_options: ArchiveOptions = None):
+        if ArchiveIndex.is_archive(root_dir):
+            self.parser = ArchiveFomodParser(root_dir)
+        else:
+            scan_cache = ScanCache.for_project(root_dir) if use_scan_cache else None
+            self.parser = FomodParser(root_dir, workers=scan_workers, scan_cache=scan_cache)
         self.xml_writer = None
-        self.file_manager = FomodFileManager(root_dir, output_dir, keep_existing_output)
+        self.module_name = None  # Taken from an imported ModuleConfig.xml
+        self.module_name_attrs = {}  # Likewise, with the order of its steps
+        self.install_order = "Explicit"
+        self.imported_xml = None  # Path of the imported ModuleConfig.xml, which replaces folder parsing
+        self.validation_errors = []
+        self.timings = {}  # Step name -> seconds, from the last run
+        self.file_manager = FomodFileManager(root_dir, output_dir, keep_existing_output, link_mode, archive_options)
+
+    @contextmanager
+    def _timed(self, step: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[step] = time.perf_counter() - start
+
+    def timing_summary(self) -> str:
+        """ One line with the duration of each step of the last run and the skipped writes. """
+        steps = ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in self.timings.items())
+        return f"{steps}; {self.file_manager.skipped_writes} unchanged write(s) skipped"
 
     def parse_fomod(self):
-        """ Parses the FOMOD structure. """
-        self.parser.parse()
+        """
+        Parses the FOMOD structure; later calls rescan, keeping the existing nodes.
+        After `import_xml()` the imported steps are kept: the folders are not parsed again.
+        """
+        if self.imported_xml is not None:
+            return
+        if self.parser.steps:
+            self.parser.rescan()
+        else:
+            self.parser.parse()
+
+    def import_xml(self, xml_path: str = None, strict: bool = False):
+        """
+        Loads an existing ModuleConfig.xml (default: the mod's own) in place of a folder parse.
+
+        Content the node model cannot hold (see `FomodXMLReader.dropped`) is reported, or with
+        `strict` refused with a ValueError before anything is replaced.
+        """
+        xml_path = xml_path or os.path.join(self.parser.root_dir, "fomod", "ModuleConfig.xml")
+        reader = FomodXMLReader(xml_path, self.parser.root_dir)
+        steps = reader.read()
+        if reader.dropped:
+            if strict:
+                raise ValueError(f"{xml_path} has content PHOMOD cannot keep: {'; '.join(reader.dropped)}")
+            print(f"⚠️ Not imported from {xml_path} ({len(reader.dropped)} item(s)):")
+            for dropped in reader.dropped:
+                print(f"  - {dropped}")
+        self.parser.steps = steps
+        self.module_name = reader.module_name
+        self.module_name_attrs = reader.module_name_attrs
+        self.install_order = reader.install_order
+        self.imported_xml = xml_path
+        return self.parser.steps
 
     def generate_xml(self):
         """ Generates XML from parsed data. """
         if not self.parser.steps:
             raise ValueError("Cannot generate XML: No parsed steps available.")
-        self.xml_writer = FomodXMLWriter(self.parser.steps)
+        self.xml_writer = FomodXMLWriter(self.parser.steps, module_name=self.module_name,
+                                         module_name_attrs=self.module_name_attrs, install_order=self.install_order)
         return self.xml_writer.generate_xml()
 
-    def save_xml(self, xml_content: str):
-        """ Saves the generated XML to the FOMOD directory. """
-        self.file_manager.write_fomod_config(xml_content)
+    def save_xml(self, xml_content: str) -> bool:
+        """ Saves the generated XML to the FOMOD directory. Returns False if the file was unchanged. """
+        return self.file_manager.write_fomod_config(xml_content)
+
+    def write_xml(self) -> bool:
+        """ Streams XML for the parsed data straight into the FOMOD directory. Returns False if the file was unchanged. """
+        if not self.parser.steps:
+            raise ValueError("Cannot generate XML: No parsed steps available.")
+        self.xml_writer = FomodXMLWriter(self.parser.steps, module_name=self.module_name,
+                                         module_name_attrs=self.module_name_attrs, install_order=self.install_order)
+        return self.file_manager.stream_fomod_config(self.xml_writer.write_xml)
+
+    def validate_xml(self) -> List[SchemaError]:
+        """ Checks the written ModuleConfig.xml against the bundled ModConfig5.0.xsd. """
+        errors = get_validator().validate_file(self.file_manager.fomod_config_path)
+        if errors:
+            print(f"⚠️ ModuleConfig.xml does not match ModConfig5.0.xsd ({len(errors)} problem(s)):")
+            for error in errors:
+                print(f"   {error}")
+        return errors
 
     def generate_new_structure(self):
         """ Creates a properly structured workspace for FOMOD packaging. """
+        self._require_folder("Generating a new structure")
         self.file_manager.generate_new_structure()
-        print(f"✅ New FOMOD-ready structure created at {self.file_manager.output_dir}")
-
-    def generate_archive(self, user_version: str = None):
-        """ Packages the mod and FOMOD configuration into a zip. """
-        self.file_manager.generate_archive(user_version)
-
-    def run(self, generate_structure=False, generate_archive=False, user_version: str = None):
+        placed = ", ".join(f"{count} {method}" for method, count in sorted(self.file_manager.placed.items()))
+        print(f"✅ New FOMOD-ready structure created at {self.file_manager.output_dir} ({placed or 'no files'})")
+
+    def generate_archive(self, user_version: str = None) -> str:
+        """ Packages the mod and FOMOD configuration into an archive; no structure needs to be generated first. """
+        self._require_folder("Packaging")
+        return self.file_manager.generate_archive(user_version)
+
+    def watch(self, generate_structure=False, generate_archive=False, user_version: str = None, validate=True,
+              debounce: float = 0.5, use_inotify: bool = True,
+              on_rebuild: Callable[[List[str]], None] = None) -> DirectoryWatcher:
+        """
+        Rebuilds the outputs whenever the mod folder changes, until the returned watcher is stopped.
+
+        Changes are debounced into batches and only the affected stages run again: a folder
+        change re-scans and rewrites the XML (and structure and archive, if enabled); a file
+        change only redoes the structure and archive. Each rebuild prints one timing line and
+        calls `on_rebuild(stages)` on the watcher thread. Changes below the output folder and
+        the archive folder are ignored, so outputs inside the mod do not trigger themselves.
+        """
+        self._require_folder("Watching")
+        output_prefixes = tuple(path + os.sep for path in self.file_manager.output_dirs())
+
+        def outside_output(paths):
+            return {path for path in paths if not (os.path.abspath(path) + os.sep).startswith(output_prefixes)}
+
+        def rebuild(raw_changes: ChangeSet):
+            changes = ChangeSet(outside_output(raw_changes.created), outside_output(raw_changes.deleted),
+                                outside_output(raw_changes.modified), outside_output(raw_changes.directories),
+                                raw_changes.overflow)
+            if not changes:
+                return
+
+            self.timings = {}
+            stages = []
+            start = time.perf_counter()
+            try:
+                if changes.folders_changed:
+                    with self._timed("parse"):
+                        self.parse_fomod()
+                    with self._timed("xml"):
+                        self.write_xml()
+                    stages.append("xml")
+                    if validate:
+                        with self._timed("validate"):
+                            self.validation_errors = self.validate_xml()
+                if generate_structure:
+                    with self._timed("structure"):
+                        self.generate_new_structure()
+                    stages.append("structure")
+                if generate_archive:
+                    with self._timed("archive"):
+                        self.generate_archive(user_version)
+                    stages.append("archive")
+            except Exception as e:
+                print(f"❌ Rebuild failed: {e}")
+                return
+
+            reason = "folders changed" if changes.folders_changed else "files changed"
+            if stages:
+                print(f"🔁 {reason}: rebuilt {', '.join(stages)} in {(time.perf_counter() - start) * 1000:.1f} ms "
+                      f"({self.timing_summary()})")
+            if on_rebuild:
+                on_rebuild(stages)
+
+        watcher = DirectoryWatcher(self.parser.root_dir, rebuild, debounce=debounce, use_inotify=use_inotify)
+        return watcher.start()
+
+    def _require_folder(self, action: str):
+        """ Structure and packaging work on files, which archive-backed projects do not have on disk. """
+        if isinstance(self.parser, ArchiveFomodParser):
+            raise ValueError(f"{action} requires an extracted mod folder, not an archive.")
+
+    def run(self, generate_structure=False, generate_archive=False, user_version: str = None, validate=True):
         """ Runs the full process based on options. """
-        self.parse_fomod()
-        xml_output = self.generate_xml()
-        self.save_xml(xml_output)
+        self.timings = {}
+        with self._timed("parse"):
+            self.parse_fomod()
+        with self._timed("xml"):
+            written = self.write_xml()
         print(f"🔹 Welcome to PHOMOD: {phomod_map()}")
-        print(f"✅ FOMOD XML generated successfully at {self.file_manager.fomod_config_path}")
+        if written:
+            print(f"✅ FOMOD XML generated successfully at {self.file_manager.fomod_config_path}")
+        else:
+            print(f"✅ FOMOD XML unchanged at {self.file_manager.fomod_config_path}")
+        if validate:
+            with self._timed("validate"):
+                self.validation_errors = self.validate_xml()
 
         if generate_structure:
-            self.generate_new_structure()
+            with self._timed("structure"):
+                self.generate_new_structure()
 
         if generate_archive:
-            self.generate_archive(user_version)
+            with self._timed("archive"):
+                self.generate_archive(user_version)
+        print(f"⏱️ Build timings: {self.timing_summary()}")
 
 
 # Run the script
 if __name__ == "__main__":
-    test_dir = "/home/dougr/Games/prefixes/morrowind_gog/pfx/drive_c/users/steamuser/My Documents/Dwemer Interface Suite/thetsing_delete_later/100 UI Enhancements"
-    manager = FomodManager(test_dir)
-    manager.run()
+    from phomod_cli import main
+    sys.exit(main())
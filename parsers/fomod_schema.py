@@ -0,0 +1,339 @@
+import os
+import re
+import logging
+import functools
+from xml.parsers import expat
+from xml.etree import ElementTree as ET
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+app_logger = logging.getLogger("PHOMODLogger")
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schemas")
+MODCONFIG_SCHEMA = os.path.join(SCHEMA_DIR, "ModConfig5.0.xsd")
+
+XS = "{http://www.w3.org/2001/XMLSchema}"
+UNBOUNDED = -1
+
+# Checks for the built-in types used by the FOMOD schema; each returns True for a valid value
+_INTEGER = re.compile(r"\s*[+-]?\d+\s*")
+BUILTIN_TYPES: Dict[str, Callable[[str], bool]] = {
+    "string": lambda value: True,
+    "boolean": lambda value: value.strip() in ("true", "false", "1", "0"),
+    "integer": lambda value: bool(_INTEGER.fullmatch(value)),
+    "int": lambda value: bool(_INTEGER.fullmatch(value)) and -2 ** 31 <= int(value) < 2 ** 31,
+    "hexBinary": lambda value: bool(re.fullmatch(r"\s*(?:[0-9A-Fa-f]{2})*\s*", value)),
+}
+
+
+class SchemaError(NamedTuple):
+    """ A validation error at a 1-based line and column of the document. """
+    line: int
+    column: int
+    message: str
+
+    def __str__(self):
+        return f"line {self.line}, column {self.column}: {self.message}"
+
+
+class ValueType(NamedTuple):
+    """ A compiled simple type: a check and a readable description for error messages. """
+    check: Callable[[str], bool]
+    description: str
+
+
+class ElementType:
+    """
+    A compiled complex type.
+
+    `children` maps each allowed child element to its type and to the one-character token
+    that stands for it in `content`, a regex over the sequence of child tokens. Elements
+    with simple content have no `content` and may hold text.
+    """
+    __slots__ = ("name", "attributes", "required", "children", "content", "model", "text",
+                 "allowed", "checked", "leaf", "free_text")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.attributes: Dict[str, ValueType] = {}
+        self.required = set()
+        self.children: Dict[str, tuple] = {}  # element name -> (token, ElementType)
+        self.content = None  # Compiled regex, or None for simple content
+        self.model = ""  # Readable content model, e.g. "(description, image?, typeDescriptor)"
+        self.text: Optional[ValueType] = None  # Check for simple content
+        self.seal()
+
+    def seal(self):
+        """ Precomputes the lookups used on every element once the type is complete. """
+        self.allowed = frozenset(self.attributes)
+        self.required = frozenset(self.required)
+        # Plain string attributes only need their name checked
+        self.checked = tuple((name, value_type) for name, value_type in self.attributes.items()
+                             if value_type.description != "string")
+        # Without child elements, any child is rejected at its start tag and the content needs no check
+        self.leaf = not self.children
+        # Text typed plain xs:string accepts anything
+        self.free_text = self.text is not None and self.text.description == "string"
+
+
+class FomodSchemaValidator:
+    """
+    Structural validator compiled from an XSD.
+
+    Only the subset of XML Schema used by the FOMOD schema is supported: named and local
+    complex types, sequences and choices with occurrence bounds, complex/simple content
+    extensions, attributes with `use="required"`, and enumeration or length restrictions
+    of the built-in types. Each content model becomes a regular expression, and documents
+    are checked in one streaming expat pass, so errors carry line numbers.
+    """
+
+    def __init__(self, schema_path: str = MODCONFIG_SCHEMA):
+        self.schema_path = schema_path
+        schema = ET.parse(schema_path).getroot()
+        self._complex = {node.get("name"): node for node in schema.findall(f"{XS}complexType")}
+        self._simple = {node.get("name"): node for node in schema.findall(f"{XS}simpleType")}
+        self._compiled: Dict[str, ElementType] = {}
+        self._simple_compiled: Dict[str, ValueType] = {}
+
+        # The document itself is compiled like an element whose only child is one of the roots
+        self.document = ElementType("#document")
+        roots = schema.findall(f"{XS}element")
+        pattern = "|".join(self._particle(root, self.document)[0] for root in roots)
+        self.document.content = re.compile(pattern)
+        self.document.model = " or ".join(f"<{root.get('name')}>" for root in roots)
+        self.document.seal()
+
+    # === Compilation ===
+    def _element_type(self, element) -> ElementType:
+        """ Resolves the type of an element declaration. """
+        type_name = element.get("type")
+        if type_name is None:
+            local = element.find(f"{XS}complexType")
+            if local is not None:
+                return self._compile_complex(local, element.get("name"))
+            type_name = "xs:string"
+        if type_name in self._complex:
+            if type_name not in self._compiled:
+                self._compiled[type_name] = ElementType(type_name)  # Placeholder for recursive types
+                self._compile_complex(self._complex[type_name], type_name, self._compiled[type_name])
+            return self._compiled[type_name]
+
+        # An element with a simple type: text only, no attributes
+        element_type = ElementType(type_name)
+        element_type.text = self._value_type(type_name)
+        element_type.seal()
+        return element_type
+
+    def _compile_complex(self, node, name: str, element_type: ElementType = None) -> ElementType:
+        element_type = element_type or ElementType(name)
+        particle, attributes = None, []
+        for child in node:
+            tag = child.tag[len(XS):]
+            if tag in ("sequence", "choice"):
+                particle = child
+            elif tag == "attribute":
+                attributes.append(child)
+            elif tag in ("complexContent", "simpleContent"):
+                extension = child.find(f"{XS}extension")
+                base = extension.get("base")
+                if tag == "simpleContent":
+                    element_type.text = self._value_type(base)
+                else:
+                    base_type = self._element_type(ET.Element("element", type=base))
+                    element_type.attributes.update(base_type.attributes)
+                    element_type.required = element_type.required | base_type.required
+                    element_type.children.update(base_type.children)
+                    element_type.content, element_type.model = base_type.content, base_type.model
+                for part in extension:
+                    if part.tag in (f"{XS}sequence", f"{XS}choice"):
+                        particle = part
+                    elif part.tag == f"{XS}attribute":
+                        attributes.append(part)
+
+        for attribute in attributes:
+            attr_name = attribute.get("name")
+            element_type.attributes[attr_name] = self._attribute_type(attribute)
+            if attribute.get("use") == "required":
+                element_type.required = element_type.required | {attr_name}
+
+        if particle is not None:
+            pattern, model = self._particle(particle, element_type)
+            if element_type.content is not None:  # Extending a base type's content
+                pattern, model = element_type.content.pattern + pattern, f"({element_type.model}, {model})"
+            element_type.content = re.compile(pattern)
+            element_type.model = model
+        elif element_type.text is None and element_type.content is None:
+            element_type.content = re.compile("")  # Empty content
+            element_type.model = "empty"
+        element_type.seal()
+        return element_type
+
+    def _particle(self, node, element_type: ElementType):
+        """ Returns (regex, readable model) for a sequence, choice or element particle. """
+        tag = node.tag[len(XS):]
+        if tag == "element":
+            name = node.get("name")
+            if name not in element_type.children:
+                token = chr(0x100 + len(element_type.children))
+                element_type.children[name] = (token, self._element_type(node))
+            pattern, model = re.escape(element_type.children[name][0]), name
+        else:
+            parts = [self._particle(child, element_type) for child in node
+                     if child.tag in (f"{XS}element", f"{XS}sequence", f"{XS}choice")]
+            joiner = "" if tag == "sequence" else "|"
+            pattern = "(?:" + joiner.join(f"(?:{p})" for p, _ in parts) + ")"
+            model = "(" + (", " if tag == "sequence" else " | ").join(m for _, m in parts) + ")"
+
+        low = int(node.get("minOccurs", "1"))
+        high = node.get("maxOccurs", "1")
+        high = UNBOUNDED if high == "unbounded" else int(high)
+        suffix = {(1, 1): "", (0, 1): "?", (0, UNBOUNDED): "*", (1, UNBOUNDED): "+"}.get(
+            (low, high), f"{{{low},{'' if high == UNBOUNDED else high}}}")
+        return f"(?:{pattern}){suffix}", model + suffix
+
+    def _attribute_type(self, attribute) -> ValueType:
+        local = attribute.find(f"{XS}simpleType")
+        if local is not None:
+            return self._compile_simple(local)
+        return self._value_type(attribute.get("type", "xs:string"))
+
+    def _value_type(self, type_name: str) -> ValueType:
+        if type_name in self._simple:
+            if type_name not in self._simple_compiled:
+                self._simple_compiled[type_name] = self._compile_simple(self._simple[type_name])
+            return self._simple_compiled[type_name]
+        builtin = type_name.split(":")[-1]
+        if builtin not in BUILTIN_TYPES:
+            raise ValueError(f"Unsupported schema type: {type_name}")
+        return ValueType(BUILTIN_TYPES[builtin], builtin)
+
+    def _compile_simple(self, node) -> ValueType:
+        restriction = node.find(f"{XS}restriction")
+        base = self._value_type(restriction.get("base"))
+        values = [facet.get("value") for facet in restriction.findall(f"{XS}enumeration")]
+        if values:
+            allowed = frozenset(values)
+            return ValueType(allowed.__contains__, "one of " + ", ".join(values))
+        length = restriction.find(f"{XS}length")
+        if length is not None:
+            # hexBinary lengths count octets, i.e. two characters each
+            size = int(length.get("value")) * (2 if base.description == "hexBinary" else 1)
+            return ValueType(lambda value: base.check(value) and len(value.strip()) == size,
+                             f"{base.description} of length {length.get('value')}")
+        return base
+
+    # === Validation ===
+    def validate_file(self, path: str, max_errors: int = 100) -> List[SchemaError]:
+        """ Validates an XML file; returns an empty list when it is valid. """
+        with open(path, "rb") as f:
+            return self._validate(lambda parser: parser.ParseFile(f), max_errors)
+
+    def validate(self, xml, max_errors: int = 100) -> List[SchemaError]:
+        """ Validates an XML document given as str or bytes. """
+        if isinstance(xml, str):
+            xml = xml.encode("utf-8")
+        return self._validate(lambda parser: parser.Parse(xml, True), max_errors)
+
+    def _validate(self, feed, max_errors: int) -> List[SchemaError]:
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = 1 << 16
+        errors = []
+        # The open element as its type (None when not validated), name, child tokens (None for
+        # leaves) and position; its ancestors are saved on the stack
+        element_type, name, children, position = self.document, "#document", [], (1, 1)
+        stack = []
+        push, pop = stack.append, stack.pop
+
+        def report(message, line=None, column=None):
+            if len(errors) < max_errors:
+                if line is None:
+                    line, column = parser.CurrentLineNumber, parser.CurrentColumnNumber + 1
+                errors.append(SchemaError(line, column, message))
+
+        def start(child, attributes):
+            nonlocal element_type, name, children, position
+            push((element_type, name, children, position))
+            if children is None:  # Inside a leaf, or an element that is not validated
+                if element_type is not None:
+                    unexpected(element_type, name, child)
+                element_type, name = None, child
+                return
+            entry = element_type.children.get(child)
+            if entry is None:
+                unexpected(element_type, name, child)
+                element_type, name, children = None, child, None
+                return
+            children.append(entry[0])
+            element_type, name = entry[1], child
+            if attributes or element_type.required:
+                keys = attributes.keys()
+                if not (keys <= element_type.allowed and element_type.required <= keys):
+                    check_names(name, element_type, keys)
+                for attr_name, value_type in element_type.checked:
+                    value = attributes.get(attr_name)
+                    if value is not None and not value_type.check(value):
+                        report(f"Invalid value '{value}' for attribute '{attr_name}' on <{name}>; "
+                               f"expected {value_type.description}")
+            if element_type.leaf:
+                children = None
+                if element_type.free_text:  # Nothing to check until the end tag
+                    parser.CharacterDataHandler = None
+            else:
+                children, position = [], (parser.CurrentLineNumber, parser.CurrentColumnNumber + 1)
+
+        def unexpected(parent, parent_name, child):
+            if parent is self.document:
+                report(f"Unexpected root element <{child}>; expected {parent.model}")
+            elif parent.content is None:
+                report(f"Element <{parent_name}> may only contain text, found <{child}>")
+            else:
+                report(f"Unexpected element <{child}> in <{parent_name}>; expected {parent.model}")
+
+        def check_names(name, element_type, keys):
+            for attr_name in keys - element_type.allowed:
+                if not attr_name.startswith(("xmlns", "xsi:")):
+                    report(f"Attribute '{attr_name}' is not allowed on <{name}>")
+            for attr_name in sorted(element_type.required - keys):
+                report(f"Missing required attribute '{attr_name}' on <{name}>")
+
+        def end(_name):
+            nonlocal element_type, name, children, position
+            if children is None:
+                if element_type is not None and element_type.free_text:
+                    parser.CharacterDataHandler = text
+            elif not element_type.content.fullmatch("".join(children)):
+                found = ", ".join(self._token_name(element_type, token) for token in children) or "nothing"
+                report(f"Invalid content in <{name}>: found ({found}), expected {element_type.model}", *position)
+            element_type, name, children, position = pop()
+
+        def text(data):
+            if element_type is None:
+                return
+            if element_type.text is None:
+                if not data.isspace():
+                    report(f"Text is not allowed in <{name}>")
+            elif not element_type.text.check(data):
+                report(f"Invalid text '{data.strip()}' in <{name}>; expected {element_type.text.description}")
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text
+        try:
+            feed(parser)
+        except expat.ExpatError as e:
+            errors.append(SchemaError(e.lineno, e.offset + 1, f"Malformed XML: {expat.ErrorString(e.code)}"))
+        return sorted(errors)  # Content errors are found at the end tag, after the errors inside
+
+    @staticmethod
+    def _token_name(element_type: ElementType, token: str) -> str:
+        for name, (child_token, _) in element_type.children.items():
+            if child_token == token:
+                return name
+        return "?"
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(schema_path: str = MODCONFIG_SCHEMA) -> FomodSchemaValidator:
+    """ Returns the compiled validator for a schema, building it once per process. """
+    app_logger.info(f"🧩 Compiling schema {os.path.basename(schema_path)}")
+    return FomodSchemaValidator(schema_path)
@@ -0,0 +1,339 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+import ctypes
+import ctypes.util
+from dataclasses import dataclass, field
+from typing import Callable, List, Set, Tuple
+
+app_logger = logging.getLogger("PHOMODLogger")
+
+# A raw filesystem event: (kind, path, is_dir) where kind is "created", "deleted" or "modified"
+RawEvent = Tuple[str, str, bool]
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass
+class ChangeSet:
+    """ A debounced batch of filesystem changes below the watched folder. """
+    created: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+    modified: Set[str] = field(default_factory=set)
+    directories: Set[str] = field(default_factory=set)  # Folders that were created or deleted
+    overflow: bool = False  # Events were lost; treat everything as changed
+
+    @property
+    def folders_changed(self) -> bool:
+        """ True when the folder structure changed (a folder was added, removed or renamed). """
+        return self.overflow or bool(self.directories)
+
+    @property
+    def files_changed(self) -> bool:
+        """ True when any file was added, removed or rewritten. """
+        paths = self.created | self.deleted | self.modified
+        return self.overflow or bool(paths - self.directories)
+
+    def add(self, kind: str, path: str, is_dir: bool):
+        """ Folds one raw event into the batch, cancelling out create/delete pairs. """
+        if is_dir and kind != "modified":
+            self.directories.add(path)
+        if kind == "created":
+            if path in self.deleted:
+                self.deleted.discard(path)
+                self.modified.add(path)
+            else:
+                self.created.add(path)
+        elif kind == "deleted":
+            self.modified.discard(path)
+            if path in self.created:
+                self.created.discard(path)
+            else:
+                self.deleted.add(path)
+        elif path not in self.created:
+            self.modified.add(path)
+
+    def __bool__(self):
+        return self.overflow or bool(self.created or self.deleted or self.modified)
+
+
+class InotifyBackend:
+    """ Recursive inotify watches through ctypes (Linux only). """
+
+    def __init__(self, root_dir: str):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}  # watch descriptor -> folder path
+        self._add_tree(root_dir)
+
+    def _add_watch(self, path: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            return  # The folder vanished before we could watch it
+        self._paths[wd] = path
+
+    def _add_tree(self, path: str) -> List[RawEvent]:
+        """ Watches a folder and everything below it; returns "created" events for what is already there. """
+        self._add_watch(path)
+        found = []
+        for root, dirs, files in os.walk(path):
+            for d in dirs:
+                sub_path = os.path.join(root, d)
+                self._add_watch(sub_path)
+                found.append(("created", sub_path, True))
+            found.extend(("created", os.path.join(root, f), False) for f in files)
+        return found
+
+    def read(self, timeout: float) -> List[RawEvent]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append(("overflow", "", True))
+                continue
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            parent = self._paths.get(wd)
+            if parent is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                continue  # Reported by the parent folder as a delete / move
+
+            path = os.path.join(parent, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                events.append(("created", path, is_dir))
+                if is_dir:
+                    # Anything copied in before the new watch exists is reported as created too
+                    events.extend(self._add_tree(path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append(("deleted", path, is_dir))
+            elif mask & (IN_CLOSE_WRITE | IN_MODIFY):
+                events.append(("modified", path, is_dir))
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingBackend:
+    """
+    Portable fallback that polls with `stat`.
+
+    Only folders whose mtime changed are listed again; files are checked with a single
+    `stat` each per poll to catch in-place rewrites.
+    """
+
+    def __init__(self, root_dir: str, interval: float = 1.0):
+        self.interval = interval
+        self._dirs = {}   # folder path -> mtime_ns
+        self._files = {}  # file path -> (mtime_ns, size)
+        self._children = {}  # folder path -> set of entry names
+        self._index(root_dir, [])
+        self._next_poll = time.monotonic() + interval
+
+    def _index(self, path: str, events: List[RawEvent]):
+        """ Records a folder and its contents, reporting everything found as created. """
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        self._dirs[path] = mtime_ns
+        self._children[path] = {entry.name for entry in entries}
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                events.append(("created", entry.path, True))
+                self._index(entry.path, events)
+            else:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                self._files[entry.path] = (st.st_mtime_ns, st.st_size)
+                events.append(("created", entry.path, False))
+
+    def _forget(self, path: str, events: List[RawEvent]):
+        """ Drops a vanished entry (and everything below a vanished folder). """
+        if path in self._dirs:
+            for name in self._children.pop(path, ()):
+                self._forget(os.path.join(path, name), events)
+            del self._dirs[path]
+            events.append(("deleted", path, True))
+        elif self._files.pop(path, None) is not None:
+            events.append(("deleted", path, False))
+
+    def read(self, timeout: float) -> List[RawEvent]:
+        delay = self._next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        if delay > 0:
+            time.sleep(delay)
+        self._next_poll = time.monotonic() + self.interval
+        return self._poll()
+
+    def _poll(self) -> List[RawEvent]:
+        events = []
+        for path, mtime_ns in list(self._dirs.items()):
+            if path not in self._dirs:
+                continue  # Removed earlier in this poll
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                continue  # The parent folder reports it
+            if current == mtime_ns:
+                continue
+            self._dirs[path] = current
+            try:
+                names = set(os.listdir(path))
+            except OSError:
+                continue
+            known = self._children.get(path, set())
+            self._children[path] = names
+            for name in known - names:
+                self._forget(os.path.join(path, name), events)
+            for name in names - known:
+                child = os.path.join(path, name)
+                if os.path.isdir(child) and not os.path.islink(child):
+                    events.append(("created", child, True))
+                    self._index(child, events)
+                else:
+                    try:
+                        st = os.stat(child)
+                    except OSError:
+                        continue
+                    self._files[child] = (st.st_mtime_ns, st.st_size)
+                    events.append(("created", child, False))
+
+        for path, signature in list(self._files.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # The parent folder reports it
+            if (st.st_mtime_ns, st.st_size) != signature:
+                self._files[path] = (st.st_mtime_ns, st.st_size)
+                events.append(("modified", path, False))
+        return events
+
+    def close(self):
+        pass
+
+
+class DirectoryWatcher:
+    """
+    Watches a folder tree on a background thread and reports debounced change sets.
+
+    Events are collected until the tree has been quiet for `debounce` seconds (or
+    `max_latency` seconds have passed since the first one), so a 2,000-file copy arrives
+    as a single `ChangeSet`. `callback` runs on the watcher thread; Tk callers should hand
+    UI work back to the main loop with `widget.after`.
+    """
+
+    def __init__(self, root_dir: str, callback: Callable[[ChangeSet], None], debounce: float = 0.5,
+                 max_latency: float = 5.0, use_inotify: bool = True, poll_interval: float = 1.0):
+        self.root_dir = root_dir
+        self.callback = callback
+        self.debounce = debounce
+        self.max_latency = max_latency
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+        self.backend = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _create_backend(self):
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                return InotifyBackend(self.root_dir)
+            except (OSError, AttributeError) as e:
+                app_logger.warning(f"⚠️ inotify unavailable ({e}); falling back to polling.")
+        return PollingBackend(self.root_dir, self.poll_interval)
+
+    def start(self) -> "DirectoryWatcher":
+        """ Sets up the watches and starts the watcher thread. """
+        self.backend = self._create_backend()
+        self._thread = threading.Thread(target=self._run, name="PHOMODWatcher", daemon=True)
+        self._thread.start()
+        app_logger.info(f"👀 Watching {self.root_dir} ({type(self.backend).__name__})")
+        return self
+
+    def stop(self):
+        """ Stops the watcher thread and releases the watches. """
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.backend:
+            self.backend.close()
+
+    def _run(self):
+        pending = ChangeSet()
+        first_event = last_event = 0.0
+        while not self._stop.is_set():
+            try:
+                events = self.backend.read(min(self.debounce, 0.25))
+            except OSError as e:
+                app_logger.error(f"❌ Watching {self.root_dir} failed: {e}")
+                return
+
+            now = time.monotonic()
+            if events:
+                if not pending:
+                    first_event = now
+                last_event = now
+                for kind, path, is_dir in events:
+                    if kind == "overflow":
+                        pending.overflow = True
+                    else:
+                        pending.add(kind, path, is_dir)
+
+            quiet = now - last_event >= self.debounce
+            overdue = now - first_event >= self.max_latency
+            if pending and (quiet or overdue):
+                changes, pending = pending, ChangeSet()
+                try:
+                    self.callback(changes)
+                except Exception as e:
+                    app_logger.error(f"❌ Change handler failed: {e}")
@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Optional, Tuple, List
+
+app_logger = logging.getLogger("PHOMODLogger")
+
+# Directories modified this recently are not cached: a change within the same mtime tick
+# would otherwise go unnoticed on the next open.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class ScanCache:
+    """
+    Persistent per-project cache of directory listings, keyed by directory mtime.
+
+    Each directory records its `st_mtime_ns`, the classification markers found in it
+    ("data files" and Morrowind data folder names) and its sub-directory names. A
+    directory's mtime changes whenever an entry is added, removed or renamed in it, so an
+    unchanged mtime means the cached listing can be reused without listing the folder.
+    """
+    VERSION = 1
+
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.entries = self._load()
+        self.visited = set()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_project(cls, root_dir: str, cache_dir: str = None) -> "ScanCache":
+        """ Returns the cache for a project, stored under the user config dir by default. """
+        if cache_dir is None:
+            from config.phomod_config import CONFIG_DIR
+            cache_dir = os.path.join(str(CONFIG_DIR), "scan_cache")
+        key = hashlib.sha1(os.path.abspath(root_dir).encode("utf-8")).hexdigest()
+        return cls(os.path.join(cache_dir, f"{key}.json"))
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, OSError) as e:
+            app_logger.warning(f"⚠️ Ignoring unreadable scan cache {self.cache_file}: {e}")
+            return {}
+        if data.get("version") != self.VERSION:
+            return {}
+        return data.get("dirs", {})
+
+    def get(self, path: str, mtime_ns: int) -> Optional[Tuple[List[str], List[str]]]:
+        """ Returns the cached (markers, subdirs) for `path` if its mtime is unchanged. """
+        self.visited.add(path)
+        cached = self.entries.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            self.hits += 1
+            return cached[1], cached[2]
+        self.misses += 1
+        return None
+
+    def put(self, path: str, mtime_ns: int, markers, subdirs):
+        """ Records a fresh listing of `path`. """
+        self.visited.add(path)
+        if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+            self.entries.pop(path, None)
+            return
+        self.entries[path] = [mtime_ns, sorted(markers), list(subdirs)]
+        self.dirty = True
+
+    def save(self):
+        """ Drops directories that were not seen during the last scan and writes the cache atomically. """
+        stale = self.entries.keys() - self.visited
+        for path in stale:
+            del self.entries[path]
+        self.visited = set()
+        if not (self.dirty or stale):
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp_path = f"{self.cache_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "dirs": self.entries}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_file)
+            self.dirty = False
+        except OSError as e:
+            app_logger.warning(f"⚠️ Failed to save scan cache {self.cache_file}: {e}")
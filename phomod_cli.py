@@ -0,0 +1,236 @@
+"""
+Headless command-line entry point.
+
+Runs `FomodManager` without the GUI: nothing here imports tkinter, ttkthemes or PIL, so it
+is cheap to start on build servers.
+
+    python phomod_cli.py build "Mods/My Mod" --output dist --archive --version 1.2
+    python phomod_cli.py batch Mods --output dist --archive --jobs 8
+    python phomod_cli.py watch "Mods/My Mod" --output dist --overwrite --archive
+    python phomod_cli.py serve --port 8765 --workers 4
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+
+from parsers.fomod_parser import LINK_MODES, FomodManager
+from parsers.fomod_archive import DEFAULT_COMPRESSION, ArchiveOptions, archive_formats
+from parsers.fomod_batch import BuildOptions, FomodBatchBuilder, find_mod_roots
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="phomod", description="Builds FOMOD installers without the GUI.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log to the console")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="generate ModuleConfig.xml (and optionally structure and archive) for mods")
+    build.add_argument("mods", nargs="+", metavar="MOD", help="mod folder or .zip/.tar archive")
+    build.add_argument("-o", "--output", help='output folder (default: "fomod_output" next to each mod)')
+    build.add_argument("-s", "--structure", action="store_true", help="copy the mod into a FOMOD-ready structure")
+    build.add_argument("-a", "--archive", action="store_true", help="package the FOMOD-ready mod (see --format)")
+    build.add_argument("--version", dest="user_version", help="version appended to the archive name")
+    build.add_argument("--link-mode", choices=LINK_MODES, default="auto",
+                       help="how the structure gets its files: reflink, hardlink or copy (default: auto, the first that works)")
+    add_archive_arguments(build, "threads compressing the archive (default: CPU count)")
+    build.add_argument("-j", "--jobs", type=int, default=1, help="threads used to scan each mod (default: 1)")
+    build.add_argument("--overwrite", action="store_true",
+                       help="reuse the output folder instead of creating a timestamped one")
+    build.add_argument("--scan-cache", action="store_true", help="reuse folder listings from the previous run")
+    build.add_argument("--no-validate", dest="validate", action="store_false", help="skip schema validation")
+    build.add_argument("--strict", action="store_true", help="fail when the XML does not match the schema")
+    build.set_defaults(handler=run_build)
+
+    batch = commands.add_parser("batch", help="build every mod in a folder, several at a time")
+    batch.add_argument("folder", help="folder holding one mod folder or archive per mod")
+    batch.add_argument("-o", "--output", help='output folder (default: "fomod_output" inside FOLDER)')
+    batch.add_argument("-s", "--structure", action="store_true", help="copy each mod into a FOMOD-ready structure")
+    batch.add_argument("-a", "--archive", action="store_true", help="package each FOMOD-ready mod (see --format)")
+    batch.add_argument("--version", dest="user_version", help="version appended to the archive names")
+    batch.add_argument("--link-mode", choices=LINK_MODES, default="auto",
+                       help="how the structures get their files (default: auto)")
+    add_archive_arguments(batch, "threads compressing each archive (default: CPU count divided by --jobs)")
+    batch.add_argument("-j", "--jobs", type=int, default=None, help="mods built in parallel (default: CPU count)")
+    batch.add_argument("--overwrite", action="store_true",
+                       help="reuse the output folders instead of creating timestamped ones")
+    batch.add_argument("--scan-cache", action="store_true", help="reuse folder listings from the previous run")
+    batch.add_argument("--no-validate", dest="validate", action="store_false", help="skip schema validation")
+    batch.add_argument("--strict", action="store_true", help="fail when an XML does not match the schema")
+    batch.set_defaults(handler=run_batch)
+
+    watch = commands.add_parser("watch", help="build a mod, then rebuild whenever it changes")
+    watch.add_argument("mod", metavar="MOD", help="mod folder")
+    watch.add_argument("-o", "--output", help='output folder (default: "fomod_output" next to the mod)')
+    watch.add_argument("-s", "--structure", action="store_true", help="keep a FOMOD-ready structure up to date")
+    watch.add_argument("-a", "--archive", action="store_true", help="repackage the mod on every change")
+    watch.add_argument("--version", dest="user_version", help="version appended to the archive name")
+    watch.add_argument("--link-mode", choices=LINK_MODES, default="auto",
+                       help="how the structure gets its files (default: auto)")
+    add_archive_arguments(watch, "threads compressing the archive (default: CPU count)")
+    watch.add_argument("--overwrite", action="store_true",
+                       help="reuse the output folder instead of creating a timestamped one")
+    watch.add_argument("--no-validate", dest="validate", action="store_false", help="skip schema validation")
+    watch.add_argument("--debounce", type=float, default=0.5, help="seconds of quiet before rebuilding (default: 0.5)")
+    watch.add_argument("--poll", action="store_true", help="poll the folder instead of using inotify")
+    watch.set_defaults(handler=run_watch)
+
+    serve = commands.add_parser("serve", help="run the local JSON-over-HTTP build service")
+    serve.add_argument("--host", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    serve.add_argument("-w", "--workers", type=int, default=4, help="operations run at once (default: 4)")
+    serve.set_defaults(handler=run_serve)
+    return parser
+
+
+def add_archive_arguments(parser: argparse.ArgumentParser, threads_help: str):
+    parser.add_argument("--format", dest="archive_format", choices=archive_formats(), default="zip",
+                        help="archive format: zip, or a solid tar compressed as a whole (default: zip)")
+    parser.add_argument("--zip-threads", type=int, default=None, help=threads_help)
+    parser.add_argument("--compress", action="append", default=[], metavar="EXT=RULE",
+                        help='compression for an extension: store, deflate, bzip2, lzma or auto, with an optional '
+                             'level (e.g. ".dds=deflate:9"); "*=RULE" sets the rule for other files. Repeatable.')
+    parser.add_argument("--min-gain", type=float, default=0.05,
+                        help='"auto" stores files whose first 64 KB shrink by less than this fraction (default: 0.05)')
+    parser.add_argument("--incremental", action="store_true",
+                        help="zip only, ignored with --reproducible: copy unchanged files from the zip this mod "
+                             "last built with --incremental instead of recompressing them")
+    parser.add_argument("--reproducible", action="store_true",
+                        help="byte-identical archives for identical inputs: sorted files, fixed timestamps "
+                             "(SOURCE_DATE_EPOCH if set) and permissions")
+    parser.add_argument("--no-build-cache", dest="build_cache", action="store_false",
+                        help="with --reproducible, always pack instead of reusing the archive of identical inputs")
+
+
+def archive_options(args) -> ArchiveOptions:
+    """ Builds ArchiveOptions from the archive flags; the --compress rules extend the default table. """
+    compression = dict(DEFAULT_COMPRESSION)
+    default_compression = "auto"
+    for rule in args.compress:
+        extension, separator, method = rule.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid --compress rule: {rule} (expected EXT=RULE)")
+        if extension.strip() == "*":
+            default_compression = method
+        else:
+            compression["." + extension.strip().lower().lstrip(".")] = method
+    return ArchiveOptions(workers=args.zip_threads, compression=compression,
+                          default_compression=default_compression, min_gain=args.min_gain,
+                          incremental=args.incremental, reproducible=args.reproducible, build_cache=args.build_cache,
+                          format=args.archive_format)
+
+
+def run_build(args) -> int:
+    """ Builds each mod in turn; returns the number of mods that failed. """
+    failed = 0
+    for mod in args.mods:
+        start = time.perf_counter()
+        if not os.path.exists(mod):
+            print(f"❌ {mod}: not found", file=sys.stderr)
+            failed += 1
+            continue
+        try:
+            manager = FomodManager(mod, args.output, keep_existing_output=not args.overwrite,
+                                   scan_workers=args.jobs, use_scan_cache=args.scan_cache, link_mode=args.link_mode,
+                                   archive_options=archive_options(args))
+            manager.run(generate_structure=args.structure, generate_archive=args.archive,
+                        user_version=args.user_version, validate=args.validate)
+        except Exception as e:
+            print(f"❌ {mod}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if args.strict and manager.validation_errors:
+            print(f"❌ {mod}: ModuleConfig.xml does not match the schema", file=sys.stderr)
+            failed += 1
+        print(f"⏱️ {mod}: {(time.perf_counter() - start) * 1000:.1f} ms")
+    return failed
+
+
+def run_batch(args) -> int:
+    """ Builds every mod of a folder in a process pool; returns the number of mods that failed. """
+    if not os.path.isdir(args.folder):
+        print(f"❌ {args.folder}: not a folder", file=sys.stderr)
+        return 1
+    mod_dirs = find_mod_roots(args.folder, args.output)
+    options = BuildOptions(output_dir=args.output, generate_structure=args.structure,
+                           generate_archive=args.archive, user_version=args.user_version,
+                           keep_existing_output=not args.overwrite, validate=args.validate,
+                           use_scan_cache=args.scan_cache, link_mode=args.link_mode,
+                           archive_options=archive_options(args))
+    builder = FomodBatchBuilder(mod_dirs, options, jobs=args.jobs)
+    print(f"📦 Building {len(mod_dirs)} mod(s) with {min(builder.jobs, len(mod_dirs) or 1)} worker(s)")
+
+    def progress(result):
+        mark = "✅" if result.ok else "❌"
+        print(f"{mark} {os.path.basename(result.mod_dir)} ({result.elapsed * 1000:.1f} ms)", flush=True)
+
+    start = time.perf_counter()
+    results = builder.run(progress)
+    print(FomodBatchBuilder.report(results))
+    print(f"⏱️ Batch finished in {time.perf_counter() - start:.2f} s")
+
+    failed = sum(not result.ok for result in results)
+    if args.strict:
+        failed += sum(result.ok and bool(result.validation_errors) for result in results)
+    return failed
+
+
+def run_watch(args) -> int:
+    """ Runs a full build, then rebuilds on every change until interrupted. """
+    if not os.path.isdir(args.mod):
+        print(f"❌ {args.mod}: not a folder", file=sys.stderr)
+        return 1
+    manager = FomodManager(args.mod, args.output, keep_existing_output=not args.overwrite, link_mode=args.link_mode,
+                           archive_options=archive_options(args))
+    manager.run(generate_structure=args.structure, generate_archive=args.archive,
+                user_version=args.user_version, validate=args.validate)
+    watcher = manager.watch(generate_structure=args.structure, generate_archive=args.archive,
+                            user_version=args.user_version, validate=args.validate,
+                            debounce=args.debounce, use_inotify=not args.poll)
+    print(f"👀 Watching {args.mod} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return 0
+
+
+def run_serve(args) -> int:
+    """ Serves build operations over HTTP until interrupted. """
+    from services.build_service import BuildHTTPServer, BuildService
+
+    server = BuildHTTPServer((args.host, args.port), BuildService(workers=args.workers))
+    host, port = server.server_address[:2]
+    print(f"🌐 PHOMOD build service listening on http://{host}:{port} ({args.workers} worker(s), Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if hasattr(args, "compress"):
+        try:
+            archive_options(args)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.verbose:
+        # The GUI's logger setup also writes log files; the CLI only logs to the console when asked
+        logger = logging.getLogger("PHOMODLogger")
+        logger.setLevel(logging.INFO)
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)-8s | %(module)s - %(message)s", "%H:%M:%S"))
+        logger.addHandler(handler)
+    return 1 if args.handler(args) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,7 @@ class PhomodController:
         self.asset_manager = AssetManager("/path/to/assets/icons")
         self.theme_manager = ThemeManager(SETTINGS)
         self.workspace_manager = WorkspaceManager(controller=self)
+        self.project_parser = None  # FomodParser of the loaded project, shared by the workspaces
         self.ui = None
 
     def set_ui(self, ui_instance):
@@ -0,0 +1,9 @@
+from .build_service import BuildService, BuildHTTPServer, BuildRequestHandler, ServiceBusy
+
+
+__all__ = [
+    "BuildService",
+    "BuildHTTPServer",
+    "BuildRequestHandler",
+    "ServiceBusy",
+]
@@ -0,0 +1,334 @@
+"""
+Local JSON-over-HTTP build service.
+
+Keeps parsed projects warm in memory so tools can drive PHOMOD without starting an
+interpreter per request:
+
+    python phomod_cli.py serve --port 8765
+    curl -d '{"root_dir": "/mods/My Mod"}' http://127.0.0.1:8765/load_project
+    curl -d '{"project": "/mods/My Mod"}' http://127.0.0.1:8765/generate_xml
+    curl -H 'Accept: application/x-ndjson' -d '{"project": "/mods/My Mod", "archive": true}' http://127.0.0.1:8765/build
+
+Every operation is a POST with a JSON object body. Responses are JSON; with
+`Accept: application/x-ndjson` (or `?stream=1`) progress events are streamed as one JSON
+object per line, ending with a "result" or "error" event.
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+from urllib.parse import parse_qs, urlsplit
+
+from parsers.fomod_parser import FomodManager, FomodXMLWriter
+from parsers.fomod_archive import DEFAULT_COMPRESSION, ArchiveOptions
+
+app_logger = logging.getLogger("PHOMODLogger")
+
+ProgressCallback = Callable[[dict], None]
+
+
+class ServiceBusy(Exception):
+    """ Raised when the worker pool and its queue are full. """
+
+
+class ProjectNotLoaded(LookupError):
+    """ Raised for operations on a project that was not loaded. """
+
+
+class Project:
+    """ A loaded mod: its manager plus a lock, since one manager must not run two operations at once. """
+
+    def __init__(self, manager: FomodManager):
+        self.manager = manager
+        self.lock = threading.Lock()
+        self.loaded_at = time.time()
+        self.xml_writer = None  # Keeps XML fragments for inline /generate_xml responses
+
+    def summary(self) -> dict:
+        steps = self.manager.parser.steps
+        groups = [group for step in steps for group in step.groups]
+        return {
+            "project": self.manager.parser.root_dir,
+            "output_dir": self.manager.file_manager.output_dir,
+            "steps": len(steps),
+            "groups": len(groups),
+            "plugins": sum(len(group.plugins) for group in groups),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class BuildService:
+    """
+    Runs operations on warm projects in a bounded thread pool.
+
+    `submit()` rejects work with `ServiceBusy` once `max_pending` operations are queued or
+    running. Each operation reports stage events through its progress callback.
+    Operations are the `_op_<name>` methods; the HTTP handler maps `/<name>` to them.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = None):
+        self.workers = max(1, workers)
+        self.projects: Dict[str, Project] = {}
+        self._projects_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="PHOMODBuild")
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+
+    def operations(self):
+        return sorted(name[len("_op_"):] for name in dir(self) if name.startswith("_op_"))
+
+    def submit(self, operation: str, params: dict, progress: ProgressCallback = None) -> Future:
+        """ Queues an operation; the future resolves to its JSON-ready result. """
+        handler = getattr(self, f"_op_{operation}", None)
+        if handler is None:
+            raise ValueError(f"Unknown operation: {operation}")
+        if not self._slots.acquire(blocking=False):
+            raise ServiceBusy(f"All {self.workers} workers are busy; try again later.")
+        progress = progress or (lambda event: None)
+
+        def run():
+            try:
+                return handler(params, progress)
+            finally:
+                self._slots.release()  # Before the future resolves, so callers can submit again right away
+
+        try:
+            return self._executor.submit(run)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    # === Helpers ===
+    @staticmethod
+    def _stage(progress: ProgressCallback, stage: str, func: Callable):
+        progress({"event": "stage", "stage": stage, "status": "started"})
+        start = time.perf_counter()
+        result = func()
+        progress({"event": "stage", "stage": stage, "status": "done",
+                  "ms": round((time.perf_counter() - start) * 1000, 1)})
+        return result
+
+    def _project(self, params: dict) -> Project:
+        key = params.get("project") or params.get("root_dir")
+        if not key:
+            raise ValueError("Missing 'project'.")
+        with self._projects_lock:
+            project = self.projects.get(os.path.abspath(key))
+        if project is None:
+            raise ProjectNotLoaded(f"Project not loaded: {key}")
+        return project
+
+    # === Operations ===
+    def _op_load_project(self, params: dict, progress: ProgressCallback) -> dict:
+        """ Parses a mod and keeps it in memory. Already loaded projects are reused unless `reload` is set. """
+        root_dir = params.get("root_dir")
+        if not root_dir:
+            raise ValueError("Missing 'root_dir'.")
+        root_dir = os.path.abspath(root_dir)
+        if not os.path.exists(root_dir):
+            raise FileNotFoundError(f"No such mod: {root_dir}")
+
+        with self._projects_lock:
+            project = self.projects.get(root_dir)
+        if project is not None and not params.get("reload"):
+            return dict(project.summary(), cached=True)
+
+        manager = FomodManager(root_dir, params.get("output_dir"),
+                               keep_existing_output=params.get("keep_existing_output", True),
+                               scan_workers=params.get("scan_workers", 1),
+                               use_scan_cache=params.get("use_scan_cache", False),
+                               link_mode=params.get("link_mode", "auto"),
+                               archive_options=ArchiveOptions(
+                                   workers=params.get("zip_threads"),
+                                   compression=dict(DEFAULT_COMPRESSION, **params.get("compression", {})),
+                                   default_compression=params.get("default_compression", "auto"),
+                                   min_gain=params.get("min_gain", 0.05),
+                                   incremental=params.get("incremental", False),
+                                   reproducible=params.get("reproducible", False),
+                                   build_cache=params.get("build_cache", True),
+                                   format=params.get("format", "zip")))
+        project = Project(manager)
+        with project.lock:
+            self._stage(progress, "parse", manager.parse_fomod)
+        with self._projects_lock:
+            self.projects[root_dir] = project
+        return dict(project.summary(), cached=False)
+
+    def _op_unload_project(self, params: dict, progress: ProgressCallback) -> dict:
+        project = self._project(params)
+        with self._projects_lock:
+            self.projects.pop(project.manager.parser.root_dir, None)
+        return {"project": project.manager.parser.root_dir, "unloaded": True}
+
+    def _op_projects(self, params: dict, progress: ProgressCallback) -> dict:
+        with self._projects_lock:
+            projects = list(self.projects.values())
+        return {"projects": [project.summary() for project in projects]}
+
+    def _op_generate_xml(self, params: dict, progress: ProgressCallback) -> dict:
+        """
+        Writes ModuleConfig.xml for a loaded project (skipped if unchanged) and validates it.
+        With `inline`, the XML is returned instead of written. `rescan` picks up folder changes first.
+        """
+        project = self._project(params)
+        manager = project.manager
+        with project.lock:
+            if params.get("rescan"):
+                self._stage(progress, "parse", manager.parse_fomod)
+            if params.get("inline"):
+                if project.xml_writer is None or project.xml_writer.steps is not manager.parser.steps:
+                    project.xml_writer = FomodXMLWriter(manager.parser.steps, cache_fragments=True,
+                                                        module_name=manager.module_name)
+                return {"xml": self._stage(progress, "xml", project.xml_writer.generate_xml)}
+
+            written = self._stage(progress, "xml", manager.write_xml)
+            result = {"path": manager.file_manager.fomod_config_path, "written": written}
+            if params.get("validate", True):
+                errors = self._stage(progress, "validate", manager.validate_xml)
+                result["validation_errors"] = [str(error) for error in errors]
+            return result
+
+    def _op_generate_structure(self, params: dict, progress: ProgressCallback) -> dict:
+        project = self._project(params)
+        with project.lock:
+            self._stage(progress, "structure", project.manager.generate_new_structure)
+        return {"output_dir": project.manager.file_manager.output_dir, "placed": project.manager.file_manager.placed}
+
+    def _op_generate_archive(self, params: dict, progress: ProgressCallback) -> dict:
+        project = self._project(params)
+        with project.lock:
+            archive = self._stage(progress, "archive", lambda: project.manager.generate_archive(params.get("version")))
+        return {"output_dir": project.manager.file_manager.output_dir, "archive": archive}
+
+    def _op_build(self, params: dict, progress: ProgressCallback) -> dict:
+        """ Rescans a loaded project and runs the whole pipeline, like `FomodManager.run`. """
+        project = self._project(params)
+        manager = project.manager
+        with project.lock:
+            manager.timings = {}
+            for stage, func, enabled in (
+                ("parse", manager.parse_fomod, True),
+                ("xml", manager.write_xml, True),
+                ("validate", manager.validate_xml, params.get("validate", True)),
+                ("structure", manager.generate_new_structure, params.get("structure", False)),
+                ("archive", lambda: manager.generate_archive(params.get("version")), params.get("archive", False)),
+            ):
+                if enabled:
+                    with manager._timed(stage):
+                        result = self._stage(progress, stage, func)
+                    if stage == "validate":
+                        manager.validation_errors = result
+            return {
+                "path": manager.file_manager.fomod_config_path,
+                "timings_ms": {stage: round(seconds * 1000, 1) for stage, seconds in manager.timings.items()},
+                "skipped_writes": manager.file_manager.skipped_writes,
+                "validation_errors": [str(error) for error in manager.validation_errors],
+            }
+
+
+class BuildRequestHandler(BaseHTTPRequestHandler):
+    """ Maps `POST /<operation>` to `BuildService` operations. """
+    protocol_version = "HTTP/1.1"
+    server_version = "PHOMOD"
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "operations": self.server.service.operations()})
+        elif path == "/projects":
+            self._dispatch("projects", {})
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("The request body must be a JSON object.")
+        except ValueError as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+        stream = "application/x-ndjson" in self.headers.get("Accept", "") or \
+            parse_qs(url.query).get("stream", ["0"])[0] not in ("", "0", "false")
+        self._dispatch(url.path.strip("/"), params, stream)
+
+    def _dispatch(self, operation: str, params: dict, stream: bool = False):
+        events = queue.Queue()
+        try:
+            future = self.server.service.submit(operation, params, events.put if stream else None)
+        except ValueError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        except ServiceBusy as e:
+            self._send_json(503, {"error": str(e)})
+            return
+
+        if not stream:
+            try:
+                self._send_json(200, future.result())
+            except Exception as e:
+                self._send_json(self._status_for(e), {"error": str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        future.add_done_callback(lambda _: events.put(None))
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            self._send_chunk(event)
+        try:
+            self._send_chunk({"event": "result", "result": future.result()})
+        except Exception as e:
+            self._send_chunk({"event": "error", "status": self._status_for(e), "error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+
+    @staticmethod
+    def _status_for(error: Exception) -> int:
+        if isinstance(error, (ProjectNotLoaded, FileNotFoundError)):
+            return 404
+        if isinstance(error, ValueError):
+            return 400
+        app_logger.error(f"❌ Build service operation failed: {error}")
+        return 500
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_chunk(self, payload: dict):
+        line = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        app_logger.info(f"🌐 {self.address_string()} {format % args}")
+
+
+class BuildHTTPServer(ThreadingHTTPServer):
+    """ Threaded HTTP server bound to a `BuildService`. """
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8765), service: BuildService = None):
+        self.service = service or BuildService()
+        super().__init__(address, BuildRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.service.shutdown()
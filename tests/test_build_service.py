@@ -0,0 +1,119 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import logging
+import urllib.request
+import urllib.error
+from contextlib import redirect_stdout
+
+from services.build_service import BuildService, BuildHTTPServer, ServiceBusy
+
+log = logging.getLogger("test_logger")
+
+
+class BlockingService(BuildService):
+    """Adds an operation that waits until released, to fill the worker pool."""
+    release = threading.Event()
+
+    def _op_block(self, params, progress):
+        self.release.wait(5)
+        return {}
+
+
+class TestBuildService(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(self.mod_dir, "10 First", "Data Files", "meshes"))
+        self.server = BuildHTTPServer(("127.0.0.1", 0), BuildService(workers=2))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        log.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir)
+        log.info(f"Completed test: {self._testMethodName}\n")
+
+    def post(self, endpoint, payload, stream=False):
+        request = urllib.request.Request(f"{self.base_url}/{endpoint}", data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Accept": "application/x-ndjson"} if stream else {})
+        try:
+            with redirect_stdout(io.StringIO()), urllib.request.urlopen(request, timeout=10) as response:
+                body = response.read().decode("utf-8")
+                status = response.status
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+        if stream:
+            return status, [json.loads(line) for line in body.splitlines()]
+        return status, json.loads(body)
+
+    def load(self):
+        return self.post("load_project", {"root_dir": self.mod_dir, "output_dir": os.path.join(self.test_dir, "out"),
+                                          "keep_existing_output": False})
+
+    def test_load_project_stays_warm(self):
+        status, result = self.load()
+        self.assertEqual(status, 200)
+        self.assertEqual((result["groups"], result["plugins"], result["cached"]), (1, 1, False))
+
+        status, result = self.load()
+        self.assertTrue(result["cached"])
+        with urllib.request.urlopen(f"{self.base_url}/projects", timeout=10) as response:
+            projects = json.loads(response.read())["projects"]
+        self.assertEqual([p["project"] for p in projects], [os.path.abspath(self.mod_dir)])
+
+    def test_generate_xml_writes_and_inlines(self):
+        self.load()
+        status, result = self.post("generate_xml", {"project": self.mod_dir})
+        self.assertEqual(status, 200)
+        self.assertTrue(result["written"])
+        self.assertEqual(result["validation_errors"], [])
+        with open(result["path"], encoding="utf-8") as f:
+            on_disk = f.read()
+
+        status, result = self.post("generate_xml", {"project": self.mod_dir, "inline": True})
+        self.assertEqual(result["xml"], on_disk)
+        status, result = self.post("generate_xml", {"project": self.mod_dir})
+        self.assertFalse(result["written"])
+
+    def test_build_streams_progress(self):
+        self.load()
+        status, events = self.post("build", {"project": self.mod_dir, "archive": True}, stream=True)
+        self.assertEqual(status, 200)
+        stages = [(e["stage"], e["status"]) for e in events if e["event"] == "stage"]
+        self.assertEqual(stages, [(stage, status) for stage in ("parse", "xml", "validate", "archive")
+                                  for status in ("started", "done")])
+        self.assertEqual(events[-1]["event"], "result")
+        self.assertEqual(list(events[-1]["result"]["timings_ms"]), ["parse", "xml", "validate", "archive"])
+
+    def test_errors_map_to_status_codes(self):
+        status, body = self.post("generate_xml", {"project": self.mod_dir})
+        self.assertEqual((status, body["error"]), (404, f"Project not loaded: {self.mod_dir}"))
+        self.assertEqual(self.post("load_project", {})[0], 400)
+        self.assertEqual(self.post("load_project", {"root_dir": os.path.join(self.test_dir, "Nope")})[0], 404)
+        self.assertEqual(self.post("no_such_operation", {})[0], 404)
+        status, events = self.post("generate_xml", {"project": self.mod_dir}, stream=True)
+        self.assertEqual((events[-1]["event"], events[-1]["status"]), ("error", 404))
+
+    def test_pool_is_bounded(self):
+        service = BlockingService(workers=1, max_pending=2)
+        self.addCleanup(service.shutdown)
+        self.addCleanup(BlockingService.release.set)
+        first = service.submit("block", {})
+        second = service.submit("block", {})
+        with self.assertRaises(ServiceBusy):
+            service.submit("block", {})
+        BlockingService.release.set()
+        first.result(5), second.result(5)
+        service.submit("projects", {}).result(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,263 @@
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+import unittest
+import tempfile
+import zlib
+from fomod_archive import (ArchiveOptions, CompressedMember, ParallelZipPacker, TarXzPacker, ZipArchiveWriter,
+                           ZIP_FILECOUNT_LIMIT, archive_formats, archive_packer, zstd)
+
+
+class TestParallelZipPacker(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def make_layout(self, files):
+        """Writes `files` (archive name -> bytes) below the test folder and returns the layout pairs."""
+        layout = []
+        for arcname, data in files.items():
+            path = os.path.join(self.test_dir, "src", *arcname.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            layout.append((path, arcname))
+        return layout
+
+    def test_pack_is_valid_and_ordered(self):
+        files = {
+            "10 Option/Data Files/textures/a.dds": b"texture " * 50_000,
+            "10 Option/Data Files/meshes/b.nif": os.urandom(300_000),
+            "fomod/Ünïcode.txt": b"",
+            "fomod/ModuleConfig.xml": b"<config/>",
+        }
+        zip_path = os.path.join(self.test_dir, "Mod.zip")
+        stats = ParallelZipPacker(ArchiveOptions(workers=4)).pack(self.make_layout(files), zip_path)
+
+        self.assertEqual(stats.members, 4)
+        self.assertEqual(stats.size, sum(len(data) for data in files.values()))
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), list(files))
+            for arcname, data in files.items():
+                self.assertEqual(archive.read(arcname), data)
+                self.assertEqual(archive.getinfo(arcname).CRC, zlib.crc32(data))
+        self.assertFalse(os.path.exists(zip_path + ".tmp"))
+
+    def test_pack_is_deterministic(self):
+        layout = self.make_layout({f"Data Files/textures/{i:03d}.dds": bytes([i]) * 20_000 for i in range(40)})
+        contents = []
+        for workers in (1, 8):
+            zip_path = os.path.join(self.test_dir, f"Mod{workers}.zip")
+            ParallelZipPacker(ArchiveOptions(workers=workers)).pack(layout, zip_path)
+            with open(zip_path, "rb") as f:
+                contents.append(f.read())
+        self.assertEqual(contents[0], contents[1])
+
+    def test_failed_pack_keeps_previous_archive(self):
+        zip_path = os.path.join(self.test_dir, "Mod.zip")
+        layout = self.make_layout({"a.txt": b"a"})
+        ParallelZipPacker().pack(layout, zip_path)
+        with self.assertRaises(FileNotFoundError):
+            ParallelZipPacker().pack(layout + [(os.path.join(self.test_dir, "missing"), "b.txt")], zip_path)
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(archive.namelist(), ["a.txt"])
+        self.assertFalse(os.path.exists(zip_path + ".tmp"))
+
+    def test_compression_policy(self):
+        files = {
+            "music/theme.ogg": b"OggS" * 10_000,
+            "plugin.esp": b"TES3" * 10_000,
+            "noise.bin": os.urandom(100_000),
+            "notes.dat": b"notes " * 10_000,
+            "meshes/a.nif": b"NIF" * 10_000,
+            "textures/a.dds": b"DDS " * 10_000,
+        }
+        options = ArchiveOptions(workers=2, compression={".ogg": "store", ".esp": "deflate:9", ".nif": "bzip2",
+                                                         ".dds": "lzma:1"})
+        zip_path = os.path.join(self.test_dir, "Mod.zip")
+        stats = ParallelZipPacker(options).pack(self.make_layout(files), zip_path)
+
+        self.assertEqual(stats.methods, {"store": 2, "deflate": 2, "bzip2": 1, "lzma": 1})
+        expected = {"music/theme.ogg": zipfile.ZIP_STORED, "plugin.esp": zipfile.ZIP_DEFLATED,
+                    "noise.bin": zipfile.ZIP_STORED, "notes.dat": zipfile.ZIP_DEFLATED,
+                    "meshes/a.nif": zipfile.ZIP_BZIP2, "textures/a.dds": zipfile.ZIP_LZMA}
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertIsNone(archive.testzip())
+            for arcname, data in files.items():
+                self.assertEqual(archive.getinfo(arcname).compress_type, expected[arcname], arcname)
+                self.assertEqual(archive.read(arcname), data)
+
+    def test_compression_rules(self):
+        options = ArchiveOptions(level=5)
+        self.assertEqual(options.rule_for("Data Files/Music/Theme.OGG"), ("store", 5))
+        self.assertEqual(options.rule_for("Data Files/Plugin.esp"), ("deflate", 9))
+        self.assertEqual(options.rule_for("readme"), ("auto", 5))
+        with self.assertRaises(ValueError):
+            ArchiveOptions(compression={".dds": "brotli"})
+        with self.assertRaises(ValueError):
+            ArchiveOptions(default_compression="deflate:max")
+
+    def test_incremental_pack_reuses_unchanged_members(self):
+        files = {f"textures/{i}.dds": bytes([i]) * 50_000 for i in range(6)}
+        layout = self.make_layout(files)
+        old_path, new_path = os.path.join(self.test_dir, "Mod_1.0.zip"), os.path.join(self.test_dir, "Mod_1.1.zip")
+        ParallelZipPacker(ArchiveOptions(workers=2)).pack(layout, old_path)
+
+        sources = dict((arcname, source) for source, arcname in layout)
+        with open(sources["textures/0.dds"], "wb") as f:  # Changed content, same size
+            f.write(b"x" * 50_000)
+        os.utime(sources["textures/1.dds"], (0, 1_000_000_000))  # Touched only: matched by CRC
+        with open(sources["textures/2.dds"], "ab") as f:  # Grown
+            f.write(b"more")
+        layout += self.make_layout({"textures/new.dds": b"new" * 1000})
+
+        stats = ParallelZipPacker(ArchiveOptions(workers=2)).pack(layout, new_path, previous=old_path)
+        self.assertEqual(stats.members, 7)
+        self.assertEqual(stats.reused, 4)
+        with zipfile.ZipFile(new_path) as archive:
+            self.assertIsNone(archive.testzip())
+            for source, arcname in layout:
+                with open(source, "rb") as f:
+                    self.assertEqual(archive.read(arcname), f.read())
+            self.assertEqual(archive.getinfo("textures/1.dds").date_time[0], 2001)
+
+        stats = ParallelZipPacker(ArchiveOptions(compression={".dds": "bzip2"})).pack(layout, new_path, previous=new_path)
+        self.assertEqual(stats.reused, 0)  # Another method was asked for
+        stats = ParallelZipPacker().pack(layout, new_path, previous=os.path.join(self.test_dir, "missing.zip"))
+        self.assertEqual(stats.reused, 0)
+
+    def test_reproducible_pack(self):
+        files = {"b/2.txt": b"two", "a/1.dds": b"one" * 1000}
+        layout = self.make_layout(files)
+        options = ArchiveOptions(reproducible=True)
+        contents = []
+        for mtime in (1_000_000_000, 1_500_000_000):
+            for source, _ in layout:
+                os.utime(source, (mtime, mtime))
+                os.chmod(source, 0o600 if mtime == 1_000_000_000 else 0o755)
+            zip_path = os.path.join(self.test_dir, f"Mod{mtime}.zip")
+            ParallelZipPacker(options).pack(reversed(layout), zip_path)
+            with open(zip_path, "rb") as f:
+                contents.append(f.read())
+        self.assertEqual(contents[0], contents[1])
+
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(archive.namelist(), ["a/1.dds", "b/2.txt"])
+            info = archive.getinfo("a/1.dds")
+            self.assertEqual(info.date_time, (1980, 1, 1, 0, 0, 0))
+            self.assertEqual(info.external_attr >> 16, 0o100644)
+
+        # Members of a previous zip are never reused: the level it was deflated at would leak in
+        previous_path = os.path.join(self.test_dir, "Previous.zip")
+        ParallelZipPacker(ArchiveOptions(compression={".dds": "deflate:1", ".txt": "deflate:1"})).pack(
+            layout, previous_path)
+        stats = ParallelZipPacker(ArchiveOptions(reproducible=True, incremental=True)).pack(
+            layout, zip_path, previous=previous_path)
+        self.assertEqual(stats.reused, 0)
+        with open(zip_path, "rb") as f:
+            self.assertEqual(f.read(), contents[0])
+
+        os.environ["SOURCE_DATE_EPOCH"] = "1700000000"
+        self.addCleanup(os.environ.pop, "SOURCE_DATE_EPOCH")
+        self.assertEqual(ArchiveOptions.fixed_date_time(), (2023, 11, 14, 22, 13, 20))
+        self.assertNotEqual(options.cache_token(), ArchiveOptions(reproducible=True, level=9).cache_token())
+
+    def test_zip64_member_count(self):
+        buffer = io.BytesIO()
+        writer = ZipArchiveWriter(buffer)
+        count = ZIP_FILECOUNT_LIMIT + 10
+        for i in range(count):
+            writer.add(CompressedMember(f"{i}", "store", zlib.crc32(b"x"), 1, 1, (1980, 1, 1, 0, 0, 0),
+                                        0o100644, io.BytesIO(b"x")))
+        writer.close()
+        with zipfile.ZipFile(buffer) as archive:
+            self.assertEqual(len(archive.infolist()), count)
+            self.assertEqual(archive.read(str(count - 1)), b"x")
+
+
+class TestTarPackers(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    make_layout = TestParallelZipPacker.make_layout
+
+    def assert_tar_contents(self, archive_path, files):
+        with tarfile.open(archive_path) as archive:
+            self.assertEqual(archive.getnames(), list(files))
+            for arcname, data in files.items():
+                self.assertEqual(archive.extractfile(arcname).read(), data)
+
+    def test_tar_xz_round_trip(self):
+        # Level 0 cuts the stream into 768 KB blocks, so this spans several parallel xz streams
+        files = {f"Data Files/textures/{i}.dds": os.urandom(1000) * 300 for i in range(8)}
+        files["fomod/Ünïcode.txt"] = b""
+        layout = self.make_layout(files)
+        contents = []
+        for workers in (1, 4):
+            archive_path = os.path.join(self.test_dir, f"Mod{workers}.tar.xz")
+            stats = TarXzPacker(ArchiveOptions(format="tar.xz", level=0, workers=workers)).pack(layout, archive_path)
+            self.assert_tar_contents(archive_path, files)
+            with open(archive_path, "rb") as f:
+                contents.append(f.read())
+        self.assertEqual(contents[0], contents[1])
+        self.assertEqual(stats.members, 9)
+        self.assertEqual(stats.methods, {"xz": 9})
+        self.assertLess(stats.compressed_size, stats.size / 10)  # Solid: the repeated content compresses away
+        self.assertFalse(os.path.exists(archive_path + ".tmp"))
+
+    def test_reproducible_tar(self):
+        layout = self.make_layout({"b/2.txt": b"two", "a/1.dds": b"one" * 1000})
+        options = ArchiveOptions(format="tar.xz", reproducible=True)
+        contents = []
+        for mtime in (1_000_000_000, 1_500_000_000):
+            for source, _ in layout:
+                os.utime(source, (mtime, mtime))
+                os.chmod(source, 0o600 if mtime == 1_000_000_000 else 0o755)
+            archive_path = os.path.join(self.test_dir, f"Mod{mtime}.tar.xz")
+            archive_packer(options).pack(layout, archive_path)
+            with open(archive_path, "rb") as f:
+                contents.append(f.read())
+        self.assertEqual(contents[0], contents[1])
+        with tarfile.open(archive_path) as archive:
+            self.assertEqual(archive.getnames(), ["a/1.dds", "b/2.txt"])
+            self.assertEqual(archive.getmember("a/1.dds").mode, 0o644)
+            self.assertEqual(archive.getmember("a/1.dds").mtime, 315532800)
+
+    def test_failed_tar_keeps_previous_archive(self):
+        archive_path = os.path.join(self.test_dir, "Mod.tar.xz")
+        layout = self.make_layout({"a.txt": b"a"})
+        packer = archive_packer(ArchiveOptions(format="tar.xz"))
+        packer.pack(layout, archive_path)
+        with self.assertRaises(FileNotFoundError):
+            packer.pack(layout + [(os.path.join(self.test_dir, "missing"), "b.txt")], archive_path)
+        self.assert_tar_contents(archive_path, {"a.txt": b"a"})
+        self.assertFalse(os.path.exists(archive_path + ".tmp"))
+
+    def test_formats(self):
+        self.assertEqual(archive_formats()[:2], ("zip", "tar.xz"))
+        self.assertIsInstance(archive_packer(ArchiveOptions()), ParallelZipPacker)
+        with self.assertRaises(ValueError):
+            ArchiveOptions(format="rar")
+        self.assertNotEqual(ArchiveOptions().cache_token(), ArchiveOptions(format="tar.xz").cache_token())
+
+    @unittest.skipUnless(zstd, "compression.zstd is not available")
+    def test_tar_zst_round_trip(self):
+        files = {f"textures/{i}.dds": bytes([i]) * 100_000 for i in range(4)}
+        archive_path = os.path.join(self.test_dir, "Mod.tar.zst")
+        stats = archive_packer(ArchiveOptions(format="tar.zst", workers=2)).pack(self.make_layout(files), archive_path)
+        self.assertEqual(stats.methods, {"zstd": 4})
+        self.assert_tar_contents(archive_path, files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+
+from fomod_batch import BuildOptions, FomodBatchBuilder, find_mod_roots
+
+log = logging.getLogger("test_logger")
+
+
+class TestFomodBatchBuilder(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.test_dir, "out")
+        for name in ("Beta", "alpha", "Gamma"):
+            os.makedirs(os.path.join(self.test_dir, name, "10 Option", "Data Files", "meshes"))
+        with open(os.path.join(self.test_dir, "Broken.zip"), "wb") as f:
+            f.write(b"not a zip")
+        with open(os.path.join(self.test_dir, "notes.txt"), "w") as f:
+            f.write("ignored")
+        log.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        log.info(f"Completed test: {self._testMethodName}\n")
+
+    def test_find_mod_roots_skips_outputs_and_files(self):
+        os.makedirs(self.output_dir)
+        os.makedirs(os.path.join(self.test_dir, "fomod_output"))
+        names = [os.path.basename(path) for path in find_mod_roots(self.test_dir, self.output_dir)]
+        self.assertEqual(names, ["alpha", "Beta", "Broken.zip", "Gamma"])
+
+    def test_batch_builds_every_mod_in_a_process_pool(self):
+        mod_dirs = find_mod_roots(self.test_dir)
+        options = BuildOptions(output_dir=self.output_dir, keep_existing_output=False)
+        finished = []
+        results = FomodBatchBuilder(mod_dirs, options, jobs=2).run(finished.append)
+
+        self.assertEqual([r.mod_dir for r in results], mod_dirs)
+        self.assertCountEqual([r.mod_dir for r in finished], mod_dirs)
+        by_name = {os.path.basename(r.mod_dir): r for r in results}
+        for name in ("alpha", "Beta", "Gamma"):
+            self.assertTrue(by_name[name].ok, by_name[name].error)
+            self.assertEqual(list(by_name[name].timings), ["parse", "xml", "validate"])
+            self.assertIn("FOMOD XML generated", by_name[name].output)
+            self.assertTrue(os.path.isfile(os.path.join(self.output_dir, name, "fomod", "ModuleConfig.xml")))
+        self.assertFalse(by_name["Broken.zip"].ok)
+
+        report = FomodBatchBuilder.report(results)
+        self.assertIn("3 of 4 mod(s) built", report)
+        self.assertIn("Broken.zip: ValueError", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
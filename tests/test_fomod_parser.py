@@ -1,9 +1,16 @@
+import io
 import os
 import shutil
+import tarfile
+import zipfile
 import unittest
 import tempfile
 import logging
-from fomod_parser import FomodManager
+from contextlib import redirect_stdout
+from fomod_parser import FomodManager, FomodParser, ArchiveFomodParser, Plugin
+from scan_cache import ScanCache
+from fomod_archive import ArchiveOptions
+from build_cache import BuildCache
 
 log = logging.getLogger("test_logger")
 
@@ -35,6 +42,24 @@ class TestFomodParser(unittest.TestCase):
                 with open(path, 'w') as f:
                     f.write(content)
 
+    @staticmethod
+    def flatten_steps(steps):
+        """Flattens parsed steps into comparable (step, group, plugin, relative path) tuples."""
+        rows = []
+        for step in steps:
+            for group in step.groups:
+                rows.append((step.name, group.name, None, None))
+                for plugin in group.plugins:
+                    rows.append((step.name, group.name, plugin.name, plugin.relative_path))
+        return rows
+
+    def backdate_tree(self, seconds=60):
+        """Moves every folder mtime into the past so the scan cache treats them as settled."""
+        past = os.stat(self.test_dir).st_mtime - seconds
+        for root, dirs, _ in os.walk(self.test_dir):
+            for path in [root] + [os.path.join(root, d) for d in dirs]:
+                os.utime(path, (past, past))
+
     def get_latest_xml_path(self):
         """Finds the latest generated XML path, handling timestamped directories."""
         mod_name = os.path.basename(os.path.normpath(self.test_dir))
@@ -156,6 +181,381 @@ class TestFomodParser(unittest.TestCase):
         self.assertNotIn(self.test_dir, xml_content, "XML contains absolute paths")
         self.assertIn("Data Files", xml_content, "Expected relative paths in XML")
 
+    # === Scanner Tests ===
+    def test_scan_tree_shape(self):
+        """Ensure the single-pass scan classifies plugins and groups and skips files and 'fomod'."""
+        structure = {
+            "fomod": {"info.xml": "<fomod/>"},
+            "readme.txt": "not a folder",
+            "20 Loose Plugin": {"textures": {"a.dds": "x"}},
+            "10 Packed Plugin": {"Data Files": {"meshes": None}},
+            "30 Options": {
+                "31 First": {"Data Files": None},
+                "notes.txt": "ignored",
+            },
+        }
+        self.create_structure(structure)
+        parser = FomodParser(self.test_dir)
+        parser.parse()
+
+        step_name = parser.steps[0].name
+        self.assertEqual(self.flatten_steps(parser.steps), [
+            (step_name, "Packed Plugin", None, None),
+            (step_name, "Packed Plugin", "Packed Plugin", "10 Packed Plugin\\Data Files"),
+            (step_name, "Loose Plugin", None, None),
+            (step_name, "Loose Plugin", "Loose Plugin", "20 Loose Plugin"),
+            (step_name, "Options", None, None),
+        ])
+
+    def test_parallel_scan_matches_serial(self):
+        """Ensure a threaded scan produces exactly the same tree as a serial scan."""
+        structure = {f"{i:02d} Option {i}": {"Data Files": {"textures": None}} for i in range(12)}
+        structure["50 Loose"] = {"meshes": None}
+        structure["60 Group"] = {"61 Nested": {"Data Files": None}}
+        self.create_structure(structure)
+
+        serial = FomodParser(self.test_dir)
+        serial.parse()
+        parallel = FomodParser(self.test_dir, workers=4)
+        parallel.parse()
+
+        self.assertEqual(self.flatten_steps(parallel.steps), self.flatten_steps(serial.steps))
+
+    def test_scan_cache_reuses_unchanged_folders(self):
+        """Ensure a reopen lists nothing when mtimes are unchanged, and picks up new folders."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        cache_dir = os.path.join(self.test_dir, "cache")
+        self.create_structure({
+            "Mod": {
+                "10 Packed": {"Data Files": {"textures": None}},
+                "20 Options": {"21 Loose": {"meshes": None}},
+            }
+        })
+        self.backdate_tree()
+
+        first = FomodParser(mod_dir, scan_cache=ScanCache.for_project(mod_dir, cache_dir))
+        first.parse()
+
+        cache = ScanCache.for_project(mod_dir, cache_dir)
+        reopened = FomodParser(mod_dir, scan_cache=cache)
+        reopened.parse()
+        self.assertEqual(cache.misses, 0)
+        self.assertEqual(self.flatten_steps(reopened.steps), self.flatten_steps(first.steps))
+
+        self.create_structure({"30 New": {"Data Files": None}}, mod_dir)
+        cache = ScanCache.for_project(mod_dir, cache_dir)
+        changed = FomodParser(mod_dir, scan_cache=cache)
+        changed.parse()
+        self.assertEqual(cache.misses, 2)  # the mod root and the new folder
+        self.assertIn("New", [group.name for group in changed.steps[0].groups])
+
+    def test_rescan_returns_diff_and_keeps_metadata(self):
+        """Ensure rescan reports added, removed and reclassified groups without losing user edits."""
+        self.create_structure({
+            "10 Packed": {"Data Files": {"textures": None}},
+            "20 Loose": {"meshes": None},
+            "30 Doomed": {"Data Files": None},
+        })
+        parser = FomodParser(self.test_dir)
+        parser.parse()
+        packed, loose, doomed = parser.steps[0].groups
+        loose.plugins[0].description = "Hand-written description"
+
+        shutil.rmtree(os.path.join(self.test_dir, "30 Doomed"))
+        self.create_structure({
+            "20 Loose": {"Data Files": None},
+            "40 Fresh": {"Data Files": None},
+        })
+        diff = parser.rescan()
+
+        self.assertEqual([g.name for g in diff.added], ["Fresh"])
+        self.assertEqual(diff.removed, [doomed])
+        self.assertEqual(diff.reclassified, [loose])
+        self.assertEqual([g.name for g in parser.steps[0].groups], ["Packed", "Loose", "Fresh"])
+        self.assertIs(parser.steps[0].groups[0], packed)
+        self.assertEqual(loose.plugins[0].description, "Hand-written description")
+        self.assertTrue(loose.plugins[0].relative_path.endswith("Data Files"))
+        self.assertFalse(parser.rescan())
+
+    def test_iter_parse_yields_events_in_order(self):
+        """Ensure iter_parse streams step, group and plugin events and builds the same tree."""
+        self.create_structure({
+            "20 Second": {"meshes": None},
+            "10 First": {"Data Files": None},
+            "30 Options": {"31 Nested": {"Data Files": None}},
+        })
+        parser = FomodParser(self.test_dir)
+        events = [(event.kind, event.node.name) for event in parser.iter_parse()]
+
+        step_name = parser.steps[0].name
+        self.assertEqual(events, [
+            ("step", step_name),
+            ("group", "First"), ("plugin", "First"),
+            ("group", "Second"), ("plugin", "Second"),
+            ("group", "Options"),
+        ])
+        reference = FomodParser(self.test_dir)
+        reference.parse()
+        self.assertEqual(self.flatten_steps(parser.steps), self.flatten_steps(reference.steps))
+
+    # === Archive Tests ===
+    def test_archive_parse_matches_extracted(self):
+        """Ensure zip and tar archives classify exactly like the extracted folder."""
+        mod_dir = os.path.join(self.test_dir, "20 Archived Mod")
+        self.create_structure({
+            "20 Archived Mod": {
+                "fomod": {"info.xml": "<fomod/>"},
+                "10 Packed": {"Data Files": {"textures": {"a.dds": "x"}}},
+                "20 Loose": {"meshes": {"b.nif": "x"}},
+                "30 Options": {"31 Nested": {"Data Files": {"c.esp": "x"}}},
+            }
+        })
+        extracted = FomodParser(mod_dir)
+        extracted.parse()
+
+        zip_path = os.path.join(self.test_dir, "mod.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:  # Files only, no folder entries
+            for root, _, files in os.walk(mod_dir):
+                for file in files:
+                    path = os.path.join(root, file)
+                    zf.write(path, os.path.relpath(path, self.test_dir))
+        tar_path = os.path.join(self.test_dir, "mod.tar.gz")
+        with tarfile.open(tar_path, "w:gz") as tf:
+            tf.add(mod_dir, arcname=os.path.basename(mod_dir))
+
+        for archive_path in (zip_path, tar_path):
+            parser = ArchiveFomodParser(archive_path)
+            parser.parse()
+            self.assertEqual(self.flatten_steps(parser.steps), self.flatten_steps(extracted.steps))
+
+        # Unwrapped archive whose only top-level folder is Data Files: not a wrapper
+        loose_dir = os.path.join(self.test_dir, "30 Loose Mod")
+        self.create_structure({"30 Loose Mod": {"Data Files": {"meshes": {"a.nif": "x"}}}})
+        extracted = FomodParser(loose_dir)
+        extracted.parse()
+        loose_zip = os.path.join(self.test_dir, "30 Loose Mod.zip")
+        with zipfile.ZipFile(loose_zip, "w") as zf:
+            zf.writestr("Data Files/meshes/a.nif", "x")
+        parser = ArchiveFomodParser(loose_zip)
+        parser.parse()
+        self.assertEqual(self.flatten_steps(parser.steps), self.flatten_steps(extracted.steps))
+        self.assertEqual([plugin.name for group in parser.steps[0].groups for plugin in group.plugins], ["Data Files"])
+
+    # === Node Model Tests ===
+    def test_plugin_paths_match_relpath(self):
+        """Ensure the lazily built plugin paths match os.path.relpath and stay assignable."""
+        base = os.path.join(self.test_dir, "Mod")
+        cases = [
+            os.path.join(base, "10 Group", "Data Files"),
+            os.path.join(base, "Loose"),
+            base,
+            os.path.join(self.test_dir, "Elsewhere", "Data Files"),
+        ]
+        for absolute_path in cases:
+            plugin = Plugin("10 Option", absolute_path, base)
+            self.assertEqual(plugin.relative_path, os.path.relpath(absolute_path, base).replace("/", "\\"))
+            self.assertEqual(plugin.absolute_path, os.path.normpath(absolute_path))
+
+        plugin = Plugin("Option", cases[1], base)
+        plugin.absolute_path = cases[0]
+        self.assertEqual(plugin.relative_path, "10 Group\\Data Files")
+        self.assertFalse(hasattr(plugin, "__dict__"))
+
+    # === Config Write Tests ===
+    def test_unchanged_config_is_not_rewritten(self):
+        """Ensure identical XML is skipped (keeping the mtime) and changed XML replaces the file."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({"10 Option": {"Data Files": {"meshes": None}}}, mod_dir)
+        manager = FomodManager(mod_dir, self.output_dir, keep_existing_output=False)
+        manager.run()
+        config_path = manager.file_manager.fomod_config_path
+        os.utime(config_path, ns=(1_000_000_000, 1_000_000_000))
+
+        manager.run()
+        self.assertEqual(os.stat(config_path).st_mtime_ns, 1_000_000_000)
+        self.assertEqual(manager.file_manager.skipped_writes, 1)
+        self.assertIn("1 unchanged write(s) skipped", manager.timing_summary())
+        self.assertEqual(list(manager.timings), ["parse", "xml", "validate"])
+
+        self.create_structure({"20 Extra": {"Data Files": {"meshes": None}}}, mod_dir)
+        manager.run()
+        self.assertNotEqual(os.stat(config_path).st_mtime_ns, 1_000_000_000)
+        with open(config_path, encoding="utf-8") as f:
+            self.assertIn("20 Extra", f.read())
+        self.assertEqual(os.listdir(os.path.dirname(config_path)), ["ModuleConfig.xml"])
+
+    def test_failed_config_write_keeps_old_file(self):
+        """Ensure an interrupted write leaves the previous config intact and no temp file behind."""
+        manager = FomodManager(self.test_dir, self.output_dir, keep_existing_output=False)
+        file_manager = manager.file_manager
+        self.assertTrue(file_manager.write_fomod_config("<config/>"))
+
+        def failing_write(f):
+            f.write("<config>")
+            raise RuntimeError("interrupted")
+
+        with self.assertRaises(RuntimeError):
+            file_manager.stream_fomod_config(failing_write)
+        with open(file_manager.fomod_config_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "<config/>")
+        self.assertEqual(os.listdir(file_manager.fomod_dir), ["ModuleConfig.xml"])
+        self.assertFalse(file_manager.write_fomod_config("<config/>"))
+
+    def test_structure_links_files_and_keeps_source(self):
+        """Ensure structure generation hardlinks files, moves data folders under Data Files and can rerun."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({
+            "10 Option": {"textures": {"a.dds": "texture"}, "readme.txt": "read me"},
+            "fomod": {"ModuleConfig.xml": "<old/>", "header.png": "png"},
+        }, mod_dir)
+        manager = FomodManager(mod_dir, self.output_dir, keep_existing_output=False, link_mode="hardlink")
+        manager.run(generate_structure=True)
+        output_dir = manager.file_manager.output_dir
+
+        texture = os.path.join(output_dir, "10 Option", "Data Files", "textures", "a.dds")
+        self.assertTrue(os.path.samefile(texture, os.path.join(mod_dir, "10 Option", "textures", "a.dds")))
+        self.assertEqual(manager.file_manager.placed, {"hardlinked": 3})
+        self.assertTrue(os.path.isdir(os.path.join(mod_dir, "10 Option", "textures")))
+        with open(manager.file_manager.fomod_config_path, encoding="utf-8") as f:
+            self.assertIn("<moduleName>Mod</moduleName>", f.read())
+
+        os.remove(os.path.join(mod_dir, "10 Option", "readme.txt"))
+        manager.run(generate_structure=True)
+        self.assertFalse(os.path.exists(os.path.join(output_dir, "10 Option", "readme.txt")))
+        self.assertTrue(os.path.exists(texture))
+        self.assertEqual(sorted(os.listdir(manager.file_manager.fomod_dir)), ["ModuleConfig.xml", "header.png"])
+
+    def test_plan_structure_targets(self):
+        """Ensure the structure plan inserts Data Files once and leaves out the outputs and the old config."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({
+            "10 Loose": {"Meshes": {"a.nif": "a"}, "textures": None, "docs": {"readme.txt": "r"}},
+            "20 Packed": {"Data Files": {"meshes": {"b.nif": "b"}}},
+            "fomod": {"ModuleConfig.xml": "<old/>"},
+        }, mod_dir)
+        manager = FomodManager(mod_dir, os.path.join(mod_dir, "out"), keep_existing_output=False)
+        plan = [(entry.target.replace(os.sep, "/"), entry.is_dir) for entry in manager.file_manager.plan_structure()]
+        self.assertEqual(plan, [
+            ("10 Loose", True),
+            ("10 Loose/Data Files", True),
+            ("10 Loose/Data Files/Meshes", True),
+            ("10 Loose/Data Files/Meshes/a.nif", False),
+            ("10 Loose/docs", True),
+            ("10 Loose/docs/readme.txt", False),
+            ("10 Loose/Data Files/textures", True),
+            ("20 Packed", True),
+            ("20 Packed/Data Files", True),
+            ("20 Packed/Data Files/meshes", True),
+            ("20 Packed/Data Files/meshes/b.nif", False),
+            ("fomod", True),  # "out" holds the output folder and the archives, so it is left out
+        ])
+
+    def test_archive_from_virtual_layout(self):
+        """Ensure the archive gets the restructured layout without the structure being written to disk."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({
+            "10 Option": {"textures": {"a.dds": "texture"}},
+            "fomod": {"ModuleConfig.xml": "<old/>", "header.png": "png"},
+        }, mod_dir)
+        manager = FomodManager(mod_dir, self.output_dir, keep_existing_output=False)
+        manager.run()
+        zip_path = manager.generate_archive("1.0")
+
+        self.assertEqual(os.listdir(manager.file_manager.output_dir), ["fomod"])
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(sorted(archive.namelist()), [
+                "10 Option/Data Files/textures/a.dds", "fomod/ModuleConfig.xml", "fomod/header.png"])
+            self.assertIn(b"<moduleName>Mod</moduleName>", archive.read("fomod/ModuleConfig.xml"))
+
+        manager.generate_new_structure()
+        structure = sorted(os.path.relpath(os.path.join(root, name), manager.file_manager.output_dir).replace(os.sep, "/")
+                           for root, _, files in os.walk(manager.file_manager.output_dir) for name in files)
+        with zipfile.ZipFile(zip_path) as archive:
+            self.assertEqual(sorted(archive.namelist()), structure)
+
+    def test_archive_folder_inside_mod_is_skipped(self):
+        """Ensure earlier archives in an archive folder inside the mod are neither packed nor placed."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({"10 Option": {"textures": {"a.dds": "texture"}}}, mod_dir)
+        manager = FomodManager(mod_dir, os.path.join(mod_dir, "dist"), keep_existing_output=False)
+        manager.run()
+        first = manager.generate_archive("1")
+        second = manager.generate_archive("2")
+
+        self.assertEqual(os.path.dirname(first), os.path.join(mod_dir, "dist"))
+        with zipfile.ZipFile(second) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["10 Option/Data Files/textures/a.dds", "fomod/ModuleConfig.xml"])
+        manager.generate_new_structure()
+        self.assertEqual(sorted(os.listdir(manager.file_manager.output_dir)), ["10 Option", "fomod"])
+
+    def test_incremental_archive_uses_last_built_zip(self):
+        """Ensure incremental packaging copies unchanged files from the zip this mod last built."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({"10 Option": {"textures": {"a.dds": "a" * 1000, "b.dds": "b" * 1000}}}, mod_dir)
+        manager = FomodManager(mod_dir, self.output_dir, keep_existing_output=False,
+                               archive_options=ArchiveOptions(incremental=True))
+        manager.file_manager.archive_record = os.path.join(self.test_dir, "record.json")
+        manager.run()
+        self.assertIsNone(manager.file_manager.previous_archive())
+        first = manager.generate_archive("1.0")
+        self.assertEqual(manager.file_manager.previous_archive(), first)
+        with zipfile.ZipFile(os.path.join(self.output_dir, "Mod_Extras_2.0.zip"), "w") as other:  # Another mod's zip
+            other.writestr("10 Option/Data Files/textures/a.dds", "a" * 1000)
+        self.assertEqual(manager.file_manager.previous_archive(), first)
+
+        with open(os.path.join(mod_dir, "10 Option", "textures", "b.dds"), "w") as f:
+            f.write("changed")
+        with redirect_stdout(io.StringIO()) as output:
+            second = manager.generate_archive("1.1")
+        self.assertIn("2 reused from Mod_1.0.zip", output.getvalue())  # a.dds and the unchanged config
+        with zipfile.ZipFile(second) as archive:
+            self.assertEqual(archive.read("10 Option/Data Files/textures/b.dds"), b"changed")
+        with zipfile.ZipFile(first) as archive:
+            self.assertEqual(archive.read("10 Option/Data Files/textures/b.dds"), b"b" * 1000)
+
+    def test_reproducible_archive_uses_build_cache(self):
+        """Ensure reproducible archives are byte-identical and unchanged inputs come from the build cache."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({"10 Option": {"textures": {"a.dds": "a" * 1000}}}, mod_dir)
+        manager = FomodManager(mod_dir, self.output_dir, keep_existing_output=False,
+                               archive_options=ArchiveOptions(reproducible=True))
+        manager.file_manager.build_cache = BuildCache(os.path.join(self.test_dir, "cache"))
+        manager.run()
+        first = manager.generate_archive("1.0")
+
+        with redirect_stdout(io.StringIO()) as output:
+            second = manager.generate_archive("1.1")
+        self.assertIn("taken from the build cache", output.getvalue())
+        with open(first, "rb") as a, open(second, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        with open(second, "rb") as f:
+            original = f.read()
+        with open(second, "r+b") as f:  # Edited in place, e.g. by a mod manager
+            f.write(b"corrupt")
+        third = manager.generate_archive("1.1")  # The cache entry is not linked to the edited file
+        with open(third, "rb") as f:
+            self.assertEqual(f.read(), original)
+
+        with open(os.path.join(mod_dir, "10 Option", "textures", "a.dds"), "w") as f:
+            f.write("changed")
+        with redirect_stdout(io.StringIO()) as output:
+            third = manager.generate_archive("1.2")
+        self.assertIn("Archive created", output.getvalue())
+        with zipfile.ZipFile(third) as archive:
+            self.assertEqual(archive.read("10 Option/Data Files/textures/a.dds"), b"changed")
+
+    def test_structure_copy_mode(self):
+        """Ensure copy mode produces independent files."""
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        self.create_structure({"10 Option": {"Data Files": {"meshes": {"b.nif": "mesh"}}}}, mod_dir)
+        manager = FomodManager(mod_dir, self.output_dir, link_mode="copy")
+        manager.run(generate_structure=True)
+        mesh = os.path.join(manager.file_manager.output_dir, "10 Option", "Data Files", "meshes", "b.nif")
+        self.assertFalse(os.path.samefile(mesh, os.path.join(mod_dir, "10 Option", "Data Files", "meshes", "b.nif")))
+        self.assertEqual(manager.file_manager.placed, {"copied": 1})
+        with self.assertRaises(ValueError):
+            FomodManager(mod_dir, self.output_dir, link_mode="symlink")
+
 
 if __name__ == "__main__":
     unittest.main()
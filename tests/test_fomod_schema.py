@@ -0,0 +1,141 @@
+import os
+import io
+import shutil
+import tempfile
+import unittest
+import logging
+from contextlib import redirect_stdout
+
+from fomod_parser import FomodManager, FomodXMLWriter, Step, Group, Plugin
+from fomod_schema import FomodSchemaValidator, get_validator
+
+log = logging.getLogger("test_logger")
+
+VALID_CONFIG = """<?xml version="1.0" encoding="utf-8"?>
+<config xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="http://qconsulting.ca/fo3/ModConfig5.0.xsd">
+  <moduleName position="Right">Inherited Mod</moduleName>
+  <requiredInstallFiles><folder source="core"/></requiredInstallFiles>
+  <installSteps order="Explicit">
+    <installStep name="Options">
+      <visible><flagDependency flag="a" value="On"/></visible>
+      <optionalFileGroups order="Explicit">
+        <group name="Textures" type="SelectExactlyOne">
+          <plugins order="Explicit">
+            <plugin name="High">
+              <description>Big textures</description>
+              <image path="img\\high.png"/>
+              <conditionFlags><flag name="a">On</flag></conditionFlags>
+              <typeDescriptor>
+                <dependencyType>
+                  <defaultType name="Optional"/>
+                  <patterns>
+                    <pattern>
+                      <dependencies operator="Or"><fileDependency file="x.esp" state="Active"/></dependencies>
+                      <type name="Recommended"/>
+                    </pattern>
+                  </patterns>
+                </dependencyType>
+              </typeDescriptor>
+            </plugin>
+          </plugins>
+        </group>
+      </optionalFileGroups>
+    </installStep>
+  </installSteps>
+</config>
+"""
+
+
+class TestFomodSchemaValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.validator = get_validator()
+        log.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        log.info(f"Completed test: {self._testMethodName}\n")
+
+    def test_validator_is_built_once(self):
+        self.assertIs(get_validator(), self.validator)
+
+    def test_accepts_valid_config(self):
+        self.assertEqual(self.validator.validate(VALID_CONFIG), [])
+
+    def test_accepts_writer_output(self):
+        step = Step("Mod")
+        group = Group("10 Option")
+        group.add_plugin(Plugin("10 Option", os.path.join(self.test_dir, "10 Option"), self.test_dir,
+                                image_path="images/a.png", description="Text & more"))
+        step.add_group(group)
+        self.assertEqual(self.validator.validate(FomodXMLWriter([step]).generate_xml()), [])
+
+    def test_reports_errors_with_line_numbers(self):
+        broken = (VALID_CONFIG
+                  .replace('type="SelectExactlyOne"', 'type="PickOne"')
+                  .replace('<image path="img\\high.png"/>', '<image/>')
+                  .replace('<type name="Recommended"/>', '<type name="Recommended" extra="1"/>')
+                  .replace("<description>Big textures</description>", ""))
+        errors = self.validator.validate(broken)
+        self.assertEqual([(e.line, e.message.split(" ")[0]) for e in errors], [
+            (9, "Invalid"),   # group type
+            (11, "Invalid"),  # plugin content: no description
+            (13, "Missing"),  # image path
+            (21, "Attribute"),  # extra attribute
+        ])
+        self.assertIn("SelectExactlyOne", errors[0].message)
+        self.assertIn("found (image, conditionFlags, typeDescriptor)", errors[1].message)
+
+    def test_reports_unexpected_elements_and_text(self):
+        errors = self.validator.validate("<config><moduleName>M</moduleName>\n<bogus/>stray</config>")
+        self.assertEqual([str(e) for e in errors], [
+            "line 2, column 1: Unexpected element <bogus> in <config>; expected "
+            "(moduleName, moduleImage?, moduleDependencies?, requiredInstallFiles?, installSteps?, conditionalFileInstalls?)",
+            "line 2, column 14: Text is not allowed in <config>",
+        ])
+
+    def test_checks_text_again_after_string_content(self):
+        errors = self.validator.validate("<config><moduleName>M<b>x</b></moduleName>stray</config>")
+        self.assertEqual([str(e) for e in errors], [
+            "line 1, column 22: Element <moduleName> may only contain text, found <b>",
+            "line 1, column 48: Text is not allowed in <config>",
+        ])
+
+    def test_reports_malformed_xml(self):
+        errors = self.validator.validate("<config>\n<moduleName>M</config>")
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].line, 2)
+        self.assertIn("Malformed XML", errors[0].message)
+
+    def test_custom_schema(self):
+        schema = os.path.join(self.test_dir, "tiny.xsd")
+        with open(schema, "w", encoding="utf-8") as f:
+            f.write('<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">'
+                    '<xs:element name="root"><xs:complexType><xs:sequence>'
+                    '<xs:element name="item" type="xs:integer" minOccurs="2" maxOccurs="3"/>'
+                    '</xs:sequence></xs:complexType></xs:element></xs:schema>')
+        validator = FomodSchemaValidator(schema)
+        self.assertEqual(validator.validate("<root><item>1</item><item>2</item></root>"), [])
+        self.assertEqual(len(validator.validate("<root><item>1</item></root>")), 1)
+        self.assertEqual(len(validator.validate("<root><item>x</item><item>2</item></root>")), 1)
+
+    def test_manager_run_validates_output(self):
+        os.makedirs(os.path.join(self.test_dir, "Mod", "10 Option", "Data Files"))
+        os.makedirs(os.path.join(self.test_dir, "Empty Mod"))
+        out = os.path.join(self.test_dir, "out")
+
+        manager = FomodManager(os.path.join(self.test_dir, "Mod"), output_dir=out)
+        with redirect_stdout(io.StringIO()):
+            manager.run()
+        self.assertEqual(manager.validation_errors, [])
+
+        manager = FomodManager(os.path.join(self.test_dir, "Empty Mod"), output_dir=out)
+        with redirect_stdout(io.StringIO()) as output:
+            manager.run()
+        self.assertEqual(len(manager.validation_errors), 1)  # A step without groups
+        self.assertIn("optionalFileGroups", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,322 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from contextlib import redirect_stdout
+import xml.etree.ElementTree as ET
+from xml.dom.minidom import parseString
+
+from fomod_parser import FomodParser, FomodXMLWriter, FomodXMLReader, FomodManager, Step, Group, Plugin
+
+log = logging.getLogger("test_logger")
+
+
+def legacy_generate_xml(steps) -> str:
+    """The original ElementTree + minidom serialisation, kept as the formatting reference."""
+    root = ET.Element("config", {
+        "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+        "xsi:noNamespaceSchemaLocation": "http://qconsulting.ca/fo3/ModConfig5.0.xsd"
+    })
+    module_name = ET.SubElement(root, "moduleName")
+    module_name.text = steps[0].name if steps else "Unnamed Mod"
+    install_steps = ET.SubElement(root, "installSteps", order="Explicit")
+    for step in steps:
+        step_element = ET.SubElement(install_steps, "installStep", name=step.name)
+        file_groups = ET.SubElement(step_element, "optionalFileGroups", order="Explicit")
+        for group in step.groups:
+            group_element = ET.SubElement(file_groups, "group", name=group.name, type="SelectAny")
+            plugins = ET.SubElement(group_element, "plugins", order="Explicit")
+            for plugin in group.plugins:
+                plugin_element = ET.SubElement(plugins, "plugin", name=plugin.name)
+                description = ET.SubElement(plugin_element, "description")
+                description.text = plugin.description or "Auto-generated description."
+                if plugin.image_path:
+                    ET.SubElement(plugin_element, "image", path=plugin.image_path.replace("/", "\\"))
+                files = ET.SubElement(plugin_element, "files")
+                ET.SubElement(files, "folder", source=plugin.relative_path, destination="\\", priority="0")
+                type_descriptor = ET.SubElement(plugin_element, "typeDescriptor")
+                ET.SubElement(type_descriptor, "type", name=plugin.type_descriptor or "Optional")
+    return parseString(ET.tostring(root, encoding="utf-8")).toprettyxml(indent="  ")
+
+
+class TestFomodXMLWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        log.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        log.info(f"Completed test: {self._testMethodName}\n")
+
+    def build_steps(self):
+        """A tree exercising escaping, images, empty groups and empty steps."""
+        base = self.test_dir
+        step = Step("Tricky & <Mod>")
+        plain = Group("10 Plain")
+        plain.add_plugin(Plugin("10 Plain", os.path.join(base, "10 Plain", "Data Files"), base))
+        fancy = Group('20 "Quoted" Group')
+        fancy.add_plugin(Plugin('20 "Quoted" Group', os.path.join(base, "20 Q & A"), base,
+                                image_path="images/a&b.png",
+                                description='Line one\r\nLine "two" <b>\n\tTabbed & done',
+                                type_descriptor="Recommended"))
+        step.add_group(fancy)
+        step.add_group(plain)
+        step.add_group(Group("30 Empty"))
+        return [step, Step("Empty Step"), Step("123")]
+
+    def test_streaming_matches_minidom_output(self):
+        steps = self.build_steps()
+        self.assertEqual(FomodXMLWriter(steps).generate_xml(), legacy_generate_xml(steps))
+
+    def test_streaming_matches_minidom_for_edge_cases(self):
+        self.assertEqual(FomodXMLWriter([]).generate_xml(), legacy_generate_xml([]))
+        single = [Step("123")]
+        self.assertEqual(FomodXMLWriter(single).generate_xml(), legacy_generate_xml(single))
+
+    def test_write_events_from_iter_parse(self):
+        for name in ("10 First", "20 Second"):
+            os.makedirs(os.path.join(self.test_dir, name, "Data Files"))
+        os.makedirs(os.path.join(self.test_dir, "30 Group", "31 Nested", "Data Files"))
+        parser = FomodParser(self.test_dir)
+        buffer = io.StringIO()
+        FomodXMLWriter.write_events(buffer, parser.iter_parse())
+        self.assertEqual(buffer.getvalue(), legacy_generate_xml(parser.steps))
+
+    # === Fragment Cache Tests ===
+    def test_cached_fragments_match_streaming(self):
+        steps = self.build_steps()
+        self.assertEqual(FomodXMLWriter(steps, cache_fragments=True).generate_xml(), legacy_generate_xml(steps))
+
+    def test_edit_reserialises_only_dirty_path(self):
+        steps = self.build_steps()
+        writer = FomodXMLWriter(steps, cache_fragments=True)
+        writer.generate_xml()
+        fancy, plain, empty = steps[0].groups
+        untouched = plain.plugins[0]._xml
+
+        fancy.plugins[0].description = "Edited"
+        self.assertIsNone(fancy.plugins[0]._xml)
+        self.assertIsNone(fancy._xml)
+        self.assertIsNone(steps[0]._xml)
+        self.assertIs(plain._xml and plain.plugins[0]._xml, untouched)
+
+        self.assertEqual(writer.generate_xml(), legacy_generate_xml(steps))
+        self.assertIs(plain.plugins[0]._xml, untouched)
+
+    def test_cache_follows_rescan(self):
+        os.makedirs(os.path.join(self.test_dir, "10 First", "Data Files"))
+        parser = FomodParser(self.test_dir)
+        parser.parse()
+        writer = FomodXMLWriter(parser.steps, cache_fragments=True)
+        writer.generate_xml()
+
+        os.makedirs(os.path.join(self.test_dir, "20 Second", "meshes"))
+        parser.rescan()
+        self.assertEqual(writer.generate_xml(), legacy_generate_xml(parser.steps))
+
+    # === Importer Tests ===
+    def test_reader_round_trips_writer_output(self):
+        xml = FomodXMLWriter(self.build_steps()).generate_xml()
+        reader = FomodXMLReader(io.BytesIO(xml.encode("utf-8")), self.test_dir)
+        steps = reader.read()
+        self.assertEqual(reader.module_name, "Tricky & <Mod>")
+        self.assertEqual(FomodXMLWriter(steps, module_name=reader.module_name).generate_xml(), xml)
+
+        plugin = steps[0].groups[0].plugins[0]
+        self.assertEqual(plugin.relative_path, "20 Q & A")
+        self.assertEqual(plugin.absolute_path, os.path.join(self.test_dir, "20 Q & A"))
+        self.assertEqual(plugin.type_descriptor, "Recommended")
+        self.assertIs(plugin.parent, steps[0].groups[0])
+
+    def test_reader_keeps_foreign_config_details(self):
+        xml = b"""<?xml version="1.0" encoding="utf-8"?>
+<config>
+  <moduleName>Inherited Mod</moduleName>
+  <requiredInstallFiles><folder source="core"/></requiredInstallFiles>
+  <installSteps order="Explicit">
+    <installStep name="01 Options">
+      <optionalFileGroups order="Explicit">
+        <group name="Textures" type="SelectExactlyOne">
+          <plugins order="Explicit">
+            <plugin name="01 High">
+              <description>Big textures</description>
+              <files><file source="high\\tex.dds" destination="textures\\tex.dds"/></files>
+              <typeDescriptor>
+                <dependencyType><defaultType name="Recommended"/><patterns/></dependencyType>
+              </typeDescriptor>
+            </plugin>
+          </plugins>
+        </group>
+      </optionalFileGroups>
+    </installStep>
+  </installSteps>
+</config>"""
+        reader = FomodXMLReader(io.BytesIO(xml), self.test_dir)
+        steps = reader.read()
+        self.assertEqual([s.name for s in steps], ["01 Options"])
+        group = steps[0].groups[0]
+        self.assertEqual((group.name, group.group_type), ("Textures", "SelectExactlyOne"))
+        plugin = group.plugins[0]
+        self.assertEqual(plugin.name, "01 High")
+        self.assertEqual(plugin.relative_path, "high\\tex.dds")
+        self.assertEqual(plugin.type_descriptor, "Recommended")
+        self.assertIn('type="SelectExactlyOne"', FomodXMLWriter(steps).generate_xml())
+        self.assertEqual(reader.dropped, [
+            "<requiredInstallFiles>",
+            "<file> source 'high\\tex.dds' of plugin '01 High' (imported as a folder)",
+            "destination and priority of 'high\\tex.dds' in plugin '01 High'",
+        ])
+
+    def test_reader_reports_what_it_cannot_hold(self):
+        xml = b"""<config>
+  <moduleName>Conditional Mod</moduleName>
+  <installSteps order="Explicit">
+    <installStep name="Extras">
+      <visible><flagDependency flag="extras" value="On"/></visible>
+      <optionalFileGroups order="Explicit">
+        <group name="Extras" type="SelectAny">
+          <plugins order="Explicit">
+            <plugin name="Both">
+              <description>Two folders</description>
+              <files><folder source="a" destination="\\" priority="0"/><folder source="b"/></files>
+              <conditionFlags><flag name="extras">On</flag></conditionFlags>
+              <typeDescriptor>
+                <dependencyType>
+                  <defaultType name="Optional"/>
+                  <patterns><pattern><dependencies operator="And"><fileDependency file="x.esp" state="Active"/>
+                  </dependencies><type name="Recommended"/></pattern></patterns>
+                </dependencyType>
+              </typeDescriptor>
+            </plugin>
+          </plugins>
+        </group>
+      </optionalFileGroups>
+    </installStep>
+  </installSteps>
+  <conditionalFileInstalls><patterns/></conditionalFileInstalls>
+</config>"""
+        reader = FomodXMLReader(io.BytesIO(xml), self.test_dir)
+        reader.read()
+        self.assertEqual(reader.dropped, [
+            "visibility conditions of step 'Extras'",
+            "1 more file(s) of plugin 'Both'",
+            "condition flags of plugin 'Both'",
+            "type patterns of plugin 'Both' (its default type is kept)",
+            "<conditionalFileInstalls>",
+        ])
+
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(mod_dir, "fomod"))
+        with open(os.path.join(mod_dir, "fomod", "ModuleConfig.xml"), "wb") as f:
+            f.write(xml)
+        manager = FomodManager(mod_dir, output_dir=os.path.join(self.test_dir, "out"), keep_existing_output=False)
+        with self.assertRaises(ValueError):
+            manager.import_xml(strict=True)
+        self.assertEqual(manager.parser.steps, [])
+        with redirect_stdout(io.StringIO()) as output:
+            manager.import_xml()
+        self.assertIn("Not imported", output.getvalue())
+        self.assertIn("condition flags of plugin 'Both'", output.getvalue())
+
+    def test_reader_keeps_order_and_module_name_attributes(self):
+        xml = b"""<config>
+  <moduleName position="RightOfImage" colour="FF00FF">Ordered Mod</moduleName>
+  <installSteps order="Descending">
+    <installStep name="First">
+      <optionalFileGroups order="Ascending">
+        <group name="Default" type="SelectAny">
+          <plugins>
+            <plugin name="A"><description>a</description><files><folder source="a"/></files>
+              <typeDescriptor><type name="Optional"/></typeDescriptor></plugin>
+          </plugins>
+        </group>
+      </optionalFileGroups>
+    </installStep>
+    <installStep name="Second">
+      <optionalFileGroups>
+        <group name="Reversed" type="SelectAny"><plugins order="Descending"/></group>
+      </optionalFileGroups>
+    </installStep>
+  </installSteps>
+</config>"""
+        reader = FomodXMLReader(io.BytesIO(xml), self.test_dir)
+        steps = reader.read()
+        self.assertEqual(reader.dropped, [])
+        self.assertEqual(reader.install_order, "Descending")
+        self.assertEqual(reader.module_name_attrs, {"position": "RightOfImage", "colour": "FF00FF"})
+        self.assertEqual([(step.order, [group.order for group in step.groups]) for step in steps],
+                         [("Ascending", ["Ascending"]), ("Ascending", ["Descending"])])  # Missing: schema default
+
+        outputs = [FomodXMLWriter(steps, cache_fragments=cached, module_name=reader.module_name,
+                                  module_name_attrs=reader.module_name_attrs,
+                                  install_order=reader.install_order).generate_xml() for cached in (False, True)]
+        streamed_reader = FomodXMLReader(io.BytesIO(xml), self.test_dir)
+        buffer = io.StringIO()
+        FomodXMLWriter.write_events(buffer, streamed_reader.iter_read(), config=streamed_reader)
+        outputs.append(buffer.getvalue())
+        for output in outputs:
+            self.assertIn('<moduleName position="RightOfImage" colour="FF00FF">Ordered Mod</moduleName>', output)
+            self.assertIn('<installSteps order="Descending">', output)
+            self.assertEqual(output.count('<optionalFileGroups order="Ascending">'), 2)
+            self.assertEqual(output.count('<plugins order="Ascending">'), 1)
+            self.assertEqual(output.count('<plugins order="Descending"/>'), 1)
+            self.assertNotIn("Explicit", output)
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(mod_dir, "fomod"))
+        with open(os.path.join(mod_dir, "fomod", "ModuleConfig.xml"), "w", encoding="utf-8") as f:
+            f.write(outputs[0])
+        manager = FomodManager(mod_dir, output_dir=os.path.join(self.test_dir, "out"), keep_existing_output=False)
+        manager.import_xml()
+        manager.write_xml()
+        with open(manager.file_manager.fomod_config_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), outputs[0])
+
+    def test_reader_events_stream_into_writer(self):
+        xml = FomodXMLWriter(self.build_steps()).generate_xml()
+        reader = FomodXMLReader(io.BytesIO(xml.encode("utf-8")), self.test_dir)
+        buffer = io.StringIO()
+        FomodXMLWriter.write_events(buffer, reader.iter_read(), "Tricky & <Mod>")
+        self.assertEqual(buffer.getvalue(), xml)
+
+    def test_manager_imports_existing_config(self):
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(mod_dir, "fomod"))
+        xml = FomodXMLWriter(self.build_steps()).generate_xml()
+        with open(os.path.join(mod_dir, "fomod", "ModuleConfig.xml"), "w", encoding="utf-8") as f:
+            f.write(xml)
+
+        manager = FomodManager(mod_dir, output_dir=os.path.join(self.test_dir, "out"), keep_existing_output=False)
+        manager.import_xml()
+        manager.write_xml()
+        with open(manager.file_manager.fomod_config_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), xml)
+
+    def test_manager_run_keeps_imported_config(self):
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(mod_dir, "fomod"))
+        os.makedirs(os.path.join(mod_dir, "10 Textures", "Data Files"))
+        step = Step("Setup")
+        group = Group("Textures", group_type="SelectExactlyOne")
+        group.add_plugin(Plugin("Textures", os.path.join(mod_dir, "10 Textures", "Data Files"), mod_dir,
+                                description="Hand-written", type_descriptor="Recommended"))
+        step.add_group(group)
+        xml = FomodXMLWriter([step], module_name="Imported").generate_xml()
+        with open(os.path.join(mod_dir, "fomod", "ModuleConfig.xml"), "w", encoding="utf-8") as f:
+            f.write(xml)
+
+        manager = FomodManager(mod_dir, output_dir=os.path.join(self.test_dir, "out"), keep_existing_output=False)
+        manager.import_xml()
+        with redirect_stdout(io.StringIO()):
+            manager.run()
+        with open(manager.file_manager.fomod_config_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), xml)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import logging
+import queue
+from contextlib import redirect_stdout
+import io
+
+from fs_watcher import ChangeSet, DirectoryWatcher, PollingBackend
+from fomod_parser import FomodParser, FomodManager
+
+log = logging.getLogger("test_logger")
+
+
+class TestFsWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        log.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        log.info(f"Completed test: {self._testMethodName}\n")
+
+    def watch(self, use_inotify):
+        """Starts a watcher that collects change sets; returns (watcher, batches, event)."""
+        batches = []
+        received = threading.Event()
+
+        def on_change(changes):
+            batches.append(changes)
+            received.set()
+
+        watcher = DirectoryWatcher(self.test_dir, on_change, debounce=0.3, use_inotify=use_inotify,
+                                   poll_interval=0.1).start()
+        self.addCleanup(watcher.stop)
+        return watcher, batches, received
+
+    def copy_burst(self, folders=20, files=10):
+        for i in range(folders):
+            folder = os.path.join(self.test_dir, f"Option {i}", "textures")
+            os.makedirs(folder)
+            for j in range(files):
+                with open(os.path.join(folder, f"tex_{j}.dds"), "w") as f:
+                    f.write("x")
+
+    def test_change_set_cancels_create_then_delete(self):
+        changes = ChangeSet()
+        changes.add("created", "/mod/tmp.part", False)
+        changes.add("deleted", "/mod/tmp.part", False)
+        changes.add("deleted", "/mod/old", True)
+        changes.add("created", "/mod/old", True)
+        self.assertEqual(changes.created, set())
+        self.assertEqual(changes.modified, {"/mod/old"})
+        self.assertTrue(changes.folders_changed)
+        self.assertFalse(changes.files_changed)
+
+    def test_polling_backend_detects_changes(self):
+        os.makedirs(os.path.join(self.test_dir, "Keep"))
+        with open(os.path.join(self.test_dir, "Keep", "a.txt"), "w") as f:
+            f.write("1")
+        backend = PollingBackend(self.test_dir, interval=0)
+
+        os.makedirs(os.path.join(self.test_dir, "New", "meshes"))
+        with open(os.path.join(self.test_dir, "Keep", "a.txt"), "w") as f:
+            f.write("changed")
+        events = set(backend.read(0))
+
+        self.assertIn(("created", os.path.join(self.test_dir, "New"), True), events)
+        self.assertIn(("created", os.path.join(self.test_dir, "New", "meshes"), True), events)
+        self.assertIn(("modified", os.path.join(self.test_dir, "Keep", "a.txt"), False), events)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_burst_is_one_change_set(self):
+        watcher, batches, received = self.watch(use_inotify=True)
+        self.copy_burst()
+        self.assertTrue(received.wait(5))
+        watcher.stop()
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(len(batches[0].directories), 40)
+        self.assertEqual(len(batches[0].created), 240)
+
+    def test_polling_burst_is_one_change_set(self):
+        watcher, batches, received = self.watch(use_inotify=False)
+        self.copy_burst(folders=5, files=5)
+        self.assertTrue(received.wait(5))
+        watcher.stop()
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(len(batches[0].directories), 10)
+
+    def test_parser_watch_applies_diff(self):
+        os.makedirs(os.path.join(self.test_dir, "10 First", "Data Files"))
+        parser = FomodParser(self.test_dir)
+        parser.parse()
+
+        diffs = []
+        received = threading.Event()
+        watcher = parser.watch(lambda diff, changes: (diffs.append(diff), received.set()), debounce=0.2)
+        self.addCleanup(watcher.stop)
+        os.makedirs(os.path.join(self.test_dir, "20 Second", "Data Files"))
+
+        self.assertTrue(received.wait(5))
+        self.assertEqual([group.name for group in diffs[0].added], ["Second"])
+        self.assertEqual([group.name for group in parser.steps[0].groups], ["First", "Second"])
+
+    def test_manager_watch_rebuilds_affected_stages(self):
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(mod_dir, "10 First", "Data Files"))
+        manager = FomodManager(mod_dir, os.path.join(self.test_dir, "out"), keep_existing_output=False)
+        with redirect_stdout(io.StringIO()):
+            manager.run(generate_archive=True)
+
+        rebuilds = queue.Queue()
+        watcher = manager.watch(generate_archive=True, debounce=0.2, on_rebuild=rebuilds.put)
+        self.addCleanup(watcher.stop)
+
+        with redirect_stdout(io.StringIO()) as output:
+            os.makedirs(os.path.join(mod_dir, "20 Second", "Data Files"))
+            self.assertEqual(rebuilds.get(timeout=5), ["xml", "archive"])
+            with open(manager.file_manager.fomod_config_path, encoding="utf-8") as f:
+                self.assertIn("Second", f.read())
+
+            with open(os.path.join(mod_dir, "20 Second", "Data Files", "notes.txt"), "w") as f:
+                f.write("changed")
+            self.assertEqual(rebuilds.get(timeout=5), ["archive"])
+        self.assertEqual(list(manager.timings), ["archive"])
+        self.assertEqual(output.getvalue().count("🔁"), 2)
+
+    def test_manager_watch_ignores_archives_inside_mod(self):
+        mod_dir = os.path.join(self.test_dir, "Mod")
+        os.makedirs(os.path.join(mod_dir, "10 First", "Data Files"))
+        manager = FomodManager(mod_dir, os.path.join(mod_dir, "dist"), keep_existing_output=False)
+        with redirect_stdout(io.StringIO()):
+            manager.run(generate_archive=True)
+
+        rebuilds = queue.Queue()
+        watcher = manager.watch(generate_archive=True, debounce=0.2, on_rebuild=rebuilds.put)
+        self.addCleanup(watcher.stop)
+
+        with redirect_stdout(io.StringIO()):
+            with open(os.path.join(mod_dir, "10 First", "Data Files", "notes.txt"), "w") as f:
+                f.write("changed")
+            self.assertEqual(rebuilds.get(timeout=5), ["archive"])
+            with self.assertRaises(queue.Empty):  # Writing the archive into dist/ is not a change
+                rebuilds.get(timeout=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
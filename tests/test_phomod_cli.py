@@ -0,0 +1,89 @@
+import io
+import os
+import sys
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import unittest
+import logging
+import subprocess
+from contextlib import redirect_stdout, redirect_stderr
+
+import phomod_cli
+
+log = logging.getLogger("test_logger")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPhomodCli(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.test_dir, "out")
+        os.makedirs(os.path.join(self.test_dir, "Mod", "10 Option", "Data Files", "meshes"))
+        log.info(f"Starting test: {self._testMethodName}")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+        log.info(f"Completed test: {self._testMethodName}\n")
+
+    def run_cli(self, *argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            code = phomod_cli.main(list(argv))
+        return code, stdout.getvalue(), stderr.getvalue()
+
+    def test_build_writes_config(self):
+        code, out, _ = self.run_cli("build", os.path.join(self.test_dir, "Mod"),
+                                    "-o", self.output_dir, "--overwrite", "--jobs", "2")
+        self.assertEqual(code, 0)
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, "Mod", "fomod", "ModuleConfig.xml")))
+        self.assertIn("Build timings", out)
+
+    def test_archive_compression_rules(self):
+        with open(os.path.join(self.test_dir, "Mod", "10 Option", "Data Files", "meshes", "a.nif"), "w") as f:
+            f.write("mesh " * 1000)
+        code, out, _ = self.run_cli("build", os.path.join(self.test_dir, "Mod"), "-o", self.output_dir,
+                                    "--overwrite", "--archive", "--version", "1.0", "--compress", "nif=store",
+                                    "--compress", "*=bzip2")
+        self.assertEqual(code, 0)
+        with zipfile.ZipFile(os.path.join(self.output_dir, "Mod_1.0.zip")) as archive:
+            self.assertEqual(archive.getinfo("10 Option/Data Files/meshes/a.nif").compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo("fomod/ModuleConfig.xml").compress_type, zipfile.ZIP_DEFLATED)
+        self.assertIn("1 deflate, 1 store", out)
+
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            phomod_cli.main(["build", os.path.join(self.test_dir, "Mod"), "--compress", "nif=brotli"])
+
+    def test_tar_xz_format(self):
+        code, out, _ = self.run_cli("build", os.path.join(self.test_dir, "Mod"), "-o", self.output_dir,
+                                    "--overwrite", "--archive", "--version", "1.0", "--format", "tar.xz")
+        self.assertEqual(code, 0)
+        with tarfile.open(os.path.join(self.output_dir, "Mod_1.0.tar.xz")) as archive:
+            self.assertIn("fomod/ModuleConfig.xml", archive.getnames())
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "Mod_1.0.zip")))
+
+    def test_failed_mod_sets_exit_code(self):
+        code, out, err = self.run_cli("build", os.path.join(self.test_dir, "Missing"),
+                                      os.path.join(self.test_dir, "Mod"), "-o", self.output_dir)
+        self.assertEqual(code, 1)
+        self.assertIn("Missing: not found", err)
+        self.assertIn("FOMOD XML generated", out)  # The other mod is still built
+
+    def test_strict_fails_on_schema_errors(self):
+        os.makedirs(os.path.join(self.test_dir, "Empty"))
+        code, _, err = self.run_cli("build", os.path.join(self.test_dir, "Empty"), "-o", self.output_dir, "--strict")
+        self.assertEqual(code, 1)
+        self.assertIn("does not match the schema", err)
+
+    def test_does_not_import_gui_modules(self):
+        check = ("import sys, phomod_cli; "
+                 "print(sorted(m for m in sys.modules if m.split('.')[0] in ('tkinter', 'ttkthemes', 'PIL')))")
+        result = subprocess.run([sys.executable, "-c", check], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 
 import logging
+import time
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog
 
@@ -8,6 +10,8 @@ from phomod_widgets import (
     PHOMODEntry, PHOMODButton, PHOMODListbox, PHOMODTreeview
 )
 from _prototypes.image_manipulation_prototype import ImageViewerWidget
+from parsers.fomod_parser import FomodParser
+from parsers.scan_cache import ScanCache
 
 app_logger = logging.getLogger('PHOMODLogger')
 
@@ -196,6 +200,53 @@ class ModStructureEditor(PHOMODFrame):
         self.mod_tree.pack(side="left", fill=tk.BOTH, expand=True, padx=0, pady=5)
         self.mod_tree.bind("<<TreeviewSelect>>", self._on_tree_select)
 
+    def add_parse_events(self, events):
+        """Appends rows for a batch of `ParseEvent`s as the parser streams them in."""
+        for event in events:
+            if event.kind == "step":
+                self.mod_tree.clear_items()
+                self.mod_tree.insert("", tk.END, text=event.node.name, values=("Step", "", "", ""), open=True)
+            elif event.kind == "group":
+                self._insert_group(self.mod_tree.get_children()[0], event.node, with_plugins=False)
+            elif event.kind == "plugin":
+                self._insert_plugin(event.parent.source_dir, event.node)
+
+    def apply_diff(self, diff):
+        """Updates only the rows for groups that were added, removed or reclassified."""
+        for group in diff.removed:
+            if self.mod_tree.exists(group.source_dir):
+                self.mod_tree.delete(group.source_dir)
+
+        step_ids = self.mod_tree.get_children()
+        if not step_ids:
+            return
+        for group in diff.reclassified:
+            if self.mod_tree.exists(group.source_dir):
+                self.mod_tree.delete(group.source_dir)
+            self._insert_group(step_ids[0], group)
+        for group in diff.added:
+            self._insert_group(step_ids[0], group)
+
+        # Keep the folder order of the parsed tree
+        ordered = sorted(self.mod_tree.get_children(step_ids[0]))
+        for index, item in enumerate(ordered):
+            self.mod_tree.move(item, step_ids[0], index)
+
+    def _insert_group(self, parent, group, with_plugins=True):
+        group_id = self.mod_tree.insert(parent, tk.END, iid=group.source_dir, text=group.name,
+                                        values=("Group", "", "", ""))
+        if with_plugins:
+            for plugin in group.plugins:
+                self._insert_plugin(group_id, plugin)
+
+    def _insert_plugin(self, group_id, plugin):
+        self.mod_tree.insert(group_id, tk.END, text=plugin.name, values=(
+            "Plugin",
+            plugin.type_descriptor or "Optional",
+            "✔" if plugin.description else "",
+            "✔" if plugin.image_path else "",
+        ))
+
     def _on_tree_select(self, event):
         selection = self.mod_tree.selection()
         app_logger.info(f"Tree selection changed: {selection}")
@@ -211,11 +262,14 @@ class ProjectWorkspaceView(PHOMODFrame):
     and check plugin details. It assembles the SidebarToggleBar, ProjectLoaderSidebar,
     ModStructureEditor, and PluginDetailsSidebar.
     """
+    PARSE_FLUSH_INTERVAL = 0.05  # Seconds between tree updates while a project is streaming in
 
     def __init__(self, parent, controller, *args, **kwargs):
         super().__init__(parent, controller=controller, *args, **kwargs)
         self.controller = controller
         self.active_sidebar = None  # Tracks the currently open sidebar ('loader', 'details', or None)
+        self.parser = None
+        self.watcher = None
 
         self._create_widgets()
         app_logger.info("🚀 ProjectTab initialized.")
@@ -240,9 +294,55 @@ class ProjectWorkspaceView(PHOMODFrame):
         self.paned.add(self.mod_editor, weight=3)
 
     def load_project(self, path):
-        """Handles project loading."""
-        app_logger.info(f"📦 Project loaded: {path}")
-        # TODO: Implement actual project loading logic.
+        """Parses the project on a worker thread, then shows it and starts watching the folder."""
+        self.stop_watching()
+        self.parser = FomodParser(path, scan_cache=ScanCache.for_project(path))
+        threading.Thread(target=self._parse_project, args=(self.parser,), daemon=True).start()
+
+    def _parse_project(self, parser):
+        """Runs off the main loop, handing rows back to the tree in small batches with `after`."""
+        batch = []
+        last_flush = 0.0  # Flush the first event right away so the tree appears immediately
+        try:
+            for event in parser.iter_parse():
+                batch.append(event)
+                if time.monotonic() - last_flush >= self.PARSE_FLUSH_INTERVAL:
+                    self.after(0, self._on_parse_events, parser, batch)
+                    batch = []
+                    last_flush = time.monotonic()
+        except OSError as e:
+            app_logger.error(f"❌ Failed to load project {parser.root_dir}: {e}")
+            return
+        self.after(0, self._on_parse_events, parser, batch)
+        self.after(0, self._on_project_parsed, parser)
+
+    def _on_parse_events(self, parser, events):
+        if parser is self.parser:  # Ignore a project that was replaced while loading
+            self.mod_editor.add_parse_events(events)
+
+    def _on_project_parsed(self, parser):
+        if parser is not self.parser:
+            return  # Another project was loaded in the meantime
+        self.controller.project_parser = parser
+        self.watcher = parser.watch(
+            lambda diff, changes: self._on_project_changed(parser, diff),
+            dispatch=lambda fn: self.after(0, fn)
+        )
+        app_logger.info(f"📦 Project loaded: {parser.root_dir}")
+
+    def _on_project_changed(self, parser, diff):
+        """Applies a folder change picked up by the watcher (runs on the main loop)."""
+        if parser is not self.parser:
+            return
+        self.mod_editor.apply_diff(diff)
+        app_logger.info(f"🔄 Project updated: {len(diff.added)} added, {len(diff.removed)} removed, "
+                        f"{len(diff.reclassified)} reclassified")
+
+    def stop_watching(self):
+        """Stops watching the currently loaded project folder."""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
 
     def on_tree_select(self, selection):
         """Handles tree selection updates."""
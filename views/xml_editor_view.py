@@ -1,9 +1,9 @@
 
 import logging
-import threading
 import tkinter as tk
 
 from phomod_widgets import PHOMODFrame, PHOMODLabel, PHOMODTextArea, PHOMODButton, PHOMODSyntaxTextArea
+from parsers.fomod_parser import FomodXMLWriter
 
 app_logger = logging.getLogger('PHOMODLogger')
 
@@ -12,6 +12,7 @@ class XMLEditorView(PHOMODFrame):
     def __init__(self, parent, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         app_logger.info(f"🚦 Initializing {self.__class__.__name__}")
+        self.xml_writer = None  # Keeps per-node XML fragments between refreshes
         self.create_widgets()
 
     def create_widgets(self):
@@ -30,16 +31,25 @@ class XMLEditorView(PHOMODFrame):
 
     def start_generate_xml(self):
         app_logger.info("Starting XML generation")
-        threading.Thread(target=self.generate_xml, daemon=True).start()
+        self.generate_xml()
 
     def generate_xml(self):
-        sample_xml = """<config>
-    <mod name="Example">
-        <author>John Doe</author>
-        <version>1.0</version>
-    </mod>
-</config>"""
+        """
+        Renders the loaded project's XML. Only nodes edited since the last refresh are serialized again.
+
+        Runs on the Tk main loop, like the watcher's `apply_diff`: both touch the nodes' cached
+        fragments, and a fragment built on another thread while a node changed could be kept stale.
+        """
+        parser = getattr(self.controller, "project_parser", None)
+        if parser is None or not parser.steps:
+            app_logger.warning("No project loaded; nothing to generate.")
+            return
+        if self.xml_writer is None or self.xml_writer.steps is not parser.steps:
+            self.xml_writer = FomodXMLWriter(parser.steps, cache_fragments=True)
+        self._show_xml(self.xml_writer.generate_xml())
+
+    def _show_xml(self, xml):
         self.xml_preview.delete("1.0", tk.END)
-        self.xml_preview.insert("1.0", sample_xml)
+        self.xml_preview.insert("1.0", xml)
         self.xml_preview._highlight_syntax()  # Manually trigger highlighting
         app_logger.info("XML generated")